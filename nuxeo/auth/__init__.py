@@ -1,8 +1,20 @@
 # coding: utf-8
+from importlib import import_module
+from typing import Any
+
 from .basic import BasicAuth
-from .jwt import JWTAuth
-from .oauth2 import OAuth2
-from .portal_sso import PortalSSOAuth
 from .token import TokenAuth
 
 __all__ = ("BasicAuth", "JWTAuth", "OAuth2", "PortalSSOAuth", "TokenAuth")
+
+# Imported on first use: OAuth2 needs the nuxeo[oauth2] extra, and is slow to import
+_LAZY = {"JWTAuth": ".jwt", "OAuth2": ".oauth2", "PortalSSOAuth": ".portal_sso"}
+
+
+def __getattr__(name):
+    # type: (str) -> Any
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = globals()[name] = getattr(import_module(module, __name__), name)
+    return value
@@ -12,3 +12,9 @@ class AuthBase(object):
     def __call__(self, r):
         # type: (Request) -> Request
         raise NotImplementedError("Auth hooks must be callable.")
+
+    def credentials(self):
+        # type: () -> str
+        """The credentials sent, telling apart users in the responses cache."""
+        # Without knowing them, only the same object is the same user
+        return f"{type(self).__name__}@{id(self)}"
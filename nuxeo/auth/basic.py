@@ -38,6 +38,10 @@ class BasicAuth(AuthBase):
         # type: (object) -> bool
         return not self == other
 
+    def credentials(self):
+        # type: () -> str
+        return self._token_header
+
     def __call__(self, r):
         # type: (Request) -> Request
         r.headers[self.AUTHORIZATION] = self._token_header
@@ -23,6 +23,10 @@ class JWTAuth(AuthBase):
         # type: (object) -> bool
         return not self == other
 
+    def credentials(self):
+        # type: () -> str
+        return "Bearer " + self.token
+
     def __call__(self, r):
         # type: (Request) -> Request
         r.headers[self.AUTHORIZATION] = "Bearer " + self.token
@@ -181,6 +181,10 @@ class OAuth2(AuthBase):
         # type: (object) -> bool
         return not self == other
 
+    def credentials(self):
+        # type: () -> str
+        return self._token_header
+
     def __call__(self, r):
         # type: (requests.Request) -> requests.Request
         if self.token_is_expired():
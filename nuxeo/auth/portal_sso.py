@@ -41,6 +41,11 @@ class PortalSSOAuth(AuthBase):
         # type: (object) -> bool
         return not self == other
 
+    def credentials(self):
+        # type: () -> str
+        # Tokens change with each call
+        return f"{self.username}:{self.digest_algorithm}:{self.secret}"
+
     def __call__(self, r):
         # type: (Request) -> Request
         timestamp = int(time() * 1000)
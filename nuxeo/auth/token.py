@@ -76,6 +76,10 @@ class TokenAuth(AuthBase):
         # type: (object) -> bool
         return not self == other
 
+    def credentials(self):
+        # type: () -> str
+        return self.token
+
     def __call__(self, r):
         # type: (Request) -> Request
         r.headers[self.HEADER_TOKEN] = self.token
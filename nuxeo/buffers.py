@@ -0,0 +1,177 @@
+# coding: utf-8
+"""
+Reusable buffers for uploads and downloads.
+"""
+from contextlib import contextmanager
+from threading import Condition
+from typing import Any, BinaryIO, Dict, Generator, List, Optional, Union
+
+from requests import Response
+
+from .constants import BUFFER_POOL_MAX_SIZE
+
+
+class BufferPool(object):
+    """
+    Pool of reusable buffers shared by all transfers of a client.
+
+    Buffers are ``bytearray`` objects kept around once released, to be reused
+    by later transfers instead of allocating new ``bytes`` for each chunk.
+    The memory held by the pool, buffers in use and idle ones, is capped by
+    *max_size*: when the cap is reached, acquiring a buffer blocks until
+    another transfer releases its own.
+
+    :param max_size: the maximum memory held by the pool, in bytes
+    """
+
+    __slots__ = ("max_size", "_allocated", "_condition", "_free", "_in_use")
+
+    def __init__(self, max_size=BUFFER_POOL_MAX_SIZE):
+        # type: (int) -> None
+        self.max_size = max_size
+        self._allocated = 0
+        self._condition = Condition()
+        self._free = {}  # type: Dict[int, List[bytearray]]
+        self._in_use = 0
+
+    def __repr__(self):
+        # type: () -> str
+        return (
+            f"{type(self).__name__}<max_size={self.max_size:,}, allocated={self._allocated:,},"
+            f" in_use={self._in_use:,}>"
+        )
+
+    @property
+    def allocated(self):
+        # type: () -> int
+        """Memory held by the pool, in bytes."""
+        return self._allocated
+
+    @property
+    def in_use(self):
+        # type: () -> int
+        """Memory of buffers currently used by transfers, in bytes."""
+        return self._in_use
+
+    def after_fork(self):
+        # type: () -> None
+        """
+        Reset the state shared with the parent process, in a child process:
+        buffers in use are the parent ones.
+        """
+        self._condition = Condition()
+        self._in_use = 0
+        self._allocated = sum(size * len(free) for size, free in self._free.items())
+
+    def _can_acquire(self, size):
+        # type: (int) -> bool
+        # A buffer bigger than the cap is allowed when nothing else is in use,
+        # else the caller would wait forever.
+        return (
+            bool(self._free.get(size))
+            or self._in_use + size <= self.max_size
+            or not self._in_use
+        )
+
+    def acquire(self, size, timeout=None):
+        # type: (int, Optional[float]) -> bytearray
+        """
+        Get a buffer of *size* bytes, waiting for a free one if the cap is reached.
+
+        :param size: the size of the buffer
+        :param timeout: the maximum time to wait, in seconds (forever by default)
+        :return: the buffer, to give back with :func:`release`
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._can_acquire(size), timeout):
+                raise TimeoutError(f"No buffer of {size:,} bytes available in {timeout}s")
+
+            self._in_use += size
+            free = self._free.get(size)
+            if free:
+                return free.pop()
+
+            # Drop idle buffers of other sizes to make room for the new one
+            for other in list(self._free):
+                while self._free[other] and self._allocated + size > self.max_size:
+                    self._free[other].pop()
+                    self._allocated -= other
+
+            self._allocated += size
+            return bytearray(size)
+
+    def release(self, buffer):
+        # type: (bytearray) -> None
+        """Give back a *buffer* obtained with :func:`acquire`."""
+        size = len(buffer)
+        with self._condition:
+            self._in_use -= size
+            self._free.setdefault(size, []).append(buffer)
+            self._condition.notify_all()
+
+    @contextmanager
+    def buffer(self, size):
+        # type: (int) -> Generator[bytearray, None, None]
+        """Context manager acquiring a buffer of *size* bytes and releasing it on exit."""
+        buffer = self.acquire(size)
+        try:
+            yield buffer
+        finally:
+            self.release(buffer)
+
+    def clear(self):
+        # type: () -> None
+        """Drop all idle buffers."""
+        with self._condition:
+            for size, free in self._free.items():
+                self._allocated -= size * len(free)
+            self._free.clear()
+
+
+def read_chunk(src, buffer):
+    # type: (Union[BinaryIO, Any], bytearray) -> Union[memoryview, bytes, str]
+    """
+    Read up to ``len(buffer)`` bytes from *src* into *buffer*.
+
+    :param src: the source, sources without readinto() (like StringIO) are read the usual way
+    :param buffer: the destination buffer
+    :return: a view on the data read
+    """
+    if not hasattr(src, "readinto"):
+        return src.read(len(buffer))
+
+    view = memoryview(buffer)
+    size = 0
+    while size < len(buffer):
+        count = src.readinto(view[size:])
+        if not count:
+            break
+        size += count
+    return view[:size]
+
+
+def iter_response(response, buffer):
+    # type: (Response, bytearray) -> Generator[Union[memoryview, bytes], None, None]
+    """
+    Iterate over the body of a streamed *response*, filling *buffer* each time.
+
+    When the body is not encoded, data is read into the buffer using readinto()
+    on the urllib3 response, which gives the connection back to its pool once
+    the body is read. Else, urllib3 has to decode it and chunks are produced
+    by iter_content().
+
+    :param response: the streamed response
+    :param buffer: the buffer to fill, the yielded views are only valid until the next iteration
+    """
+    raw = response.raw
+    encoding = response.headers.get("content-encoding", "identity").lower()
+    if encoding != "identity" or not hasattr(raw, "readinto"):
+        yield from response.iter_content(chunk_size=len(buffer))
+        return
+
+    view = memoryview(buffer)
+    while "there is data":
+        size = raw.readinto(view)
+        if not size:
+            break
+        yield view[:size]
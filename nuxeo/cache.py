@@ -0,0 +1,459 @@
+# coding: utf-8
+"""
+Cache of GET responses, revalidated with ETag and Last-Modified validators.
+See the *cache* argument of NuxeoClient.
+"""
+import json
+import logging
+import os
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+from hashlib import sha256
+from threading import Lock
+from time import time
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+from requests import Response
+from requests.structures import CaseInsensitiveDict
+
+from .auth import BasicAuth
+from .auth.base import AuthBase
+from .constants import CACHE_MAX_ENTRY_SIZE, CACHE_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Request headers that do not change the response representation
+IGNORED_HEADERS = {"idempotency-key", "if-modified-since", "if-none-match"}
+
+# Response headers not worth keeping
+SKIPPED_HEADERS = {"connection", "keep-alive", "set-cookie", "transfer-encoding"}
+
+
+def credentials(auth):
+    # type: (Any) -> str
+    """The credentials sent by *auth*, hashed."""
+    if not auth:
+        return ""
+    if isinstance(auth, tuple):
+        auth = BasicAuth(*auth)
+    if isinstance(auth, AuthBase):
+        value = auth.credentials()
+    else:
+        # Other auth objects, like the Requests ones: only the same object is the same user
+        value = f"{type(auth).__name__}@{id(auth)}"
+    return sha256(value.encode("utf-8")).hexdigest()
+
+
+def parse_cache_control(value):
+    # type: (str) -> Dict[str, Optional[str]]
+    """Parse a Cache-Control header into a dict of lowercased directives."""
+    directives = {}  # type: Dict[str, Optional[str]]
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if arg else None
+    return directives
+
+
+class CacheEntry(object):
+    """A cached response."""
+
+    __slots__ = (
+        "url",
+        "status_code",
+        "headers",
+        "content",
+        "expires",
+        "no_cache",
+    )
+
+    def __init__(
+        self,
+        url,  # type: str
+        status_code,  # type: int
+        headers,  # type: Dict[str, str]
+        content,  # type: bytes
+    ):
+        # type: (...) -> None
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.expires = None  # type: Optional[float]
+        self.no_cache = False
+        self.update_freshness()
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<url={self.url!r}, size={self.size:,}, etag={self.etag!r}>"
+
+    @property
+    def etag(self):
+        # type: () -> Optional[str]
+        return self.headers.get("ETag")
+
+    @property
+    def last_modified(self):
+        # type: () -> Optional[str]
+        return self.headers.get("Last-Modified")
+
+    @property
+    def size(self):
+        # type: () -> int
+        return len(self.content)
+
+    def update_freshness(self):
+        # type: () -> None
+        """Compute the expiration time from Cache-Control and Expires headers."""
+        directives = parse_cache_control(self.headers.get("Cache-Control", ""))
+        self.no_cache = "no-cache" in directives or "must-revalidate" in directives
+        self.expires = None
+
+        max_age = directives.get("max-age")
+        if max_age is not None:
+            try:
+                self.expires = time() + int(max_age)
+            except ValueError:
+                pass
+        elif "Expires" in self.headers:
+            try:
+                self.expires = parsedate_to_datetime(self.headers["Expires"]).timestamp()
+            except (TypeError, ValueError):
+                pass
+
+    def is_fresh(self):
+        # type: () -> bool
+        """Can the entry be used without asking the server?"""
+        return not self.no_cache and self.expires is not None and time() < self.expires
+
+    def validators(self):
+        # type: () -> Dict[str, str]
+        """Headers to send to revalidate the entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self):
+        # type: () -> Response
+        """Build a response from the entry."""
+        resp = Response()
+        resp.status_code = self.status_code
+        resp.reason = "OK"
+        resp.url = self.url
+        resp.headers = CaseInsensitiveDict(self.headers)
+        resp.encoding = None
+        resp._content = self.content
+        resp._content_consumed = True
+        resp.from_cache = True
+        return resp
+
+    def dump(self):
+        # type: () -> bytes
+        meta = {"url": self.url, "status_code": self.status_code, "headers": self.headers}
+        return json.dumps(meta).encode("utf-8") + b"\n" + self.content
+
+    @classmethod
+    def load(cls, data):
+        # type: (bytes) -> CacheEntry
+        meta, _, content = data.partition(b"\n")
+        info = json.loads(meta)
+        return cls(info["url"], info["status_code"], info["headers"], content)
+
+
+class ResponseCache(object):
+    """
+    Cache of JSON responses to GET requests.
+
+    Entries are kept in memory, the least recently used ones being dropped
+    when *max_size* is reached. When *directory* is given, entries are also
+    stored on the disk and survive the client.
+
+    Cached responses are used as-is while they are fresh (Cache-Control
+    max-age or Expires headers), else they are revalidated using the
+    If-None-Match and If-Modified-Since headers: a 304 answer from the
+    server is served from the cache.
+
+    The disk tier must not be shared between users having different permissions.
+
+    :param max_size: the maximum memory used by the cached contents, in bytes
+    :param max_entry_size: responses bigger than that are not cached, in bytes
+    :param directory: the folder where to store entries on the disk
+    :param disk_max_size: the maximum disk space used by entries, in bytes
+    """
+
+    __slots__ = (
+        "directory",
+        "disk_max_size",
+        "max_entry_size",
+        "max_size",
+        "stats",
+        "_disk_size",
+        "_entries",
+        "_lock",
+        "_size",
+    )
+
+    def __init__(
+        self,
+        max_size=CACHE_MAX_SIZE,  # type: int
+        max_entry_size=CACHE_MAX_ENTRY_SIZE,  # type: int
+        directory=None,  # type: Optional[str]
+        disk_max_size=None,  # type: Optional[int]
+    ):
+        # type: (...) -> None
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size
+        self.directory = directory
+        self.disk_max_size = disk_max_size
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0}
+        self._entries = OrderedDict()  # type: OrderedDict[str, CacheEntry]
+        self._lock = Lock()
+        self._size = 0
+        self._disk_size = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+
+    def __repr__(self):
+        # type: () -> str
+        return (
+            f"{type(self).__name__}<entries={len(self._entries)}, size={self._size:,},"
+            f" directory={self.directory!r}, stats={self.stats!r}>"
+        )
+
+    def __len__(self):
+        # type: () -> int
+        return len(self._entries)
+
+    @property
+    def size(self):
+        # type: () -> int
+        """Memory used by cached contents, in bytes."""
+        return self._size
+
+    def after_fork(self):
+        # type: () -> None
+        """Reset the lock shared with the parent process, in a child process."""
+        self._lock = Lock()
+
+    @staticmethod
+    def key(url, params, headers, auth=None):
+        # type: (str, Any, Dict[str, str], Any) -> str
+        """Compute the cache key of a request."""
+        if isinstance(params, dict):
+            params = urlencode(sorted(params.items()), doseq=True)
+        parts = [
+            url,
+            str(params or ""),
+            # Responses of different users must not be mixed
+            credentials(auth),
+        ]
+        parts.extend(
+            sorted(
+                f"{name.lower()}:{value}"
+                for name, value in headers.items()
+                if name.lower() not in IGNORED_HEADERS
+            )
+        )
+        return sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        # type: (str) -> Optional[CacheEntry]
+        """Get the entry stored under *key*, looking on the disk if needed."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                return entry
+
+        entry = self._load(key)
+        if entry:
+            self._remember(key, entry)
+        return entry
+
+    def set(self, key, entry):
+        # type: (str, CacheEntry) -> None
+        """Store an *entry* under *key*."""
+        if entry.size > self.max_entry_size:
+            return
+        self._remember(key, entry)
+        self._save(key, entry)
+        with self._lock:
+            self.stats["stored"] += 1
+
+    def delete(self, key):
+        # type: (str) -> None
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry:
+                self._size -= entry.size
+        if self.directory:
+            self._remove_file(os.path.join(self.directory, key))
+
+    def invalidate(self, url):
+        # type: (str) -> None
+        """Drop in-memory entries of *url* and its sub-resources (disk entries will be revalidated)."""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if entry.url.startswith(url)]
+        for key in keys:
+            self.delete(key)
+
+    def clear(self):
+        # type: () -> None
+        """Drop all entries, from the memory and the disk."""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.directory:
+            for entry in os.scandir(self.directory):
+                self._remove_file(entry.path)
+
+    def lookup(self, key):
+        # type: (str) -> Tuple[Optional[CacheEntry], Optional[Response]]
+        """
+        Find the entry of a request about to be sent.
+
+        :return: the entry, and the response to use directly if the entry is fresh
+        """
+        entry = self.get(key)
+        with self._lock:
+            if not entry:
+                self.stats["misses"] += 1
+                return None, None
+            if entry.is_fresh():
+                self.stats["hits"] += 1
+                return entry, entry.to_response()
+        return entry, None
+
+    def update(self, key, entry, resp, url=None):
+        # type: (str, Optional[CacheEntry], Response, Optional[str]) -> Response
+        """
+        Handle the server response of a request looked up with :func:`lookup`.
+
+        :param url: the URL of the request, as given to :func:`invalidate` later,
+               the one of the response by default (it may be another node, or redirected)
+        :return: the response to use
+        """
+        if resp.status_code == 304 and entry:
+            # Still valid, refresh the validators and freshness information
+            entry.headers.update(
+                {k: v for k, v in resp.headers.items() if k.lower() not in SKIPPED_HEADERS | {"content-length"}}
+            )
+            entry.update_freshness()
+            resp.close()
+            self._save(key, entry)
+            with self._lock:
+                self.stats["revalidated"] += 1
+            return entry.to_response()
+
+        if resp.status_code == 200 and self.is_cacheable(resp):
+            headers = {k: v for k, v in resp.headers.items() if k.lower() not in SKIPPED_HEADERS}
+            self.set(key, CacheEntry(url or resp.url, resp.status_code, headers, resp.content))
+        elif entry:
+            self.delete(key)
+        return resp
+
+    def is_cacheable(self, resp):
+        # type: (Response) -> bool
+        headers = resp.headers
+        if "json" not in headers.get("Content-Type", ""):
+            return False
+
+        directives = parse_cache_control(headers.get("Cache-Control", ""))
+        if "no-store" in directives:
+            return False
+        if not ("ETag" in headers or "Last-Modified" in headers or "max-age" in directives):
+            # Nothing to revalidate with, and never fresh
+            return False
+
+        try:
+            size = int(headers.get("Content-Length", 0))
+        except ValueError:
+            size = 0
+        return size <= self.max_entry_size
+
+    def _remember(self, key, entry):
+        # type: (str, CacheEntry) -> None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._size -= previous.size
+            self._entries[key] = entry
+            self._size += entry.size
+            while self._size > self.max_size and self._entries:
+                _, dropped = self._entries.popitem(last=False)
+                self._size -= dropped.size
+
+    def _load(self, key):
+        # type: (str) -> Optional[CacheEntry]
+        if not self.directory:
+            return None
+
+        path = os.path.join(self.directory, key)
+        try:
+            with open(path, "rb") as handler:
+                entry = CacheEntry.load(handler.read())
+            # Keep track of the last use for the eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"Invalid cache entry {path!r}, removing it", exc_info=True)
+            self._remove_file(path)
+            return None
+        return entry
+
+    def _save(self, key, entry):
+        # type: (str, CacheEntry) -> None
+        if not self.directory:
+            return
+
+        path = os.path.join(self.directory, key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        data = entry.dump()
+        try:
+            with open(tmp, "wb") as handler:
+                handler.write(data)
+            previous = os.stat(path).st_size if os.path.isfile(path) else 0
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning(f"Cannot store the cache entry {path!r}", exc_info=True)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            self._disk_size += len(data) - previous
+        if self.disk_max_size and self._disk_size > self.disk_max_size:
+            self._evict_files()
+
+    def _evict_files(self):
+        # type: () -> None
+        """Remove the least recently used files until the disk tier is under 90% of its cap."""
+        files = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+            for entry in os.scandir(self.directory)
+            if entry.is_file()
+        )
+        target = self.disk_max_size * 0.9
+        for _, _, path in files:
+            if self._disk_size <= target:
+                break
+            self._remove_file(path)
+
+    def _remove_file(self, path):
+        # type: (str) -> None
+        try:
+            size = os.stat(path).st_size
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_size -= size
@@ -1,58 +1,85 @@
 # coding: utf-8
 import atexit
-import json
 import logging
-from typing import Any, Dict, Optional, Tuple, Type, Union
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from importlib import import_module
+from threading import RLock, local
+from time import monotonic
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Type, Union
 from warnings import warn
+from weakref import WeakSet
 
 import requests
-from requests.adapters import HTTPAdapter
+from requests.adapters import DEFAULT_POOLSIZE
+from requests.sessions import merge_setting
+from requests.utils import get_environ_proxies, super_len
 from urllib3 import __version__ as urllib3_version
-from urllib3.util.retry import Retry
-from urllib.parse import urlparse
-from . import (
-    __version__,
-    comments,
-    directories,
-    documents,
-    groups,
-    operations,
-    tasks,
-    uploads,
-    users,
-    workflows,
-)
+from urllib.parse import urlparse, urlsplit
+from . import __version__
 from .auth.base import AuthBase
 from .auth import BasicAuth, TokenAuth
+from .buffers import BufferPool
+from .cache import ResponseCache
+from .compression import REJECTED_STATUS_CODES, Compression, GzipStream, is_rejection
 from .constants import (
+    BUFFER_POOL_MAX_SIZE,
     CHUNK_SIZE,
     DEFAULT_API_PATH,
     DEFAULT_APP_NAME,
     DEFAULT_URL,
+    HEALTH_CHECK_TIMEOUT,
     IDEMPOTENCY_KEY,
+    JSON_CODEC,
     MAX_RETRY,
+    MAX_WORKERS,
     RETRY_BACKOFF_FACTOR,
     RETRY_METHODS,
     RETRY_STATUS_CODES,
     TIMEOUT_CONNECT,
     TIMEOUT_READ,
+    TRANSPORT,
 )
 from .exceptions import (
     BadQuery,
     Conflict,
     Forbidden,
     HTTPError,
+    InvalidTransport,
     OngoingRequestError,
     Unauthorized,
 )
-from .tcp import TCPKeepAliveHTTPSAdapter
-from .utils import json_helper, log_response
+from .hosts import HostPool, is_failure, sticky_key
+from .json_codecs import JSONCodec, get_codec
+from .limiters import AdaptiveLimiter, RateLimiter, is_overloaded
+from .metrics import Metrics, endpoint_template
+from .retry import NuxeoRetry
+from .server_cache import ServerCache
+from .tcp import (
+    DirectTransport,
+    PoolStats,
+    RequestTimings,
+    StatsHTTPAdapter,
+    TCPKeepAliveHTTPSAdapter,
+    available_transports,
+    get_timings,
+)
+from .tracing import Tracer, get_tracer
+from .utils import log_response
 
 AuthType = Optional[Union[Tuple[str, str], AuthBase]]
 logger = logging.getLogger(__name__)
 
+HTTP_METHODS = frozenset(
+    ("GET", "HEAD", "POST", "PUT", "DELETE", "CONNECT", "OPTIONS", "TRACE")
+)
+
+# Maximum number of well formatted header and param keys to remember
+MAX_VALID_KEYS = 1024
+
+# Retries with an exponential backoff, see nuxeo.retry.NuxeoRetry for the jitter and budget
 if urllib3_version < "1.26.0":
-    DEFAULT_RETRY = Retry(
+    DEFAULT_RETRY = NuxeoRetry(
         total=MAX_RETRY,
         backoff_factor=RETRY_BACKOFF_FACTOR,
         method_whitelist=RETRY_METHODS,
@@ -60,7 +87,7 @@ if urllib3_version < "1.26.0":
         raise_on_status=False,
     )
 else:
-    DEFAULT_RETRY = Retry(
+    DEFAULT_RETRY = NuxeoRetry(
         total=MAX_RETRY,
         backoff_factor=RETRY_BACKOFF_FACTOR,
         allowed_methods=RETRY_METHODS,
@@ -68,6 +95,20 @@ else:
         raise_on_status=False,
     )
 
+# Clients living in this process, their connections must not be used by child processes
+_CLIENTS = WeakSet()  # type: WeakSet[NuxeoClient]
+
+
+def _after_fork_in_child():
+    # type: () -> None
+    _Endpoint._lock = RLock()
+    for client in list(_CLIENTS):
+        client._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
 # Custom exception to raise based on the HTTP status code
 # (default will be HTTPError)
 HTTP_ERROR = {
@@ -77,30 +118,180 @@ HTTP_ERROR = {
 }
 
 
+class NuxeoSession(requests.Session):
+    """
+    Session looking up the environment settings (proxies and CA bundle) once per host.
+
+    Requests reads them for each and every call, which is costly as the whole
+    environment is scanned. Changes made to the environment after the first
+    request to a host are not taken into account.
+    """
+
+    __attrs__ = requests.Session.__attrs__ + ["_environment"]
+
+    def __init__(self):
+        # type: () -> None
+        super().__init__()
+        self._environment = {}  # type: Dict[Tuple[str, str, Optional[str]], Tuple[Dict[str, str], Optional[str]]]
+
+    def merge_environment_settings(self, url, proxies, stream, verify, cert):
+        # type: (str, Optional[Dict[str, str]], Any, Any, Any) -> Dict[str, Any]
+        if not self.trust_env:
+            return super().merge_environment_settings(url, proxies, stream, verify, cert)
+
+        no_proxy = proxies.get("no_proxy") if proxies is not None else None
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.netloc, no_proxy)
+        environment = self._environment.get(key)
+        if environment is None:
+            environment = self._environment[key] = (
+                get_environ_proxies(url, no_proxy=no_proxy),
+                os.environ.get("REQUESTS_CA_BUNDLE") or os.environ.get("CURL_CA_BUNDLE"),
+            )
+        env_proxies, ca_bundle = environment
+
+        if proxies is not None:
+            for k, v in env_proxies.items():
+                proxies.setdefault(k, v)
+        if (verify is True or verify is None) and ca_bundle:
+            verify = ca_bundle
+
+        return {
+            "proxies": merge_setting(proxies, self.proxies),
+            "stream": merge_setting(stream, self.stream),
+            "verify": merge_setting(verify, self.verify),
+            "cert": merge_setting(cert, self.cert),
+        }
+
+
+class NuxeoResponse(requests.Response):
+    """Response translating user entity UUIDs when decoding JSON."""
+
+    @property
+    def timings(self):
+        # type: () -> Optional[RequestTimings]
+        """Durations of the request steps (DNS, connect, TLS, send, TTFB, transfer), if known."""
+        return get_timings(self)
+
+    def json(self, **kwargs):
+        # type: (Any) -> Any
+        client = getattr(self, "_nuxeo_client", None)
+        if not client:
+            return super().json(**kwargs)
+
+        data = None  # type: Any
+        if kwargs or type(client.codec) is JSONCodec:
+            data = super().json(**kwargs)
+        else:
+            try:
+                data = client.codec.loads(self.content)
+            except ValueError:
+                # Let Requests guess the encoding and raise its usual error
+                data = super().json()
+        return client._translate_user_entity(data)
+
+
 class NuxeoClient(object):
     """
     The HTTP client used by Nuxeo.
 
     :param auth: An authentication object passed to Requests
-    :param host: The url of the Nuxeo Platform
+    :param host: The url of the Nuxeo Platform, or the urls of the nodes of
+           a cluster to spread calls over them, see :class:`nuxeo.hosts.HostPool`
     :param api_path: The API path appended to the host url
     :param chunk_size: The size of the chunks for blob download
-    :param kwargs: kwargs passed to :func:`NuxeoClient.request`
+    :param buffer_pool_size: The maximum memory used by transfer buffers
+    :param max_workers: The number of threads of the executor used by
+           :func:`NuxeoClient.submit`
+    :param pool_connections: The number of connection pools to cache, one per host
+    :param pool_maxsize: The maximum number of connections kept open per host,
+           "auto" to keep one for each worker thread
+    :param pool_block: Wait for a free connection instead of opening a
+           new one when the pool is full
+    :param json_codec: The JSON codec of request bodies and responses,
+           see :func:`nuxeo.json_codecs.get_codec`
+    :param cache: The cache of GET responses, disabled by default,
+           see :class:`nuxeo.cache.ResponseCache`
+    :param limiter: The limiter of concurrent requests, disabled by default,
+           see :class:`nuxeo.limiters.AdaptiveLimiter`
+    :param rate_limiter: The requests and bandwidth budgets, disabled by default,
+           see :class:`nuxeo.limiters.RateLimiter`
+    :param metrics: The collector of HTTP calls metrics, disabled by default,
+           see :class:`nuxeo.metrics.Metrics`
+    :param tracer: The tracer of HTTP calls, uploads and operations, disabled
+           by default, see :func:`nuxeo.tracing.get_tracer`
+    :param server_cache: The on-disk cache of the server information and
+           operations registry, disabled by default, see :class:`nuxeo.server_cache.ServerCache`
+    :param compression: The gzip compression of JSON request bodies, disabled
+           by default, see :class:`nuxeo.compression.Compression`
+    :param transport: How requests are sent: "requests" over HTTP/1.1, "http2"
+           to multiplex calls over one connection, see :class:`nuxeo.tcp.http2.HTTP2Adapter`,
+           or "urllib3" to send small calls straight to the connection pools,
+           see :class:`nuxeo.tcp.direct.DirectTransport`
+    :param kwargs: kwargs passed to :func:`NuxeoClient.request`, and
+           *retries*, the retry policy of HTTP calls, see :class:`nuxeo.retry.NuxeoRetry`
     """
 
     def __init__(
         self,
         auth=None,  # type: AuthType
-        host=DEFAULT_URL,  # type: str
+        host=DEFAULT_URL,  # type: Union[str, Sequence[str], HostPool]
         api_path=DEFAULT_API_PATH,  # type: str
         chunk_size=CHUNK_SIZE,  # type: int
+        buffer_pool_size=BUFFER_POOL_MAX_SIZE,  # type: int
+        max_workers=MAX_WORKERS,  # type: int
+        pool_connections=DEFAULT_POOLSIZE,  # type: int
+        pool_maxsize="auto",  # type: Union[int, str]
+        pool_block=False,  # type: bool
+        json_codec=JSON_CODEC,  # type: Union[str, JSONCodec]
+        cache=None,  # type: Optional[ResponseCache]
+        limiter=None,  # type: Optional[AdaptiveLimiter]
+        rate_limiter=None,  # type: Optional[RateLimiter]
+        metrics=None,  # type: Optional[Metrics]
+        tracer=None,  # type: Union[str, Tracer, None]
+        compression=None,  # type: Optional[Compression]
+        server_cache=None,  # type: Optional[ServerCache]
+        transport=TRANSPORT,  # type: str
         **kwargs,  # type: Any
     ):
         # type: (...) -> None
+        if transport not in available_transports():
+            raise InvalidTransport(transport, available_transports())
+
         self.auth = BasicAuth(*auth) if isinstance(auth, tuple) else auth
+
+        # Several nodes: calls are spread over them, self.host is the first one
+        self.hosts = None  # type: Optional[HostPool]
+        if not isinstance(host, str):
+            self.hosts = host if isinstance(host, HostPool) else HostPool(host)
+            host = self.hosts.nodes[0].url
         self.host = host
         self.api_path = api_path
         self.chunk_size = chunk_size
+        self.max_workers = max_workers
+        self.codec = get_codec(json_codec)
+        self.cache = cache
+        self.limiter = limiter
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self.tracer = get_tracer(tracer)
+        self.compression = compression
+        self.server_cache = server_cache
+        self.transport = transport
+
+        # Connection pools settings, see .enable_retry()
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self._pool_stats = PoolStats()
+
+        # Guard shared state against concurrent calls (see .submit())
+        self._lock = RLock()
+        self._executor = None  # type: Optional[ThreadPoolExecutor]
+        self._worker = local()
+
+        # Reusable buffers shared by uploads and downloads
+        self.buffer_pool = BufferPool(max_size=buffer_pool_size)
 
         version = kwargs.pop("version", "")
         app_name = kwargs.pop("app_name", DEFAULT_APP_NAME)
@@ -113,7 +304,12 @@ class NuxeoClient(object):
 
         self.schemas = kwargs.get("schemas", "*")
         self.repository = kwargs.pop("repository", "default")
-        self._session = requests.sessions.Session()
+
+        # Request preparation caches, see .request()
+        self._static_headers_cache = None  # type: Optional[Tuple[Tuple[str, str], Dict[str, str]]]
+        self._valid_keys = set()  # type: Set[str]
+
+        self._session = NuxeoSession()
         self._session.hooks["response"] = [log_response]
         cookies = kwargs.pop("cookies", None)
         if cookies:
@@ -121,12 +317,23 @@ class NuxeoClient(object):
         self._session.stream = True
         self.client_kwargs = kwargs
 
+        # Calls skipping the Requests machinery, see .request()
+        self._transport = None  # type: Optional[DirectTransport]
+        if transport == "urllib3":
+            self._transport = DirectTransport(self._session)
+
         self.ssl_verify_needed = kwargs.get("verify", True)
 
         atexit.register(self.on_exit)
 
-        # Cache for the server information
+        # Cache for the server information, and the operations registry (see operations.API),
+        # each downloaded under its own lock so that other calls do not wait for it
         self._server_info = None
+        self._server_info_lock = RLock()
+        self._operations = None  # type: Optional[Dict[str, Any]]
+        self._operations_lock = RLock()
+        # Operation and params validator of each operation name, published with the operations
+        self._registry = {}  # type: Dict[str, Tuple[Dict[str, Any], Any]]
 
         # Mapper: username -> generated UUID.
         # Populated automatically when a user entity response is received.
@@ -142,18 +349,139 @@ class NuxeoClient(object):
         # Install the retries mecanism
         self.enable_retry()
 
+        # Health checks of nodes use their own session, see ._is_healthy()
+        self._health_session = None  # type: Optional[requests.Session]
+        if self.hosts is not None:
+            self._health_session = requests.Session()
+            self.hosts.start(self._is_healthy)
+
+        # Connections are started afresh in child processes, see ._after_fork()
+        _CLIENTS.add(self)
+
     def __repr__(self):
         # type: () -> str
         return f"{type(self).__name__}<host={self.host!r}, version={self.server_version!r}>"
 
+    def _after_fork(self):
+        # type: () -> None
+        """
+        Start afresh in a child process: connections are shared with the parent
+        process, and answers would be mixed up if both used them. Connection pools
+        are dropped without being closed, the parent process still uses them.
+        """
+        parent = self._session
+        self._session = NuxeoSession()
+        for attr in NuxeoSession.__attrs__:
+            if attr != "adapters":
+                setattr(self._session, attr, getattr(parent, attr))
+        self._pool_stats = PoolStats()
+        self._mount_adapters(max_retries=parent.adapters["https://"].max_retries)
+        if self._transport is not None:
+            self._transport = DirectTransport(self._session)
+
+        # Threads of the parent do not exist here, and its locks may be held
+        self._lock = RLock()
+        self._server_info_lock = RLock()
+        self._operations_lock = RLock()
+        self._executor = None
+        self._worker = local()
+        self.buffer_pool.after_fork()
+        budget = getattr(self.retries, "budget", None)
+        for component in (
+            budget,
+            self.limiter,
+            self.rate_limiter,
+            self.cache,
+            self.metrics,
+            self.compression,
+            self.server_cache,
+        ):
+            if component is not None:
+                component.after_fork()
+        if self.hosts is not None:
+            self._health_session = requests.Session()
+            self.hosts.after_fork(self._is_healthy)
+
     def __str__(self):
         # type: () -> str
         return repr(self)
 
     def on_exit(self):
         # type: () -> None
+        if self._executor:
+            self._executor.shutdown(wait=False)
+        if self.hosts is not None:
+            self.hosts.stop()
+        if self._health_session is not None:
+            self._health_session.close()
         self._session.close()
 
+    @property
+    def executor(self):
+        # type: () -> ThreadPoolExecutor
+        """The executor running calls in the background, created on first use."""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="nuxeo",
+                        initializer=self._init_worker,
+                    )
+        return self._executor
+
+    def _init_worker(self):
+        # type: () -> None
+        self._worker.active = True
+
+    @property
+    def in_executor(self):
+        # type: () -> bool
+        """Whether the current thread is one of the client executor."""
+        return getattr(self._worker, "active", False)
+
+    def submit(self, func, *args, **kwargs):
+        # type: (Callable, Any, Any) -> Future
+        """
+        Run ``func(*args, **kwargs)`` in the client executor.
+
+        At most *max_workers* calls run at the same time, others are queued.
+
+        :return: the future of the call
+        """
+        return self.executor.submit(func, *args, **kwargs)
+
+    def submit_nested(self, func, *args, **kwargs):
+        # type: (Callable, Any, Any) -> Future
+        """
+        Like :func:`submit`, for calls made by methods waiting for their results.
+
+        When the current thread already is a worker of the executor, the call
+        is run right away in it: queuing it would block the worker until
+        another one is free, and all of them when they all do the same.
+
+        :return: the future of the call
+        """
+        if not self.in_executor:
+            return self.submit(func, *args, **kwargs)
+
+        future = Future()  # type: Future
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def map(self, func, *iterables):
+        # type: (Callable, Iterable[Any]) -> List[Future]
+        """
+        Run *func* in the client executor for each set of arguments
+        taken from *iterables*, like the builtin map().
+
+        :return: the futures of the calls, in the order of the arguments
+        """
+        return [self.submit(func, *args) for args in zip(*iterables)]
+
     def _translate_user_entity(self, data):
         # type: (Any) -> Any
         """Detect user entity responses and replace UUID *id* with username.
@@ -171,7 +499,8 @@ class NuxeoClient(object):
                 uuid_val = data.get("id")
                 username = (data.get("properties") or {}).get("username")
                 if uuid_val and username and uuid_val != username:
-                    self.userid_mapper[username] = uuid_val
+                    with self._lock:
+                        self.userid_mapper[username] = uuid_val
                     data["id"] = username
             else:
                 # Walk into "entries" lists (search / list responses)
@@ -184,13 +513,63 @@ class NuxeoClient(object):
                 self._translate_user_entity(item)
         return data
 
+    @property
+    def pool_kwargs(self):
+        # type: () -> Dict[str, Any]
+        """Connection pools settings given to transport adapters."""
+        maxsize = self.pool_maxsize
+        if maxsize == "auto":
+            # Keep one connection per worker thread
+            maxsize = max(DEFAULT_POOLSIZE, self.max_workers)
+        return {
+            "pool_connections": self.pool_connections,
+            "pool_maxsize": maxsize,
+            "pool_block": self.pool_block,
+            "stats": self._pool_stats,
+        }
+
+    def pool_stats(self):
+        # type: () -> Dict[str, Any]
+        """
+        Statistics about the usage of the connection pools:
+
+            - active: connections currently used by a request
+            - idle: open connections waiting in pools
+            - discarded: connections closed because their pool was full
+            - new_connections: connections opened since the creation of the client
+            - requests: connections taken from pools
+            - reused_connections: connections reused instead of being opened
+            - wait_time: total time spent getting a connection, in seconds
+
+        A high number of discarded connections means *pool_maxsize* is too low
+        for the number of threads using the client.
+        """
+        idle = sum(
+            adapter.idle_connections()
+            for adapter in self._session.adapters.values()
+            if isinstance(adapter, StatsHTTPAdapter)
+        )
+        return self._pool_stats.as_dict(idle=idle)
+
+    def retry_stats(self):
+        # type: () -> Dict[str, Any]
+        """
+        Statistics about the retries of HTTP calls:
+
+            - requests: requests sent since the creation of the client
+            - retries: calls retried, also counted per endpoint in *endpoints*
+            - rejected: retries not done because the budget was exhausted
+            - balance: the number of retries currently allowed
+
+        An empty dict is returned when the retry policy has no budget.
+        """
+        budget = getattr(self.retries, "budget", None)
+        return budget.as_dict() if budget is not None else {}
+
     def enable_retry(self):
         # type: () -> None
         """Set a max retry for all connection errors with an adaptative backoff."""
-        self._session.mount(
-            "https://", TCPKeepAliveHTTPSAdapter(max_retries=self.retries)
-        )
-        self._session.mount("http://", HTTPAdapter(max_retries=self.retries))
+        self._mount_adapters(max_retries=self.retries)
 
     def disable_retry(self):
         # type: () -> None
@@ -199,8 +578,21 @@ class NuxeoClient(object):
         adapters set with .enable_retry().
         """
         self._session.close()
-        self._session.mount("https://", TCPKeepAliveHTTPSAdapter())
-        self._session.mount("http://", HTTPAdapter())
+        self._mount_adapters()
+
+    def _mount_adapters(self, **kwargs):
+        # type: (Any) -> None
+        """Mount the transport adapters, *kwargs* are given to their constructor."""
+        if self.transport == "http2":
+            from .tcp.http2 import HTTP2Adapter
+
+            adapter = HTTP2Adapter(**self.pool_kwargs, **kwargs)
+            self._session.mount("https://", adapter)
+            self._session.mount("http://", adapter)
+            return
+
+        self._session.mount("https://", TCPKeepAliveHTTPSAdapter(**self.pool_kwargs, **kwargs))
+        self._session.mount("http://", StatsHTTPAdapter(**self.pool_kwargs, **kwargs))
 
     def query(
         self,
@@ -261,25 +653,26 @@ class NuxeoClient(object):
         :param data: data to put in the body
         :param raw: if True, don't parse the data to JSON
         :param kwargs: other parameters accepted by
-               :func:`requests.request`
+               :func:`requests.request`, *cache* set to False
+               to bypass the responses cache, *enrichers* the document enrichers
+               to use, *schemas* the document schemas to get instead of the client
+               ones, and with several nodes,
+               *host* to target one of them or *sticky* a key sending calls
+               given the same one to the same node (the batch ID of upload calls),
+               *allow_redirects* set to False to get redirections instead of following them
         :return: the HTTP response
         """
-        if method not in (
-            "GET",
-            "HEAD",
-            "POST",
-            "PUT",
-            "DELETE",
-            "CONNECT",
-            "OPTIONS",
-            "TRACE",
-        ):
+        if method not in HTTP_METHODS:
             raise BadQuery("method parameter is not a valid HTTP method.")
 
         # Construct the full URL without double slashes
-        url = self.host + path.lstrip("/")
+        path = path.lstrip("/")
+        url = self.host + path
         if "adapter" in kwargs:
             url = f"{url}/@{kwargs.pop('adapter')}"
+        host = kwargs.pop("host", None)
+        sticky = kwargs.pop("sticky", None)
+        allow_redirects = kwargs.pop("allow_redirects", True)
 
         kwargs.update(self.client_kwargs)
 
@@ -291,18 +684,18 @@ class NuxeoClient(object):
         headers = headers or {}
         if "Content-Type" not in headers:
             headers["Content-Type"] = kwargs.pop("content_type", "application/json")
-        headers.update(
-            {"X-NXDocumentProperties": self.schemas, "X-NXRepository": self.repository}
-        )
         enrichers = kwargs.pop("enrichers", None)
         if enrichers:
             headers["enrichers-document"] = ", ".join(enrichers)
+        schemas = kwargs.pop("schemas", None)
 
-        headers.update(self.headers)
+        headers.update(self._static_headers())
+        if schemas:
+            headers["X-NXDocumentProperties"] = ",".join(schemas) if isinstance(schemas, list) else schemas
         self._check_headers_and_params_format(headers, kwargs.get("params") or {})
 
         if data and not isinstance(data, bytes) and not raw:
-            data = json.dumps(data, default=json_helper)
+            data = self.codec.dumps(data)
 
         # Set the default value to `object` to allow someone
         # to set `default` to `None`.
@@ -311,14 +704,16 @@ class NuxeoClient(object):
         # Allow to pass a custom authentication class
         auth = kwargs.pop("auth", None) or self.auth
 
-        _kwargs = {k: v for k, v in kwargs.items() if k != "params"}
-        logged_params = kwargs.get("params", {} if raw else data)
-        logger.debug(
-            (
-                f"Calling {method} {url!r} with headers={headers!r},"
-                f" params={logged_params!r}, kwargs={_kwargs!r}"
+        if logger.isEnabledFor(logging.DEBUG):
+            _kwargs = {k: v for k, v in kwargs.items() if k != "params"}
+            logger.debug(
+                "Calling %s %r with headers=%r, params=%r, kwargs=%r",
+                method,
+                url,
+                headers,
+                kwargs.get("params", {} if raw else data),
+                _kwargs,
             )
-        )
 
         exc = None
 
@@ -330,18 +725,90 @@ class NuxeoClient(object):
                 ssl_verify = False
             kwargs.pop("verify")
 
+        cache = self.cache if kwargs.pop("cache", True) else None
+        cache_key = cached = None
+        if cache is not None and method == "GET":
+            cache_key = cache.key(url, kwargs.get("params"), headers, auth)
+            cached, resp = cache.lookup(cache_key)
+            if resp is not None:
+                return self._wrap_response(resp)
+            if cached:
+                # Endpoints may give their own headers dict, it must not keep validators
+                headers = {**headers, **cached.validators()}
+
+        budget = getattr(self.retries, "budget", None)
+        if budget is not None:
+            budget.deposit()
+
+        rate_limiter = self.rate_limiter
+        if rate_limiter is not None:
+            rate_limiter.acquire_request(size=super_len(data) if data else 0)
+
+        limiter = self.limiter
+        overloaded = False
+        metrics = self.metrics
+        if metrics is not None:
+            pool_wait = self._pool_stats.thread_wait_time()
+        answer = None  # The last response received
+        redirects = 0
+        error = None
+
+        # The URL actually called, on the chosen node
+        target = url
+        hosts = self.hosts
+        node = None
+        if host:
+            target = host.rstrip("/") + "/" + url[len(self.host):]
+
+        tracer = self.tracer
+        span = None
+        compression = self.compression
+        body = None
+
+        # Resources are released in the finally clause, only the ones actually acquired
+        acquired = False
+        start = None  # Set once the call is sent
+
         try:
-            resp = self._session.request(
-                method,
-                url,
-                headers=headers,
-                auth=auth,
-                data=data,
-                allow_redirects=False,
-                verify=ssl_verify,
-                **kwargs,
-            )
-            if resp.status_code in range(301, 309):
+            if limiter is not None:
+                limiter.acquire()
+                acquired = True
+
+            if not host and hosts is not None:
+                node = hosts.acquire(sticky or sticky_key(path))
+                target = node.url + url[len(self.host):]
+
+            if tracer.enabled:
+                span = tracer.start_span(
+                    method,
+                    {
+                        "http.request.method": method,
+                        "url.full": target,
+                        "nuxeo.endpoint": endpoint_template(url[len(self.host):]),
+                    },
+                )
+                headers = tracer.inject(headers, span)
+
+            # Redirections and retries after a refused compressed body send data as it is
+            if compression is not None and data and not raw and "Content-Encoding" not in headers:
+                body = compression.compress(urlsplit(target).netloc, data)
+
+            start = monotonic()
+            if body is None:
+                resp = self._send(method, target, headers, auth, data, ssl_verify, kwargs)
+            else:
+                resp = self._send(
+                    method, target, {**headers, "Content-Encoding": "gzip"}, auth, body, ssl_verify, kwargs
+                )
+                if is_rejection(resp):
+                    resp.close()
+                    body = None
+                    resp = self._send(method, target, headers, auth, data, ssl_verify, kwargs)
+                    if resp.status_code not in REJECTED_STATUS_CODES:
+                        compression.reject(urlsplit(target).netloc)
+            answer = resp
+            if allow_redirects and 301 <= resp.status_code <= 308 and resp.status_code != 304:
+                redirects = 1
                 try:
                     redirect_url = resp.headers["Location"]
                 except Exception:
@@ -360,15 +827,26 @@ class NuxeoClient(object):
                 else:
                     resp = self._session.request(
                         method,
-                        url,
+                        target,
                         headers=headers,
                         auth=auth,
                         data=data,
                         verify=ssl_verify,
                         **kwargs,
                     )
+                answer = resp
+            if limiter is not None:
+                overloaded = is_overloaded(resp)
+            if rate_limiter is not None:
+                rate_limiter.charge_bytes(int(resp.headers.get("Content-Length") or 0))
             resp.raise_for_status()
         except Exception as exc:
+            error = exc
+            if start is None:
+                # The call was not sent
+                raise
+            if limiter is not None:
+                overloaded = overloaded or is_overloaded(exc)
             if default is object:
                 raise self._handle_error(exc)
             resp = default
@@ -376,9 +854,98 @@ class NuxeoClient(object):
             # Explicitly break a reference cycle
             exc = None
             del exc
+            if start is None:
+                if node is not None:
+                    hosts.cancel(node)
+                if acquired:
+                    limiter.cancel()
+            else:
+                latency = monotonic() - start
+                if node is not None:
+                    hosts.release(node, latency, failed=is_failure(answer, error))
+                if acquired:
+                    limiter.release(latency, overloaded=overloaded)
+                if metrics is not None:
+                    sent = data if body is None else body
+                    self._record_metrics(method, url, sent, answer, redirects, latency, pool_wait)
+            if span is not None:
+                tracer.end_span(span, response=answer, error=error)
+            error = None
+
+        if cache is not None and isinstance(resp, requests.Response):
+            if cache_key:
+                resp = cache.update(cache_key, cached, resp, url=url)
+            elif method != "GET":
+                # The resource may have changed
+                cache.invalidate(url)
+
+        return self._wrap_response(resp)
+
+    def _send(self, method, url, headers, auth, data, ssl_verify, kwargs):
+        # type: (str, str, Dict[str, str], Any, Any, Any, Dict[str, Any]) -> requests.Response
+        """Send one call, without following redirections."""
+        transport = self._transport
+        if transport is not None and transport.supports(auth, data, kwargs):
+            return transport.request(method, url, headers, auth=auth, data=data, verify=ssl_verify, **kwargs)
+        return self._session.request(
+            method,
+            url,
+            headers=headers,
+            auth=auth,
+            data=data,
+            allow_redirects=False,
+            verify=ssl_verify,
+            **kwargs,
+        )
+
+    def _record_metrics(self, method, url, data, resp, redirects, latency, pool_wait):
+        # type: (str, str, Any, Optional[requests.Response], int, float, float) -> None
+        """Give a call details to the metrics collector, *data* being the body sent."""
+        metrics = self.metrics
+        endpoint = endpoint_template(url[len(self.host):])
+        status = "error"
+        sent = received = retries = 0
+        if isinstance(data, GzipStream):
+            # The compressed size is only known once sent
+            sent = data.tell()
+        elif data:
+            sent = super_len(data)
+        phases = None
+        if resp is not None:
+            status = str(resp.status_code)
+            received = int(resp.headers.get("Content-Length") or 0)
+            redirects += len(resp.history)
+            history = getattr(getattr(resp.raw, "retries", None), "history", None) or ()
+            retries = sum(1 for attempt in history if attempt.redirect_location is None)
+            timings = get_timings(resp)
+            if timings is not None:
+                phases = timings.phases()
+                # The body is likely not read yet
+                timings.when_complete(
+                    lambda timings: metrics.observe_phase(method, endpoint, "transfer", timings.transfer)
+                )
 
-        # Intercept JSON responses to translate user entity UUIDs
-        if isinstance(resp, requests.Response):
+        metrics.observe(
+            method,
+            endpoint,
+            status,
+            latency,
+            sent=sent,
+            received=received,
+            retries=retries,
+            redirects=redirects,
+            pool_wait=self._pool_stats.thread_wait_time() - pool_wait,
+            phases=phases,
+        )
+
+    def _wrap_response(self, resp):
+        # type: (Any) -> Any
+        """Intercept JSON responses to translate user entity UUIDs."""
+        if type(resp) is requests.Response:
+            resp.__class__ = NuxeoResponse
+            resp._nuxeo_client = self
+        elif isinstance(resp, requests.Response):
+            # Response-like objects that cannot be converted (mocks, subclasses)
             _original_json = resp.json
 
             def _translated_json(**kw):
@@ -389,21 +956,43 @@ class NuxeoClient(object):
 
         return resp
 
+    def _static_headers(self):
+        # type: () -> Dict[str, str]
+        """Headers sent with every request, computed once per repository and schemas."""
+        key = (self.repository, self.schemas)
+        cached = self._static_headers_cache
+        if cached is None or cached[0] != key:
+            headers = {"X-NXDocumentProperties": self.schemas, "X-NXRepository": self.repository}
+            cached = self._static_headers_cache = (key, headers)
+        # Client headers can be changed at any time, they are not part of the cache
+        return {**cached[1], **self.headers}
+
     def _check_headers_and_params_format(self, headers, params):
         # type: (Dict[str, Any], Dict[str, Any]) -> None
         """Check headers and params keys for dots or underscores and throw a warning if one is found."""
 
+        # Keys already known to be well formatted are not checked again,
+        # bad ones are checked every time to keep warning about them.
+        valid_keys = self._valid_keys
         msg = "{!r} {} should not contain '_' nor '.'. Replace with '-' to get rid of that warning."
 
         for key in headers.keys():
+            if key in valid_keys:
+                continue
             if "_" in key or "." in key:
                 warn(msg.format(key, "header"), DeprecationWarning, 2)
+            elif len(valid_keys) < MAX_VALID_KEYS:
+                valid_keys.add(key)
 
         if not isinstance(params, dict):
             return
         for key in params.keys():
+            if key in valid_keys:
+                continue
             if "_" in key or "." in key:
                 warn(msg.format(key, "param"), DeprecationWarning, 2)
+            elif len(valid_keys) < MAX_VALID_KEYS:
+                valid_keys.add(key)
 
     def request_auth_token(
         self,
@@ -442,30 +1031,68 @@ class NuxeoClient(object):
             self.auth = auth
         return token
 
-    def is_reachable(self):
-        # type: () -> bool
-        """Check if the Nuxeo Platform is reachable."""
-        response = self.request("GET", "runningstatus", default=False)
+    def is_reachable(self, host=None):
+        # type: (Optional[str]) -> bool
+        """
+        Check if the Nuxeo Platform is reachable.
+
+        :param host: the url of the node to check, by default the one chosen for the call
+        """
+        response = self.request("GET", "runningstatus", default=False, host=host)
         if isinstance(response, requests.Response):
             return response.ok
         else:
             return bool(response)
 
+    def _is_healthy(self, url):
+        # type: (str) -> bool
+        """
+        Check the health of the node at *url* with a single bare call: no retries, and
+        no limiter, retry budget, metrics nor tracing, those are about the calls of users.
+        """
+        try:
+            with self._health_session.get(
+                url.rstrip("/") + "/runningstatus",
+                auth=self.auth,
+                timeout=HEALTH_CHECK_TIMEOUT,
+                verify=self._session.verify if self.ssl_verify_needed else False,
+                cert=self._session.cert,
+                proxies=self._session.proxies,
+                allow_redirects=False,
+            ) as resp:
+                return resp.ok
+        except requests.RequestException as exc:
+            logger.debug("Health check of %r failed: %s", url, exc)
+            return False
+
     def server_info(self, force=False, ssl_verify=True):
         # type: (bool, bool) -> Dict[str, str]
         """
         Retreive server information.
 
-        :param bool force: Force information renewal.
+        :param bool force: Force information renewal, also in the server cache.
         """
         if force or self._server_info is None:
-            try:
-                response = self.request("GET", "json/cmis", ssl_verify=ssl_verify)
-                self._server_info = response.json()["default"]
-            except Exception:
-                logger.warning(
-                    "Invalid response data when called server_info()", exc_info=True
-                )
+            with self._server_info_lock:
+                # Another thread may have fetched it in the meantime
+                if force or self._server_info is None:
+                    cache = self.server_cache
+                    if cache is not None and not force:
+                        self._server_info = cache.load(self.host, "server_info")
+                    if self._server_info is None or force:
+                        try:
+                            response = self.request(
+                                "GET", "json/cmis", ssl_verify=ssl_verify
+                            )
+                            self._server_info = response.json()["default"]
+                        except Exception:
+                            logger.warning(
+                                "Invalid response data when called server_info()",
+                                exc_info=True,
+                            )
+                        else:
+                            if cache is not None:
+                                cache.save(self.host, "server_info", self._server_info)
         return self._server_info
 
     @property
@@ -473,7 +1100,7 @@ class NuxeoClient(object):
         # type: (bool) -> str
         """Return the server version or "unknown"."""
         try:
-            return self.server_info(ssl_verify)["productVersion"]
+            return self.server_info(ssl_verify=ssl_verify)["productVersion"]
         except Exception:
             return "unknown"
 
@@ -506,21 +1133,56 @@ class NuxeoClient(object):
         return HTTP_ERROR.get(status, HTTPError).parse(error_data)
 
 
+class _Endpoint(object):
+    """
+    An API endpoint of :class:`Nuxeo`, created on first access: its module
+    is only imported then. *requires* are the endpoints given to its constructor.
+    """
+
+    __slots__ = ("module", "requires", "name")
+
+    # Endpoints may be first used by several threads at the same time
+    _lock = RLock()
+
+    def __init__(self, module, *requires):
+        # type: (str, str) -> None
+        self.module = module
+        self.requires = requires
+        self.name = module
+
+    def __set_name__(self, owner, name):
+        # type: (Type[Any], str) -> None
+        self.name = name
+
+    def __get__(self, instance, owner):
+        # type: (Any, Type[Any]) -> Any
+        if instance is None:
+            return self
+        with self._lock:
+            api = instance.__dict__.get(self.name)
+            if api is None:
+                cls = import_module(f".{self.module}", __package__).API
+                api = cls(instance.client, *(getattr(instance, name) for name in self.requires))
+                instance.__dict__[self.name] = api
+        return api
+
+
 class Nuxeo(object):
     """
-    Instantiate the client and all the API Endpoints.
+    Instantiate the client, API endpoints are created on first use.
 
     :param auth: the authenticator
-    :param host: the host URL
+    :param host: the host URL, or the URLs of the nodes of a cluster
     :param app_name: the name of the application using the client
     :param client: the client class
     :param kwargs: any other argument to forward to every requests calls
+    (except client settings like *max_workers*)
     """
 
     def __init__(
         self,
         auth=None,  # type: Optional[Tuple[str, str]]
-        host=DEFAULT_URL,  # type: str
+        host=DEFAULT_URL,  # type: Union[str, Sequence[str], HostPool]
         app_name=DEFAULT_APP_NAME,  # type: str
         version=__version__,  # type: str
         verify=True,  # bool
@@ -532,17 +1194,16 @@ class Nuxeo(object):
         self.client = client(
             auth, host=host, app_name=app_name, version=version, **kwargs
         )
-        self.comments = comments.API(self.client)
-        self.operations = operations.API(self.client)
-        self.directories = directories.API(self.client)
-        self.groups = groups.API(self.client)
-        self.tasks = tasks.API(self.client)
-        self.uploads = uploads.API(self.client)
-        self.users = users.API(self.client)
-        self.workflows = workflows.API(self.client, self.tasks)
-        self.documents = documents.API(
-            self.client, self.operations, self.workflows, self.comments
-        )
+
+    comments = _Endpoint("comments")
+    operations = _Endpoint("operations")
+    directories = _Endpoint("directories")
+    groups = _Endpoint("groups")
+    tasks = _Endpoint("tasks")
+    uploads = _Endpoint("uploads")
+    users = _Endpoint("users")
+    workflows = _Endpoint("workflows", "tasks")
+    documents = _Endpoint("documents", "operations", "workflows", "comments")
 
     def __repr__(self):
         # type: () -> str
@@ -552,6 +1213,26 @@ class Nuxeo(object):
         # type: () -> str
         return repr(self)
 
+    def submit(self, func, *args, **kwargs):
+        # type: (Callable, Any, Any) -> Future
+        """
+        Run ``func(*args, **kwargs)`` in the background, see :func:`NuxeoClient.submit`.
+
+            >>> future = nuxeo.submit(nuxeo.documents.get, uid=uid)
+            >>> doc = future.result()
+        """
+        return self.client.submit(func, *args, **kwargs)
+
+    def map(self, func, *iterables):
+        # type: (Callable, Iterable[Any]) -> List[Future]
+        """
+        Run *func* in the background for each set of arguments, see :func:`NuxeoClient.map`.
+
+            >>> futures = nuxeo.map(nuxeo.users.get, ["alice", "bob"])
+            >>> users = [future.result() for future in futures]
+        """
+        return self.client.map(func, *iterables)
+
     def can_use(self, operation):
         # type: (str) -> str
         """Return a boolean to let the caller know if the given *operation* can be used."""
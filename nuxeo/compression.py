@@ -0,0 +1,191 @@
+# coding: utf-8
+"""
+Gzip compression of JSON request bodies, for slow links to the server.
+See the *compression* argument of NuxeoClient.
+
+Servers do not all accept compressed bodies: a call answered with a 415
+status code, or a 400 one whose error is about the body encoding, is sent
+again uncompressed, and when that one works, bodies are no more compressed
+for that server.
+"""
+import logging
+import zlib
+from threading import Lock
+from typing import Iterator, Optional, Set, Union
+
+from requests import Response
+
+from .constants import (
+    COMPRESSION_CHUNK_SIZE,
+    COMPRESSION_LEVEL,
+    COMPRESSION_MIN_SIZE,
+    COMPRESSION_STREAM_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Status codes of servers not understanding a compressed body
+REJECTED_STATUS_CODES = frozenset([400, 415])
+
+# Words found in 400 errors of servers failing to read a compressed body, like "Not in GZIP format"
+_REJECTION_HINTS = ("gzip", "encoding", "compress")
+
+# Window bits of zlib producing the gzip format
+_GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def gzip_compress(data, level=COMPRESSION_LEVEL):
+    # type: (bytes, int) -> bytes
+    """Compress *data* in the gzip format."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, _GZIP_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def is_rejection(resp):
+    # type: (Response) -> bool
+    """Check if *resp* tells that the server did not understand the compressed body sent."""
+    if resp.status_code == 415:
+        return True
+    if resp.status_code != 400:
+        return False
+    # A 400 error is usually about the content of the body
+    error = resp.content[:4096].decode("utf-8", errors="replace").lower()
+    return any(hint in error for hint in _REJECTION_HINTS)
+
+
+class GzipStream(object):
+    """
+    File-like object compressing *data* by chunks while it is read, so that
+    sending a big body starts without waiting for the whole of it to be compressed.
+
+    It is sent with the chunked transfer encoding, as its size is unknown.
+    Seeking back to the start, to send it again, starts the compression again.
+
+    :param data: The uncompressed data
+    :param level: The compression level, from 1 (fastest) to 9 (smallest)
+    :param chunk_size: The size of uncompressed data compressed at once
+    """
+
+    __slots__ = ("data", "level", "chunk_size", "_compressor", "_offset", "_buffer", "_position")
+
+    def __init__(self, data, level=COMPRESSION_LEVEL, chunk_size=COMPRESSION_CHUNK_SIZE):
+        # type: (bytes, int, int) -> None
+        self.data = memoryview(data)
+        self.level = level
+        self.chunk_size = chunk_size
+        self.seek(0)
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<size={len(self.data)}, position={self._position}>"
+
+    def __iter__(self):
+        # type: () -> Iterator[bytes]
+        while True:
+            chunk = self.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def _fill(self, size):
+        # type: (int) -> None
+        """Compress data until *size* bytes are available, or everything is compressed."""
+        while len(self._buffer) < size and self._compressor is not None:
+            end = self._offset + self.chunk_size
+            self._buffer += self._compressor.compress(self.data[self._offset:end])
+            self._offset = end
+            if end >= len(self.data):
+                self._buffer += self._compressor.flush()
+                self._compressor = None
+
+    def read(self, size=-1):
+        # type: (Optional[int]) -> bytes
+        """Read *size* compressed bytes at most, or everything left."""
+        if size is None or size < 0:
+            size = len(self.data) + 1024
+        self._fill(size)
+        chunk = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        self._position += len(chunk)
+        return chunk
+
+    def tell(self):
+        # type: () -> int
+        return self._position
+
+    def seek(self, offset, whence=0):
+        # type: (int, int) -> int
+        """Only seeking back to the start is possible, the compressed size is not known."""
+        if offset or whence:
+            raise OSError("a compressed stream can only be rewound")
+        self._compressor = zlib.compressobj(self.level, zlib.DEFLATED, _GZIP_WBITS)
+        self._offset = 0
+        self._buffer = bytearray()
+        self._position = 0
+        return 0
+
+
+class Compression(object):
+    """
+    Compress JSON request bodies with gzip.
+
+    :param min_size: Bodies smaller than that are sent as they are
+    :param stream_size: Bodies bigger than that are compressed while being sent,
+           see :class:`GzipStream`
+    :param level: The compression level, from 1 (fastest) to 9 (smallest)
+    """
+
+    __slots__ = ("min_size", "stream_size", "level", "_lock", "_rejected")
+
+    def __init__(
+        self,
+        min_size=COMPRESSION_MIN_SIZE,  # type: int
+        stream_size=COMPRESSION_STREAM_SIZE,  # type: int
+        level=COMPRESSION_LEVEL,  # type: int
+    ):
+        # type: (...) -> None
+        self.min_size = min_size
+        self.stream_size = stream_size
+        self.level = level
+        self._lock = Lock()
+        # Servers that do not accept compressed bodies
+        self._rejected = set()  # type: Set[str]
+
+    def __repr__(self):
+        # type: () -> str
+        return (
+            f"{type(self).__name__}<min_size={self.min_size}, stream_size={self.stream_size},"
+            f" level={self.level}, rejected={sorted(self._rejected)!r}>"
+        )
+
+    def after_fork(self):
+        # type: () -> None
+        """Reset the lock shared with the parent process, in a child process."""
+        self._lock = Lock()
+
+    def compress(self, server, data):
+        # type: (str, Union[str, bytes]) -> Optional[Union[bytes, GzipStream]]
+        """The compressed body to send to *server*, None to send *data* as it is."""
+        if server in self._rejected:
+            return None
+        if isinstance(data, str):
+            # Sizes are in bytes
+            data = data.encode("utf-8")
+        if len(data) < self.min_size:
+            return None
+        if len(data) >= self.stream_size:
+            return GzipStream(data, level=self.level)
+        return gzip_compress(data, level=self.level)
+
+    def reject(self, server):
+        # type: (str) -> None
+        """Stop compressing bodies sent to *server*."""
+        with self._lock:
+            if server not in self._rejected:
+                logger.info("%s does not accept compressed request bodies", server)
+            self._rejected.add(server)
+
+    def is_rejected(self, server):
+        # type: (str) -> bool
+        """Check if *server* does not accept compressed bodies."""
+        return server in self._rejected
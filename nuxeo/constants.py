@@ -6,6 +6,54 @@ LINUX = platform.startswith("linux")
 MAC = platform == "darwin"
 WINDOWS = platform == "win32"
 
+# Polling of asynchronous operations (the @async adapter), in seconds.
+# The delay between two status checks starts at ASYNC_POLL_DELAY and is doubled
+# after each check, up to ASYNC_POLL_DELAY_MAX.
+ASYNC_POLL_DELAY = 0.5
+ASYNC_POLL_DELAY_MAX = 10
+ASYNC_POLL_TIMEOUT = 60 * 60
+
+# Number of threads of the client executor (see Nuxeo.submit() and Nuxeo.map())
+MAX_WORKERS = 4
+
+# Maximum memory used by the transfer buffers pool (see buffers.BufferPool)
+BUFFER_POOL_MAX_SIZE = 256 * 1024 * 1024  # 256 MiB
+
+# Responses cache (see cache.ResponseCache): maximum memory used by cached contents,
+# and size above which a response is not cached
+CACHE_MAX_SIZE = 32 * 1024 * 1024  # 32 MiB
+CACHE_MAX_ENTRY_SIZE = 1024 * 1024  # 1 MiB
+
+# Gzip compression of JSON request bodies (see compression.Compression): size from which
+# bodies are compressed, size from which they are compressed while being sent,
+# size of the data compressed at once in that case, and compression level
+COMPRESSION_MIN_SIZE = 16 * 1024  # 16 KiB
+COMPRESSION_STREAM_SIZE = 4 * 1024 * 1024  # 4 MiB
+COMPRESSION_CHUNK_SIZE = 256 * 1024  # 256 KiB
+COMPRESSION_LEVEL = 6
+
+# JSON codec of request bodies and responses: "json" (standard library), "orjson", "ujson",
+# or "auto" to use the fastest installed one (see json_codecs.py)
+JSON_CODEC = "json"
+
+# Duration the server information and the operations registry saved on disk
+# are used for, in seconds (see server_cache.ServerCache)
+SERVER_CACHE_MAX_AGE = 24 * 60 * 60
+
+# Page iterators (see pagination.PageIterator): the default number of entries per page,
+# and when the page size is auto-tuned, its bounds and the duration and size aimed at for a page
+PAGE_SIZE = 100
+PAGE_SIZE_MIN = 10
+PAGE_SIZE_MAX = 1000
+PAGE_TARGET_DURATION = 1.0  # seconds
+PAGE_TARGET_SIZE = 4 * 1024 * 1024  # 4 MiB
+
+# Queries of documents.get_many(): the maximum number of documents fetched by one query
+# (the default maximum page size of the server), and the maximum size of the URL encoded
+# NXQL, so that the request line stays well under the 8 KiB limit of common servers
+GET_MANY_CHUNK_SIZE = 1000
+GET_MANY_QUERY_SIZE = 4 * 1024  # 4 KiB
+
 # Force parameters verification for all operations
 CHECK_PARAMS = False
 
@@ -21,6 +69,13 @@ DEFAULT_URL = "http://localhost:8080/nuxeo/"
 #   - 'applicationName' URL parameter
 DEFAULT_APP_NAME = "Python client"
 
+# Cluster nodes (see hosts.HostPool): delay between two health checks and their timeout, in seconds,
+# failures in a row before ejecting a node, and base duration of an ejection, in seconds
+HEALTH_CHECK_INTERVAL = 10
+HEALTH_CHECK_TIMEOUT = 5
+HOST_MAX_FAILURES = 5
+HOST_EJECTION_TIME = 30
+
 # Name of the HTTP header for idempotent requests
 IDEMPOTENCY_KEY = "Idempotency-Key"
 
@@ -30,11 +85,17 @@ LOG_LIMIT_SIZE = 5 * 1024 * 1024  # 5 MiB
 # Retries for each HTTP call on conection error
 MAX_RETRY = 5
 
-# Backoff factor between each retry
-# Ex: with 0.2 then sleep() will sleep for [0.2s, 0.4s, 0.8s, ...] between retries
-# Ex: with 1 then sleep() will sleep for [1s, 2s, 4s, ...] between retries
+# Backoff factor between each retry, the shortest sleep between two attempts
+# Ex: with 1 then sleep() will sleep for a random duration between 1s and
+# three times the previous sleep, see nuxeo.retry.NuxeoRetry
 RETRY_BACKOFF_FACTOR = 1
 
+# Share of the requests that can be retried, see nuxeo.retry.RetryBudget
+RETRY_BUDGET_RATIO = 0.1
+
+# Retries allowed per second whatever the traffic, see nuxeo.retry.RetryBudget
+RETRY_BUDGET_MIN_PER_SECOND = 1.0
+
 # HTTP methods we want to handle in retries
 RETRY_METHODS = frozenset(["GET", "POST", "PUT", "DELETE"])
 
@@ -55,6 +116,10 @@ TCP_KEEPIDLE = 60
 TIMEOUT_CONNECT = 10
 TIMEOUT_READ = 60 * 10
 
+# How HTTP requests are sent: "requests" (HTTP/1.1), "http2" (see tcp/http2.py)
+# or "urllib3" (HTTP/1.1 without the Requests overhead, see tcp/direct.py)
+TRANSPORT = "requests"
+
 # Size of chunks for the upload
 UPLOAD_CHUNK_SIZE = 20 * 1024 * 1024  # 20 MiB
 
@@ -1,7 +1,11 @@
 # coding: utf-8
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote_plus
 
 from .comments import API as CommentsAPI
+from .constants import GET_MANY_CHUNK_SIZE, GET_MANY_QUERY_SIZE
 from .endpoint import APIEndpoint
 from .exceptions import (
     BadQuery,
@@ -12,13 +16,42 @@ from .exceptions import (
 )
 from .models import Document, Workflow, Comment, Blob
 from .operations import API as OperationsAPI
-from .utils import version_lt
+from .pagination import NXQLKeyset, PageIterator
+from .utils import extract_zip_stream, version_lt
 from .workflows import API as WorkflowsAPI
 
 if TYPE_CHECKING:
     from .client import NuxeoClient
 
 
+class CreateResult(object):
+    """
+    The outcome of the creation of one document by :meth:`API.create_many`.
+
+    :param index: The position of the document in the creation call
+    :param document: The created document, None if it failed
+    :param error: The error raised by the creation, None if it worked
+    """
+
+    __slots__ = ("index", "document", "error")
+
+    def __init__(self, index, document=None, error=None):
+        # type: (int, Optional[Document], Optional[Exception]) -> None
+        self.index = index
+        self.document = document
+        self.error = error
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<index={self.index}, document={self.document!r}, error={self.error!r}>"
+
+    @property
+    def ok(self):
+        # type: () -> bool
+        """True if the document was created."""
+        return self.error is None
+
+
 class API(APIEndpoint):
     """Endpoint for documents."""
 
@@ -50,6 +83,64 @@ class API(APIEndpoint):
         """
         return super().get(path=self._path(uid=uid, path=path), ssl_verify=ssl_verify)
 
+    def get_many(self, uids, schemas=None, enrichers=None, ssl_verify=True):
+        # type: (Iterable[str], Optional[Union[str, List[str]]], Optional[List[str]], bool) -> List[Optional[Document]]
+        """
+        Get the details of several documents, with as few calls as possible.
+
+        Documents are fetched by NXQL queries on their uid, sized to the URL
+        limits of servers and run *max_workers* at the same time:
+
+            >>> docs = nuxeo.documents.get_many(uids, schemas=["dublincore"])
+            >>> missing = [uid for uid, doc in zip(uids, docs) if doc is None]
+
+        :param uids: the uids of the documents
+        :param schemas: the schemas of the properties to get, the client ones by default
+        :param enrichers: additionnal details to fetch at the same time, e.g.: ["permissions"]
+        :return: the documents in the order of *uids*, None for the ones
+                 that do not exist or cannot be read
+        """
+        uids = list(uids)
+        chunks = list(self._uid_chunks(dict.fromkeys(uids)))
+        futures = [
+            self.client.submit_nested(self._get_chunk, chunk, schemas, enrichers, ssl_verify)
+            for chunk in chunks
+        ]
+        found = {}  # type: Dict[str, Document]
+        for future in futures:
+            for document in future.result():
+                found[document.uid] = document
+        return [found.get(uid) for uid in uids]
+
+    def _get_chunk(self, uids, schemas, enrichers, ssl_verify):
+        # type: (List[str], Optional[Union[str, List[str]]], Optional[List[str]], bool) -> List[Document]
+        values = ", ".join(f"'{uid}'" for uid in uids)
+        opts = {
+            "query": f"SELECT * FROM Document WHERE ecm:uuid IN ({values})",
+            "pageSize": len(uids),
+            "currentPageIndex": 0,
+        }
+        res = self.query(opts, schemas=schemas, enrichers=enrichers, ssl_verify=ssl_verify)
+        return res["entries"]
+
+    @staticmethod
+    def _uid_chunks(uids):
+        # type: (Iterable[str]) -> Iterator[List[str]]
+        """Split *uids* into lists small enough for one query."""
+        chunk = []  # type: List[str]
+        size = 0
+        for uid in uids:
+            if "'" in uid or "\\" in uid:
+                raise BadQuery(f"Invalid document uid: {uid!r}")
+            uid_size = len(quote_plus(f"'{uid}', "))
+            if chunk and (size + uid_size > GET_MANY_QUERY_SIZE or len(chunk) == GET_MANY_CHUNK_SIZE):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append(uid)
+            size += uid_size
+        if chunk:
+            yield chunk
+
     def post(self, document, parent_id=None, parent_path=None, ssl_verify=True):
         # type: (Document, Optional[str], Optional[str], Optional[bool]) -> Document
         """
@@ -68,6 +159,93 @@ class API(APIEndpoint):
 
     create = post  # Alias for clarity
 
+    def create_many(self, documents, parent=None, ssl_verify=True):
+        # type: (Iterable[Union[Document, Tuple[Document, Any]]], Any, bool) -> List[CreateResult]
+        """
+        Create several documents, *max_workers* at the same time.
+
+        Each item is a document to create in *parent*, or a *(document, parent)*
+        tuple. A parent is the uid or the path (starting with a slash) of an
+        existing document, or a :class:`Document`: when it is one of the documents
+        of the call, its children are created as soon as it exists.
+
+        Uploaded blobs found in the properties of the documents, like
+        ``{"file:content": blob}``, are attached by the creation call.
+
+        A failed creation does not stop the others, only the creation of the
+        children of the document:
+
+            >>> results = nuxeo.documents.create_many([folder, (file, folder)], parent="/ws")
+            >>> errors = [result.error for result in results if not result.ok]
+
+        :param documents: the documents to create
+        :param parent: the parent of documents given without one
+        :return: the results of the creations, in the order of the documents
+        """
+        items = [item if isinstance(item, tuple) else (item, parent) for item in documents]
+        results = [CreateResult(index) for index in range(len(items))]
+        positions = {id(document): index for index, (document, _) in enumerate(items)}
+
+        # Documents waiting for the creation of their parent, by parent position
+        waiting = {}  # type: Dict[int, List[int]]
+        ready = deque()  # type: deque
+        for index, (_, item_parent) in enumerate(items):
+            if isinstance(item_parent, Document) and id(item_parent) in positions:
+                waiting.setdefault(positions[id(item_parent)], []).append(index)
+            elif isinstance(item_parent, Document) and (item_parent.uid or item_parent.path):
+                ready.append((index, self._path(uid=item_parent.uid, path=item_parent.path)))
+            elif isinstance(item_parent, str) and item_parent:
+                if item_parent.startswith("/"):
+                    ready.append((index, self._path(path=item_parent)))
+                else:
+                    ready.append((index, self._path(uid=item_parent)))
+            else:
+                results[index].error = BadQuery(f"Invalid parent for the document {index}: {item_parent!r}")
+
+        def fail_children(index):
+            # type: (int) -> None
+            children = waiting.pop(index, [])
+            while children:
+                child = children.pop()
+                results[child].error = BadQuery(f"The parent of the document {child} was not created.")
+                children.extend(waiting.pop(child, []))
+
+        for index in [index for index in waiting if results[index].error]:
+            fail_children(index)
+
+        # Bound the queued calls to keep memory flat with many documents
+        limit = self.client.max_workers * 2
+        running = {}  # type: Dict[Any, int]
+        while ready or running:
+            while ready and len(running) < limit:
+                index, path = ready.popleft()
+                future = self.client.submit_nested(self._create, items[index][0], path, ssl_verify)
+                running[future] = index
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                result = results[index]
+                try:
+                    result.document = future.result()
+                except Exception as exc:
+                    result.error = exc
+                    fail_children(index)
+                else:
+                    path = self._path(uid=result.document.uid)
+                    ready.extend((child, path) for child in waiting.pop(index, []))
+
+        # Documents being each other's parent
+        for index in list(waiting):
+            for child in waiting.pop(index, []):
+                results[child].error = BadQuery(f"The parent of the document {child} is one of its children.")
+        return results
+
+    def _create(self, document, path, ssl_verify):
+        # type: (Document, str, bool) -> Document
+        # Uploaded blobs in properties are sent as their batch reference by the JSON codec
+        return super().post(document.as_dict(), path=path, ssl_verify=ssl_verify)
+
     def put(self, document, ssl_verify=True):
         # type: (Document, bool) -> Document
         """
@@ -118,6 +296,35 @@ class API(APIEndpoint):
             command="Document.AddPermission", input_obj=uid, params=params
         )
 
+    def bulk_download(self, uids, dest, filename="documents.zip", ssl_verify=True, **kwargs):
+        # type: (List[str], str, str, bool, Any) -> List[str]
+        """
+        Download the main blobs of several documents in one go.
+
+        The server builds a ZIP archive of the blobs (*Blob.BulkDownload* operation)
+        asynchronously, then the archive is extracted on the fly into *dest*,
+        entry by entry, without being stored on the disk nor in memory.
+
+        :param uids: the uids of the documents
+        :param dest: the destination folder
+        :param filename: the name of the archive built by the server
+        :param kwargs: additional arguments forwarded to
+            :func:`nuxeo.operations.API.execute_async`
+        :return: the list of extracted files
+        """
+        resp = self.operations.execute_async(
+            command="Blob.BulkDownload",
+            input_obj=list(uids),
+            params={"filename": filename},
+            ssl_verify=ssl_verify,
+            **kwargs,
+        )
+        try:
+            resp.raw.decode_content = True
+            return extract_zip_stream(resp.raw, dest, chunk_size=self.client.chunk_size)
+        finally:
+            resp.close()
+
     def comment(self, uid, text, ssl_verify=True):
         # type: (str, str, bool) -> Comment
         """
@@ -323,6 +530,59 @@ class API(APIEndpoint):
         )
         return permission in req["contextParameters"]["permissions"]
 
+    def iter_children(self, uid=None, path=None, enrichers=None, ssl_verify=True, **kwargs):
+        # type: (Optional[str], Optional[str], Optional[List[str]], bool, Any) -> PageIterator
+        """
+        Iterate over all the children of a document, page by page.
+
+        :param uid: the uid of the document
+        :param path: the path of the document
+        :param enrichers: additionnal details to fetch at the same time, e.g.: ["permissions"]
+        :param kwargs: the pagination arguments of :meth:`nuxeo.endpoint.APIEndpoint.iterate`
+        :return: the iterator over the document children
+        """
+        return self.iterate(
+            path=self._path(uid=uid, path=path),
+            adapter="children",
+            enrichers=enrichers,
+            ssl_verify=ssl_verify,
+            **kwargs,
+        )
+
+    def iter_query(self, opts, keyset=None, **kwargs):
+        # type: (Dict[str, Any], Optional[Union[str, List[str]]], Any) -> PageIterator
+        """
+        Iterate over all the documents of a query, page by page.
+
+            >>> for doc in nuxeo.documents.iter_query({"query": "SELECT * FROM File"}, auto_tune=True):
+            ...     print(doc.title)
+
+        With a *keyset*, documents are sorted by these properties (and *ecm:uuid*),
+        and each page is queried with the documents after the last one given,
+        instead of its index: deep pages of huge results are as fast as the first one.
+
+            >>> docs = nuxeo.documents.iter_query({"query": query}, keyset=["dc:modified"])
+
+        :param opts: a query or a pageProvider, without the pagination parameters
+        :param keyset: the properties to paginate on, NXQL queries only,
+                       see :class:`nuxeo.pagination.NXQLKeyset`
+        :param kwargs: the pagination arguments of :meth:`nuxeo.endpoint.APIEndpoint.iterate`
+        :return: the iterator over the documents
+        """
+        opts = opts.copy()
+        if keyset:
+            if "query" not in opts:
+                raise BadQuery("Keyset pagination needs a NXQL query")
+            keyset = NXQLKeyset(opts.pop("query"), keyset)
+            return self.iterate(path="query/NXQL", params=opts, keyset=keyset, **kwargs)
+        if "query" in opts:
+            query = "NXQL"
+        elif "pageProvider" in opts:
+            query = opts.pop("pageProvider")
+        else:
+            raise BadQuery("Need either a pageProvider or a query")
+        return self.iterate(path=f"query/{query}", params=opts, **kwargs)
+
     def lock(self, uid):
         # type: (str) -> Dict[str, Any]
         """Lock a document."""
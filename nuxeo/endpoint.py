@@ -1,10 +1,13 @@
 # coding: utf-8
-from typing import TYPE_CHECKING, Any, Dict, Optional, Type
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Type
 
 from requests import Response
 
+from .constants import PAGE_SIZE
 from .exceptions import BadQuery, HTTPError
 from .models import Model
+from .pagination import KeysetIterator, PageIterator
 
 if TYPE_CHECKING:
     from .client import NuxeoClient
@@ -42,6 +45,32 @@ class APIEndpoint(object):
         self.headers = headers or {}
         self._cls = cls
 
+    def submit(self, method, *args, **kwargs):
+        # type: (str, Any, Any) -> Future
+        """
+        Call one of the endpoint methods in the client executor.
+
+            >>> future = nuxeo.documents.submit("get", uid=uid)
+            >>> doc = future.result()
+
+        :param method: the name of the method to call
+        :return: the future of the call
+        """
+        return self.client.submit(getattr(self, method), *args, **kwargs)
+
+    def map(self, method, *iterables):
+        # type: (str, Iterable[Any]) -> List[Future]
+        """
+        Call one of the endpoint methods in the client executor
+        for each set of arguments taken from *iterables*.
+
+            >>> futures = nuxeo.users.map("get", ["alice", "bob"])
+
+        :param method: the name of the method to call
+        :return: the futures of the calls, in the order of the arguments
+        """
+        return self.client.map(getattr(self, method), *iterables)
+
     def get(
         self,
         path=None,  # type: Optional[str]
@@ -92,6 +121,69 @@ class APIEndpoint(object):
 
         return cls.parse(json, service=self)
 
+    def iterate(
+        self,
+        path=None,  # type: Optional[str]
+        params=None,  # type: Optional[Dict[str, Any]]
+        cls=None,  # type: Optional[Type]
+        page_size=PAGE_SIZE,  # type: int
+        cursor=None,  # type: Optional[Dict[str, Any]]
+        prefetch=True,  # type: bool
+        auto_tune=False,  # type: bool
+        keyset=None,  # type: Optional[Any]
+        ssl_verify=True,  # type: bool
+        **kwargs,  # type: Any
+    ):
+        # type: (...) -> PageIterator
+        """
+        Iterate over all the entries of a paginated resource, page by page.
+
+            >>> for task in nuxeo.tasks.iterate(params={"userId": "Administrator"}):
+            ...     print(task.name)
+
+        :param path: the endpoint (URL path) for the request
+        :param params: the parameters of the request, other than the pagination ones
+        :param cls: a class to use for parsing, if different
+                    than the base resource
+        :param page_size: the number of entries per page
+        :param cursor: the position to start from, the *cursor* of a previous iterator
+        :param prefetch: fetch the next page in the client executor
+                         while the current one is consumed
+        :param auto_tune: adapt the page size to the server response times
+        :param keyset: paginate on the key of the last entry given instead of the
+                       page index, see :class:`nuxeo.pagination.NXQLKeyset`
+        :return: the iterator, see :class:`nuxeo.pagination.PageIterator`
+        """
+        endpoint = kwargs.pop("endpoint", "") or self.endpoint
+        if path:
+            endpoint = f"{endpoint}/{path}"
+        cls = cls or self._cls
+        params = params or {}
+
+        def fetch(position, size):
+            # type: (Any, int) -> Any
+            if keyset is None:
+                page = {**params, "pageSize": size, "currentPageIndex": position}
+            else:
+                page = {**params, **keyset.params(position), "pageSize": size, "currentPageIndex": 0}
+            return self.client.request("GET", endpoint, params=page, ssl_verify=ssl_verify, **kwargs)
+
+        def parse(entry):
+            # type: (Dict[str, Any]) -> Any
+            return cls.parse(entry, service=self)
+
+        options = {
+            "parse": None if cls is dict else parse,
+            "submit": self.client.submit_nested,
+            "page_size": page_size,
+            "cursor": cursor,
+            "prefetch": prefetch,
+            "auto_tune": auto_tune,
+        }
+        if keyset is None:
+            return PageIterator(fetch, **options)
+        return KeysetIterator(fetch, keyset, **options)
+
     def post(self, resource=None, path=None, raw=False, ssl_verify=True, **kwargs):
         # type: (Optional[Any], Optional[str], bool, bool, Any) -> Any
         """
@@ -93,10 +93,65 @@ class Forbidden(HTTPError):
     status = 403
 
 
+class InvalidArchive(NuxeoError):
+    """Exception thrown when a ZIP archive cannot be extracted."""
+
+
 class InvalidBatch(NuxeoError):
     """Exception thrown when accessing inexistant or deleted batches."""
 
 
+class InvalidJSONCodec(NuxeoError):
+    """Exception thrown when the asked JSON codec is unknown or not installed."""
+
+    def __init__(self, codec, codecs):
+        # type: (str, List[str]) -> None
+        self.codec = codec
+        self.codecs = tuple(codecs)
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}: the JSON codec {self.codec!r} is not one of {self.codecs}."
+
+    def __str__(self):
+        # type: () -> str
+        return repr(self)
+
+
+class InvalidTracer(NuxeoError):
+    """Exception thrown when the asked tracer is unknown or not installed."""
+
+    def __init__(self, tracer, tracers):
+        # type: (str, List[str]) -> None
+        self.tracer = tracer
+        self.tracers = tuple(tracers)
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}: the tracer {self.tracer!r} is not one of {self.tracers}."
+
+    def __str__(self):
+        # type: () -> str
+        return repr(self)
+
+
+class InvalidTransport(NuxeoError):
+    """Exception thrown when the asked transport is unknown or not installed."""
+
+    def __init__(self, transport, transports):
+        # type: (str, List[str]) -> None
+        self.transport = transport
+        self.transports = tuple(transports)
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}: the transport {self.transport!r} is not one of {self.transports}."
+
+    def __str__(self):
+        # type: () -> str
+        return repr(self)
+
+
 class InvalidUploadHandler(NuxeoError):
     """Exception thrown when trying to upload a blob using an invalid handler."""
 
@@ -144,6 +199,23 @@ class OngoingRequestError(Conflict):
         return repr(self)
 
 
+class OperationTimeout(NuxeoError):
+    """Exception thrown when an asynchronous operation takes too much time to complete."""
+
+    def __init__(self, command, timeout):
+        # type: (str, float) -> None
+        self.command = command
+        self.timeout = timeout
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}: the operation {self.command!r} did not complete in {self.timeout}s."
+
+    def __str__(self):
+        # type: () -> str
+        return repr(self)
+
+
 class Unauthorized(HTTPError):
     """Exception thrown when the HTTPError code is 401."""
 
@@ -5,6 +5,7 @@ The default upload handler.
 from typing import TYPE_CHECKING, Any, Callable, Generator, Tuple, Union
 from urllib.parse import quote
 
+from ..buffers import read_chunk
 from ..models import Batch, Blob, BufferBlob, FileBlob
 from ..utils import log_chunk_details
 
@@ -90,6 +91,20 @@ class Uploader(object):
         self.blob.fileIdx = response.fileIdx
         self.blob.uploadedSize = int(response.uploadedSize)
 
+    def span(self, index, size):
+        # type: (int, int) -> Any
+        """Tracing span of the upload of the chunk *index* of *size* bytes."""
+        return self.service.client.tracer.span(
+            "nuxeo.upload.chunk",
+            {
+                "nuxeo.batch.id": self.batch.uid,
+                "nuxeo.upload.index": self.batch.upload_idx,
+                "nuxeo.upload.chunk.index": index,
+                "nuxeo.upload.chunk.count": self.chunk_count,
+                "nuxeo.upload.chunk.bytes": size,
+            },
+        )
+
     def timeout(self, chunk_size):
         # type: (int) -> float
         """Compute a timeout that allowes to handle big chunks."""
@@ -113,8 +128,8 @@ class Uploader(object):
             data = src if self.blob.size else None
             timeout = self.timeout(self.chunk_size)
 
-            self.process(
-                self.service.send_data(
+            with self.span(0, self.blob.size):
+                response = self.service.send_data(
                     self.blob.name,
                     data,
                     self.path,
@@ -123,7 +138,7 @@ class Uploader(object):
                     self.headers,
                     timeout=timeout,
                 )
-            )
+            self.process(response)
 
             setattr(self, "_completed", True)
 
@@ -197,7 +212,8 @@ class ChunkUploader(Uploader):
         The method will yield after the callbacks step. It yields the uploader
         itself since it contains all relevant data.
         """
-        with self.blob as src:
+        buffer_pool = self.service.client.buffer_pool
+        with self.blob as src, buffer_pool.buffer(self.chunk_size) as buffer:
             timeout = self.timeout(self.chunk_size)
 
             while self._to_upload:
@@ -207,13 +223,13 @@ class ChunkUploader(Uploader):
                 # Seek to the right position
                 src.seek(index * self.chunk_size)
 
-                # Read a chunk of data
-                data = src.read(self.chunk_size)
+                # Read a chunk of data, into the reusable buffer
+                data = read_chunk(src, buffer)
                 data_len = len(data)
 
                 # Upload it
-                self.process(
-                    self.service.send_data(
+                with self.span(index, data_len):
+                    response = self.service.send_data(
                         self.blob.name,
                         data,
                         self.path,
@@ -223,7 +239,7 @@ class ChunkUploader(Uploader):
                         data_len=data_len,
                         timeout=timeout,
                     )
-                )
+                self.process(response)
 
                 # Now that the part is uploaded, remove it from the list
                 self._to_upload.pop(0)
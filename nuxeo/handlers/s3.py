@@ -13,6 +13,7 @@ from botocore.credentials import DeferredRefreshableCredentials
 from dateutil.tz import tzlocal
 
 from .default import Uploader
+from ..buffers import read_chunk
 from ..constants import UP_AMAZON_S3
 from ..exceptions import UploadError
 from ..utils import chunk_partition, log_chunk_details
@@ -62,7 +63,11 @@ class UploaderS3(Uploader):
     def upload(self):
         # type: () -> None
         """Upload the file."""
-        with self.blob as fd:
+        rate_limiter = self.service.client.rate_limiter
+        if rate_limiter is not None:
+            rate_limiter.acquire_request(size=self.blob.size)
+
+        with self.blob as fd, self.span(0, self.blob.size):
             try:
                 # Note: we are using put_object() rather than upload_fileobj()
                 # to be able to retrieve the ETag from the response. The latter
@@ -268,7 +273,8 @@ class ChunkUploaderS3(UploaderS3):
         The method will yield after the callbacks step. It yields the uploader
         itself since it contains all relevant data.
         """
-        with self.blob as fd:
+        buffer_pool = self.service.client.buffer_pool
+        with self.blob as fd, buffer_pool.buffer(self.chunk_size) as buffer:
             while self._to_upload:
                 # Get the index of a chunk to upload
                 part_number = self._to_upload[0]
@@ -277,20 +283,29 @@ class ChunkUploaderS3(UploaderS3):
                 position = (part_number - 1) * self.chunk_size
                 fd.seek(position)
 
-                # Read a chunk of data
-                data = fd.read(self.chunk_size)
+                # Read a chunk of data, into the reusable buffer
+                data = read_chunk(fd, buffer)
                 data_len = len(data)
+                if isinstance(data, memoryview):
+                    # botocore does not handle memory views: the whole buffer is given as-is,
+                    # only the last (partial) chunk is copied.
+                    data = buffer if data_len == len(buffer) else data.tobytes()
+
+                rate_limiter = self.service.client.rate_limiter
+                if rate_limiter is not None:
+                    rate_limiter.acquire_request(size=data_len)
 
                 try:
                     # Upload it
-                    part = self.s3_client.upload_part(
-                        UploadId=self.batch.multiPartUploadId,
-                        Bucket=self.bucket,
-                        Key=self.key,
-                        PartNumber=part_number,
-                        Body=data,
-                        ContentLength=data_len,
-                    )
+                    with self.span(part_number, data_len):
+                        part = self.s3_client.upload_part(
+                            UploadId=self.batch.multiPartUploadId,
+                            Bucket=self.bucket,
+                            Key=self.key,
+                            PartNumber=part_number,
+                            Body=data,
+                            ContentLength=data_len,
+                        )
                 except Exception as e:
                     raise UploadError(self.blob.path, chunk=part_number, info=str(e))
 
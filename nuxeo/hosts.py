@@ -0,0 +1,291 @@
+# coding: utf-8
+"""
+Spread calls over several nodes of a Nuxeo cluster, without a load balancer.
+Nodes are checked in the background, and nodes failing in a row are ejected
+for a while. See the *host* argument of NuxeoClient.
+"""
+import logging
+import re
+from collections import OrderedDict
+from random import sample
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from .constants import (
+    HEALTH_CHECK_INTERVAL,
+    HOST_EJECTION_TIME,
+    HOST_MAX_FAILURES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Batches are stored by the node that created them
+_BATCH = re.compile(r"(?:^|/)upload/(?!(?:handlers|new)(?:/|$))([^/?]+)")
+
+# Maximum number of sticky keys remembered, the least recently used are forgotten
+MAX_BINDINGS = 1024
+
+# Status codes telling that a node is failing
+FAILURE_STATUS_CODES = frozenset([500, 502, 503, 504])
+
+
+def is_failure(response, error):
+    # type: (Any, Optional[BaseException]) -> bool
+    """Check if a call failed because of the node: no answer, or a 5xx status code."""
+    if response is None:
+        return error is not None
+    return response.status_code in FAILURE_STATUS_CODES
+
+
+def sticky_key(path):
+    # type: (str) -> Optional[str]
+    """The key binding calls to *path* to a node, the batch ID of upload endpoints."""
+    match = _BATCH.search(path)
+    return match.group(1) if match else None
+
+
+class Node(object):
+    """A node of the cluster, and its health."""
+
+    __slots__ = (
+        "url",
+        "healthy",
+        "outstanding",
+        "latency",
+        "failures",
+        "ejections",
+        "ejected_until",
+        "requests",
+        "errors",
+    )
+
+    def __init__(self, url):
+        # type: (str) -> None
+        self.url = url if url.endswith("/") else f"{url}/"
+        self.healthy = True
+        self.outstanding = 0
+        self.latency = 0.0  # Moving average, in seconds
+        self.failures = 0  # In a row
+        self.ejections = 0  # In a row
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<url={self.url!r}, healthy={self.healthy}, outstanding={self.outstanding}>"
+
+    def available(self, now):
+        # type: (float) -> bool
+        return self.healthy and self.ejected_until <= now
+
+    def as_dict(self):
+        # type: () -> Dict[str, Any]
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+
+
+class HostPool(object):
+    """
+    Nodes of a cluster, the one receiving a call is chosen with one of these strategies:
+
+        - "least_outstanding": the node with the fewest calls in progress;
+        - "ewma": the node with the lowest latency moving average, weighted
+          by its calls in progress.
+
+    Two random nodes are compared at each call, the "power of two choices",
+    so that clients sharing the same view do not all rush to the same node.
+
+    A node is ejected when *max_failures* calls fail in a row (no answer or a
+    5xx status code), for *ejection_time* seconds multiplied by the number of
+    consecutive ejections. When every node is ejected or unhealthy, all of them
+    are used again.
+
+    :param urls: The URLs of the nodes
+    :param strategy: "least_outstanding" or "ewma"
+    :param max_failures: Failures in a row before ejecting a node
+    :param ejection_time: The base duration of an ejection, in seconds
+    :param health_check_interval: The delay between two health checks of each node, in seconds
+    """
+
+    __slots__ = (
+        "nodes",
+        "strategy",
+        "max_failures",
+        "ejection_time",
+        "health_check_interval",
+        "_bindings",
+        "_lock",
+        "_stop",
+        "_thread",
+    )
+
+    STRATEGIES = ("least_outstanding", "ewma")
+
+    # Smoothing factor of latency moving averages
+    ALPHA = 0.3
+
+    def __init__(
+        self,
+        urls,  # type: Sequence[str]
+        strategy="least_outstanding",  # type: str
+        max_failures=HOST_MAX_FAILURES,  # type: int
+        ejection_time=HOST_EJECTION_TIME,  # type: float
+        health_check_interval=HEALTH_CHECK_INTERVAL,  # type: float
+    ):
+        # type: (...) -> None
+        if not urls:
+            raise ValueError("At least one node URL is required.")
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}, it must be one of {self.STRATEGIES}.")
+
+        self.nodes = [Node(url) for url in urls]
+        self.strategy = strategy
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.health_check_interval = health_check_interval
+        self._bindings = OrderedDict()  # type: OrderedDict[str, Node]
+        self._lock = Lock()
+        self._stop = Event()
+        self._thread = None  # type: Optional[Thread]
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<nodes={len(self.nodes)}, strategy={self.strategy!r}>"
+
+    def as_dict(self):
+        # type: () -> Dict[str, Dict[str, Any]]
+        """The state of each node."""
+        with self._lock:
+            return {node.url: node.as_dict() for node in self.nodes}
+
+    def _score(self, node):
+        # type: (Node) -> float
+        if self.strategy == "ewma":
+            return node.latency * (node.outstanding + 1)
+        return node.outstanding
+
+    def select(self):
+        # type: () -> Node
+        """Choose the node receiving the next call."""
+        now = monotonic()
+        nodes = [node for node in self.nodes if node.available(now)] or self.nodes
+        return min(sample(nodes, min(2, len(nodes))), key=self._score)
+
+    def acquire(self, key=None):
+        # type: (Optional[str]) -> Node
+        """
+        Choose the node receiving a call, and count it as in progress until :meth:`release`.
+        Calls given the same sticky *key* go to the same node, whatever its health.
+        """
+        with self._lock:
+            node = None
+            if key is not None:
+                node = self._bindings.get(key)
+                if node is not None:
+                    self._bindings.move_to_end(key)
+            if node is None:
+                node = self.select()
+                if key is not None:
+                    self._bind(key, node)
+            node.outstanding += 1
+            node.requests += 1
+        return node
+
+    def release(self, node, latency, failed=False):
+        # type: (Node, float, bool) -> None
+        """End a call given by :meth:`acquire`."""
+        with self._lock:
+            node.outstanding -= 1
+            if node.latency:
+                node.latency += self.ALPHA * (latency - node.latency)
+            else:
+                node.latency = latency
+
+            if not failed:
+                node.failures = 0
+                node.ejections = 0
+                return
+
+            node.errors += 1
+            node.failures += 1
+            if node.failures >= self.max_failures and node.ejected_until <= monotonic():
+                node.ejections += 1
+                node.failures = 0
+                duration = self.ejection_time * min(node.ejections, 10)
+                node.ejected_until = monotonic() + duration
+                logger.warning("Ejecting node %r for %.1f seconds", node.url, duration)
+
+    def cancel(self, node):
+        # type: (Node) -> None
+        """End a call given by :meth:`acquire` that was not sent, the node health is left untouched."""
+        with self._lock:
+            node.outstanding -= 1
+            node.requests -= 1
+
+    def bind(self, key, url):
+        # type: (str, str) -> None
+        """Send calls given the sticky *key* to the node of *url*, like the one that answered a call."""
+        with self._lock:
+            for node in self.nodes:
+                if url.startswith(node.url):
+                    self._bind(key, node)
+                    break
+
+    def _bind(self, key, node):
+        # type: (str, Node) -> None
+        self._bindings[key] = node
+        self._bindings.move_to_end(key)
+        if len(self._bindings) > MAX_BINDINGS:
+            self._bindings.popitem(last=False)
+
+    def check(self, is_healthy):
+        # type: (Callable[[str], bool]) -> None
+        """Check the health of each node with *is_healthy(url)*."""
+        for node in self.nodes:
+            try:
+                healthy = bool(is_healthy(node.url))
+            except Exception:
+                logger.warning("Cannot check the node %r", node.url, exc_info=True)
+                healthy = False
+
+            with self._lock:
+                if healthy and not node.healthy:
+                    logger.info("Node %r is healthy again", node.url)
+                elif not healthy and node.healthy:
+                    logger.warning("Node %r is unhealthy", node.url)
+                node.healthy = healthy
+
+    def start(self, is_healthy):
+        # type: (Callable[[str], bool]) -> None
+        """Check the health of nodes every *health_check_interval* seconds in a background thread."""
+        if self._thread is not None or self.health_check_interval <= 0:
+            return
+
+        def run():
+            # type: () -> None
+            while not self._stop.wait(self.health_check_interval):
+                self.check(is_healthy)
+
+        self._stop.clear()
+        self._thread = Thread(target=run, name="nuxeo-health-check", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # type: () -> None
+        """Stop health checks."""
+        self._stop.set()
+        self._thread = None
+
+    def after_fork(self, is_healthy):
+        # type: (Callable[[str], bool]) -> None
+        """
+        Reset the state shared with the parent process, in a child process:
+        calls in progress are the parent ones, and the health checks thread does not exist.
+        """
+        self._lock = Lock()
+        for node in self.nodes:
+            node.outstanding = 0
+        if self._thread is not None:
+            self._thread = None
+            self.start(is_healthy)
@@ -0,0 +1,140 @@
+# coding: utf-8
+"""
+JSON encoders and decoders used for request bodies and responses.
+
+The standard library is always available, faster third-party libraries
+(orjson, ujson) are used only when installed and asked for.
+See the *json_codec* argument of NuxeoClient.
+
+Third-party libraries are imported when their codec is created, not before.
+"""
+import json
+from importlib.util import find_spec
+from typing import Any, Dict, Type, Union
+
+from .exceptions import InvalidJSONCodec
+from .utils import json_helper
+
+
+class JSONCodec(object):
+    """Standard library codec, also the fallback of other codecs."""
+
+    __slots__ = ()
+
+    #: The name given to NuxeoClient(json_codec=...)
+    name = "json"
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<name={self.name!r}>"
+
+    @staticmethod
+    def available():
+        # type: () -> bool
+        return True
+
+    def dumps(self, obj):
+        # type: (Any) -> Union[str, bytes]
+        """Encode *obj*, models are serialized with their to_json() method."""
+        return json.dumps(obj, default=json_helper)
+
+    def loads(self, data):
+        # type: (Union[str, bytes]) -> Any
+        """Decode *data*, raise ValueError if it is not valid JSON."""
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+    """orjson codec, it produces and reads UTF-8 bytes."""
+
+    __slots__ = ("_orjson",)
+    name = "orjson"
+
+    def __init__(self):
+        # type: () -> None
+        import orjson
+
+        self._orjson = orjson
+
+    @staticmethod
+    def available():
+        # type: () -> bool
+        return find_spec("orjson") is not None
+
+    def dumps(self, obj):
+        # type: (Any) -> Union[str, bytes]
+        orjson = self._orjson
+        try:
+            return orjson.dumps(obj, default=json_helper, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Integers bigger than 64 bits, subclasses of str, ...
+            return super().dumps(obj)
+
+    def loads(self, data):
+        # type: (Union[str, bytes]) -> Any
+        try:
+            return self._orjson.loads(data)
+        except ValueError:
+            # NaN, Infinity and bytes not encoded in UTF-8 are only accepted by the standard library
+            return super().loads(data)
+
+
+class UjsonCodec(JSONCodec):
+    """ujson codec."""
+
+    __slots__ = ("_ujson",)
+    name = "ujson"
+
+    def __init__(self):
+        # type: () -> None
+        import ujson
+
+        self._ujson = ujson
+
+    @staticmethod
+    def available():
+        # type: () -> bool
+        return find_spec("ujson") is not None
+
+    def dumps(self, obj):
+        # type: (Any) -> Union[str, bytes]
+        try:
+            return self._ujson.dumps(obj, default=json_helper, ensure_ascii=False)
+        except (OverflowError, TypeError):
+            return super().dumps(obj)
+
+    def loads(self, data):
+        # type: (Union[str, bytes]) -> Any
+        try:
+            return self._ujson.loads(data)
+        except ValueError:
+            return super().loads(data)
+
+
+CODECS = {
+    codec.name: codec for codec in (JSONCodec, OrjsonCodec, UjsonCodec)
+}  # type: Dict[str, Type[JSONCodec]]
+
+# Codecs tried by the "auto" mode, the fastest first
+PREFERRED_CODECS = ("orjson", "ujson", "json")
+
+
+def get_codec(name):
+    # type: (Union[str, JSONCodec]) -> JSONCodec
+    """
+    Get a codec from its *name*.
+
+    :param name: one of CODECS, "auto" to pick the fastest installed one,
+           or a JSONCodec instance that is returned as-is
+    """
+    if isinstance(name, JSONCodec):
+        return name
+
+    if name == "auto":
+        name = next(codec for codec in PREFERRED_CODECS if CODECS[codec].available())
+
+    cls = CODECS.get(name)
+    if not cls or not cls.available():
+        available = [codec for codec, cls in CODECS.items() if cls.available()]
+        raise InvalidJSONCodec(name, available)
+    return cls()
@@ -0,0 +1,432 @@
+# coding: utf-8
+"""
+Limit the number of requests sent at the same time to the server,
+and the rate of requests and transferred bytes.
+See the *limiter* and *rate_limiter* arguments of NuxeoClient.
+"""
+import logging
+import os
+import struct
+from contextlib import contextmanager
+from threading import Condition, Lock
+from time import monotonic, sleep, time
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+from requests.exceptions import ConnectionError, RetryError, Timeout
+
+from .constants import MAX_WORKERS, WINDOWS
+
+if WINDOWS:
+    import msvcrt
+else:
+    import fcntl
+
+logger = logging.getLogger(__name__)
+
+# Status codes telling that the server is overloaded
+OVERLOAD_STATUS_CODES = frozenset([429, 503])
+
+
+def is_overloaded(result):
+    # type: (Any) -> bool
+    """
+    Check if a response, or the error raised while getting it, shows an overloaded server.
+    Answers retried by urllib3 are also checked.
+    """
+    if isinstance(result, BaseException):
+        response = getattr(result, "response", None)
+        if response is None:
+            # No answer in time, or retries exhausted
+            return isinstance(result, (ConnectionError, RetryError, Timeout))
+        result = response
+
+    if getattr(result, "status_code", None) in OVERLOAD_STATUS_CODES:
+        return True
+
+    retries = getattr(getattr(result, "raw", None), "retries", None)
+    history = getattr(retries, "history", None) or ()
+    return any(attempt.status in OVERLOAD_STATUS_CODES for attempt in history)
+
+
+class AdaptiveLimiter(object):
+    """
+    Concurrency limiter using the AIMD (additive increase, multiplicative
+    decrease) algorithm, the same as the TCP congestion control.
+
+    The number of requests sent at the same time is capped by a limit that:
+
+        - is multiplied by *backoff_ratio* when the server answers with a
+          429 or 503 status code, when it does not answer in time, or when
+          its latency increases more than *latency_tolerance* times;
+        - grows by 1 each time *limit* requests succeed in a row.
+
+    The limit is decreased at most once per round trip, so that concurrent
+    requests failing because of the same overload count once.
+
+    :param initial_limit: the limit to start with
+    :param min_limit: the limit will never go lower
+    :param max_limit: the limit will never go higher
+    :param backoff_ratio: the factor applied to the limit on overload
+    :param latency_tolerance: the maximum ratio between the recent latency
+           and the long-term latency before considering the server as overloaded,
+           0 to ignore the latency
+    """
+
+    __slots__ = (
+        "backoff_ratio",
+        "latency_tolerance",
+        "max_limit",
+        "min_limit",
+        "stats",
+        "_condition",
+        "_in_flight",
+        "_last_decrease",
+        "_latency_long",
+        "_latency_short",
+        "_limit",
+        "_samples",
+    )
+
+    # Smoothing factors of latency moving averages
+    SHORT_ALPHA = 0.2
+    LONG_ALPHA = 0.01
+    # Latency samples to gather before taking them into account
+    WARMUP = 20
+
+    def __init__(
+        self,
+        initial_limit=MAX_WORKERS,  # type: int
+        min_limit=1,  # type: int
+        max_limit=64,  # type: int
+        backoff_ratio=0.5,  # type: float
+        latency_tolerance=2.0,  # type: float
+    ):
+        # type: (...) -> None
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.stats = {"decreases": 0, "overloads": 0, "requests": 0}
+        self._condition = Condition()
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._latency_long = 0.0
+        self._latency_short = 0.0
+        self._limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self._samples = 0
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<limit={self.limit}, in_flight={self._in_flight}>"
+
+    @property
+    def limit(self):
+        # type: () -> int
+        """The current maximum number of requests in flight."""
+        return int(self._limit)
+
+    @property
+    def in_flight(self):
+        # type: () -> int
+        """The number of requests currently sent."""
+        return self._in_flight
+
+    def as_dict(self):
+        # type: () -> Dict[str, Any]
+        """Metrics about the limiter."""
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "latency": self._latency_short,
+                **self.stats,
+            }
+
+    def after_fork(self):
+        # type: () -> None
+        """
+        Reset the state shared with the parent process, in a child process:
+        requests in flight are the parent ones.
+        """
+        self._condition = Condition()
+        self._in_flight = 0
+
+    def acquire(self, timeout=None):
+        # type: (Optional[float]) -> None
+        """
+        Wait for the number of requests in flight to go under the limit.
+
+        :param timeout: the maximum time to wait, in seconds (forever by default)
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._in_flight < self.limit, timeout):
+                raise TimeoutError(f"Still {self._in_flight} requests in flight after {timeout}s")
+            self._in_flight += 1
+
+    def release(self, latency, overloaded=False):
+        # type: (float, bool) -> None
+        """
+        Give back a slot obtained with :func:`acquire` and adjust the limit.
+
+        :param latency: the time taken by the request, in seconds
+        :param overloaded: True if the request showed an overloaded server
+        """
+        with self._condition:
+            self._in_flight -= 1
+            self.stats["requests"] += 1
+
+            if not overloaded:
+                overloaded = self._latency_inflated(latency)
+            if overloaded:
+                self.stats["overloads"] += 1
+                self._decrease(latency)
+            else:
+                # +1 once *limit* requests succeeded
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+            self._condition.notify_all()
+
+    def cancel(self):
+        # type: () -> None
+        """Give back a slot obtained with :func:`acquire` for a request that was not sent."""
+        with self._condition:
+            self._in_flight -= 1
+            self._condition.notify_all()
+
+    def _latency_inflated(self, latency):
+        # type: (float) -> bool
+        if not self._samples:
+            self._latency_short = self._latency_long = latency
+        else:
+            self._latency_short += self.SHORT_ALPHA * (latency - self._latency_short)
+            self._latency_long += self.LONG_ALPHA * (latency - self._latency_long)
+        self._samples += 1
+
+        return bool(
+            self.latency_tolerance
+            and self._samples > self.WARMUP
+            and self._latency_short > self._latency_long * self.latency_tolerance
+        )
+
+    def _decrease(self, latency):
+        # type: (float) -> None
+        now = monotonic()
+        if now - self._last_decrease < max(latency, self._latency_short):
+            # Already decreased for this round trip
+            return
+
+        self._last_decrease = now
+        previous = self.limit
+        self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+        self.stats["decreases"] += 1
+        if self.limit != previous:
+            logger.info(f"Server overloaded, concurrency limit lowered from {previous} to {self.limit}")
+
+
+class TokenBucket(object):
+    """
+    Token bucket refilled with *rate* tokens per second, holding up to *capacity* tokens.
+
+    When *path* is given, the state of the bucket is stored in that file and
+    shared by all processes using it: a lock on the file serializes updates.
+
+    :param rate: the number of tokens added each second
+    :param capacity: the maximum number of tokens, i.e. the allowed burst (*rate* by default)
+    :param path: the file holding the shared state
+    """
+
+    __slots__ = ("capacity", "path", "rate", "_fd", "_fd_pid", "_lock", "_state")
+
+    # Level and time of the last update, as stored in the shared file
+    STATE = struct.Struct("<dd")
+
+    def __init__(self, rate, capacity=None, path=None):
+        # type: (float, Optional[float], Optional[str]) -> None
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.path = path
+        self._fd = None  # type: Optional[int]
+        self._fd_pid = 0
+        self._lock = Lock()
+        self._state = (float(self.capacity), time())
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<rate={self.rate}, capacity={self.capacity}, path={self.path!r}>"
+
+    def after_fork(self):
+        # type: () -> None
+        """Reset the lock shared with the parent process, in a child process."""
+        self._lock = Lock()
+
+    def consume(self, tokens=1, timeout=None):
+        # type: (float, Optional[float]) -> None
+        """
+        Take *tokens* from the bucket, waiting for them to be available.
+        More tokens than the capacity can be taken once the bucket is full:
+        the debt is paid by next callers.
+
+        :param timeout: the maximum time to wait, in seconds (forever by default)
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        while "there are not enough tokens":
+            wait = self._update(tokens, force=False)
+            if wait <= 0:
+                return
+            if deadline is not None and monotonic() + wait > deadline:
+                raise TimeoutError(f"Not enough tokens in {timeout}s to consume {tokens:,}")
+            sleep(wait)
+
+    def charge(self, tokens):
+        # type: (float) -> None
+        """Take *tokens* from the bucket without waiting, even if it goes into debt."""
+        self._update(tokens, force=True)
+
+    def level(self):
+        # type: () -> float
+        """The current number of tokens in the bucket."""
+        with self._lock, self._shared_state() as state:
+            level, _ = self._refill(*state[0])
+            return level
+
+    def _refill(self, level, stamp):
+        # type: (float, float) -> Tuple[float, float]
+        now = time()
+        return min(self.capacity, level + max(0.0, now - stamp) * self.rate), now
+
+    def _update(self, tokens, force):
+        # type: (float, bool) -> float
+        """Take *tokens* if possible, else return the time to wait for them."""
+        with self._lock, self._shared_state() as state:
+            level, now = self._refill(*state[0])
+            needed = min(tokens, self.capacity)
+            if force or level >= needed:
+                state[0] = (level - tokens, now)
+                return 0.0
+            state[0] = (level, now)
+            return (needed - level) / self.rate
+
+    @contextmanager
+    def _shared_state(self):
+        # type: () -> Generator[List[Tuple[float, float]], None, None]
+        """Give the state of the bucket in a list, its content is saved on exit."""
+        if not self.path:
+            state = [self._state]
+            yield state
+            self._state = state[0]
+            return
+
+        fd = self._file()
+        _lock_file(fd)
+        try:
+            os.lseek(fd, 0, os.SEEK_SET)
+            data = os.read(fd, self.STATE.size)
+            if len(data) == self.STATE.size:
+                state = [self.STATE.unpack(data)]
+            else:
+                # New file, the bucket starts full
+                state = [(float(self.capacity), time())]
+            yield state
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, self.STATE.pack(*state[0]))
+        finally:
+            _unlock_file(fd)
+
+    def _file(self):
+        # type: () -> int
+        # A forked process must not share the file descriptor of its parent: locks would be shared too
+        if self._fd is None or self._fd_pid != os.getpid():
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o600)
+            self._fd_pid = os.getpid()
+        return self._fd
+
+
+def _lock_file(fd):
+    # type: (int) -> None
+    if WINDOWS:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, TokenBucket.STATE.size)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+
+def _unlock_file(fd):
+    # type: (int) -> None
+    if WINDOWS:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, TokenBucket.STATE.size)
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+class RateLimiter(object):
+    """
+    Requests and bandwidth budgets of clients.
+
+    Without *directory*, budgets are shared by clients using the same
+    RateLimiter object. With a *directory*, they are shared by all processes
+    of the machine using that directory, to enforce a global quota.
+
+    Request bodies are counted before being sent, response bodies are
+    counted from their Content-Length once received: a big download makes
+    next transfers wait.
+
+    :param requests_per_second: the maximum number of requests per second
+    :param bytes_per_second: the maximum number of bytes sent and received per second
+    :param burst: the number of seconds of budget that can be used at once
+    :param directory: the folder where to store the shared state
+    """
+
+    __slots__ = ("bandwidth", "requests")
+
+    def __init__(
+        self,
+        requests_per_second=None,  # type: Optional[float]
+        bytes_per_second=None,  # type: Optional[int]
+        burst=1.0,  # type: float
+        directory=None,  # type: Optional[str]
+    ):
+        # type: (...) -> None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        def bucket(rate, name):
+            # type: (Optional[float], str) -> Optional[TokenBucket]
+            if not rate:
+                return None
+            path = os.path.join(directory, f"{name}.bucket") if directory else None
+            return TokenBucket(rate, capacity=rate * burst, path=path)
+
+        self.requests = bucket(requests_per_second, "requests")
+        self.bandwidth = bucket(bytes_per_second, "bandwidth")
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<requests={self.requests!r}, bandwidth={self.bandwidth!r}>"
+
+    def after_fork(self):
+        # type: () -> None
+        """Reset the locks shared with the parent process, in a child process."""
+        for bucket in (self.requests, self.bandwidth):
+            if bucket:
+                bucket.after_fork()
+
+    def acquire_request(self, size=0):
+        # type: (int) -> None
+        """Wait for the budget of one request sending *size* bytes."""
+        if self.requests:
+            self.requests.consume(1)
+        if size:
+            self.acquire_bytes(size)
+
+    def acquire_bytes(self, size):
+        # type: (int) -> None
+        """Wait for the budget of *size* bytes to transfer."""
+        if self.bandwidth and size > 0:
+            self.bandwidth.consume(size)
+
+    def charge_bytes(self, size):
+        # type: (int) -> None
+        """Count *size* bytes already transferred."""
+        if self.bandwidth and size > 0:
+            self.bandwidth.charge(size)
@@ -0,0 +1,281 @@
+# coding: utf-8
+"""
+Metrics of HTTP calls, per method and endpoint template: latency histograms,
+transferred bytes, status codes, retries, redirects, connection pools waits
+and durations of the request steps (DNS, connect, TLS, send, TTFB, transfer).
+See the *metrics* argument of NuxeoClient.
+"""
+import logging
+import re
+from bisect import bisect_left
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of latency histograms buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Maximum number of endpoints having their own metrics, others are merged into "other"
+MAX_ENDPOINTS = 256
+
+_UUID = r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+
+# Variable parts of endpoints, the first matching rule wins for a given segment
+_TEMPLATES = (
+    # Document paths, until the adapter
+    (re.compile(r"((?:^|/)path)/.+?(?=/@|$)"), r"\1/{path}"),
+    (re.compile(r"((?:^|/)upload)/(?!(?:handlers|new)(?:/|$))[^/]+"), r"\1/{batchId}"),
+    (re.compile(r"((?:^|/)user)/(?!search(?:/|$))[^/]+"), r"\1/{username}"),
+    (re.compile(r"((?:^|/)group)/(?!search(?:/|$))[^/]+"), r"\1/{groupname}"),
+    (re.compile(rf"(^|/){_UUID}(?=/|$)", re.IGNORECASE), r"\1{uid}"),
+    (re.compile(r"(^|/)\d+(?=/|$)"), r"\1{n}"),
+)
+
+
+def endpoint_template(url):
+    # type: (str) -> str
+    """
+    The template of the endpoint targeted by *url*, without the query string and
+    with variable parts replaced to keep a small number of distinct endpoints:
+
+        >>> endpoint_template("api/v1/id/0a1b2c3d-0a1b-0a1b-0a1b-0a1b2c3d4e5f?properties=*")
+        'api/v1/id/{uid}'
+        >>> endpoint_template("api/v1/path/default-domain/workspaces/ws/@children")
+        'api/v1/path/{path}/@children'
+    """
+    path = urlsplit(url).path
+    for pattern, repl in _TEMPLATES:
+        path = pattern.sub(repl, path)
+    return path
+
+
+def _labels(**labels):
+    # type: (Any) -> str
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in labels.items()
+    )
+    return ",".join(f'{name}="{value}"' for name, value in escaped)
+
+
+class EndpointMetrics(object):
+    """Metrics of the calls made with one method to one endpoint."""
+
+    __slots__ = (
+        "buckets",
+        "latency",
+        "count",
+        "statuses",
+        "sent",
+        "received",
+        "retries",
+        "redirects",
+        "pool_wait",
+        "phases",
+    )
+
+    def __init__(self, size):
+        # type: (int) -> None
+        # One more bucket for the +Inf bound
+        self.buckets = [0] * (size + 1)
+        self.latency = 0.0
+        self.count = 0
+        self.statuses = {}  # type: Dict[str, int]
+        self.sent = 0
+        self.received = 0
+        self.retries = 0
+        self.redirects = 0
+        self.pool_wait = 0.0
+        self.phases = {}  # type: Dict[str, float]
+
+    def as_dict(self):
+        # type: () -> Dict[str, Any]
+        details = {attr: getattr(self, attr) for attr in self.__slots__ if attr != "buckets"}
+        details["statuses"] = dict(self.statuses)
+        details["phases"] = dict(self.phases)
+        return details
+
+
+class Metrics(object):
+    """
+    Collector of HTTP calls metrics, exported in the Prometheus text format
+    with :meth:`prometheus` or given to a callback after each call.
+
+    :param buckets: Upper bounds of latency histograms buckets, in seconds
+    :param callback: Called with a dict describing each call: method, endpoint,
+           status, latency, sent, received, retries, redirects, pool_wait and phases
+    :param max_endpoints: The maximum number of distinct endpoints tracked
+    """
+
+    __slots__ = ("bounds", "callback", "max_endpoints", "_endpoints", "_lock")
+
+    def __init__(
+        self,
+        buckets=LATENCY_BUCKETS,  # type: Sequence[float]
+        callback=None,  # type: Optional[Callable[[Dict[str, Any]], Any]]
+        max_endpoints=MAX_ENDPOINTS,  # type: int
+    ):
+        # type: (...) -> None
+        self.bounds = tuple(sorted(buckets))
+        self.callback = callback
+        self.max_endpoints = max_endpoints
+        self._endpoints = {}  # type: Dict[Tuple[str, str], EndpointMetrics]
+        self._lock = Lock()
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<endpoints={len(self._endpoints)}>"
+
+    def reset(self):
+        # type: () -> None
+        with self._lock:
+            self._endpoints.clear()
+
+    def after_fork(self):
+        # type: () -> None
+        """Reset the lock shared with the parent process, in a child process."""
+        self._lock = Lock()
+
+    def _get(self, method, endpoint):
+        # type: (str, str) -> EndpointMetrics
+        """The metrics of an endpoint, must be called with the lock held."""
+        key = (method, endpoint)
+        metrics = self._endpoints.get(key)
+        if metrics is None:
+            if len(self._endpoints) >= self.max_endpoints:
+                key = (method, "other")
+            metrics = self._endpoints.get(key)
+            if metrics is None:
+                metrics = self._endpoints[key] = EndpointMetrics(len(self.bounds))
+        return metrics
+
+    def observe(
+        self,
+        method,  # type: str
+        endpoint,  # type: str
+        status,  # type: str
+        latency,  # type: float
+        sent=0,  # type: int
+        received=0,  # type: int
+        retries=0,  # type: int
+        redirects=0,  # type: int
+        pool_wait=0.0,  # type: float
+        phases=None,  # type: Optional[Dict[str, float]]
+    ):
+        # type: (...) -> None
+        """
+        Record a call.
+
+        :param status: the status code of the last answer, or "error" when none
+        :param latency: the duration of the call, retries included, in seconds
+        :param sent: the size of the request body, once compressed
+        :param received: the size of the response body, as announced by the server
+        :param pool_wait: the time spent waiting for a connection, in seconds
+        :param phases: the durations of the request steps, in seconds,
+               see :class:`nuxeo.tcp.RequestTimings`
+        """
+        with self._lock:
+            metrics = self._get(method, endpoint)
+            metrics.buckets[bisect_left(self.bounds, latency)] += 1
+            metrics.latency += latency
+            metrics.count += 1
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.sent += sent
+            metrics.received += received
+            metrics.retries += retries
+            metrics.redirects += redirects
+            metrics.pool_wait += pool_wait
+            for phase, seconds in (phases or {}).items():
+                metrics.phases[phase] = metrics.phases.get(phase, 0.0) + seconds
+
+        if self.callback is None:
+            return
+        try:
+            self.callback(
+                {
+                    "method": method,
+                    "endpoint": endpoint,
+                    "status": status,
+                    "latency": latency,
+                    "sent": sent,
+                    "received": received,
+                    "retries": retries,
+                    "redirects": redirects,
+                    "pool_wait": pool_wait,
+                    "phases": phases or {},
+                }
+            )
+        except Exception:
+            logger.warning("Metrics callback %r failed", self.callback, exc_info=True)
+
+    def observe_phase(self, method, endpoint, phase, seconds):
+        # type: (str, str, str, float) -> None
+        """Record the duration of a request step known after the call, like the body transfer."""
+        with self._lock:
+            metrics = self._get(method, endpoint)
+            metrics.phases[phase] = metrics.phases.get(phase, 0.0) + seconds
+
+    def as_dict(self):
+        # type: () -> Dict[str, Dict[str, Dict[str, Any]]]
+        """Metrics as a dict: {endpoint: {method: {...}}}."""
+        result = {}  # type: Dict[str, Dict[str, Dict[str, Any]]]
+        with self._lock:
+            for (method, endpoint), metrics in self._endpoints.items():
+                result.setdefault(endpoint, {})[method] = metrics.as_dict()
+        return result
+
+    def prometheus(self, prefix="nuxeo_client"):
+        # type: (str) -> str
+        """Metrics in the Prometheus text exposition format."""
+        with self._lock:
+            items = sorted(
+                (key, metrics.as_dict(), list(metrics.buckets))
+                for key, metrics in self._endpoints.items()
+            )
+
+        name = f"{prefix}_request_duration_seconds"
+        lines = [
+            f"# HELP {name} Duration of HTTP calls, retries included.",
+            f"# TYPE {name} histogram",
+        ]  # type: List[str]
+        for (method, endpoint), details, buckets in items:
+            cumulated = 0
+            for bound, count in zip(self.bounds + (float("inf"),), buckets):
+                cumulated += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                lines.append(f"{name}_bucket{{{_labels(method=method, endpoint=endpoint, le=le)}}} {cumulated}")
+            labels = _labels(method=method, endpoint=endpoint)
+            lines.append(f"{name}_sum{{{labels}}} {details['latency']!r}")
+            lines.append(f"{name}_count{{{labels}}} {details['count']}")
+
+        name = f"{prefix}_requests_total"
+        lines += [f"# HELP {name} HTTP calls per status code.", f"# TYPE {name} counter"]
+        for (method, endpoint), details, _ in items:
+            for status, count in sorted(details["statuses"].items()):
+                lines.append(f"{name}{{{_labels(method=method, endpoint=endpoint, status=status)}}} {count}")
+
+        counters = (
+            ("request_bytes_total", "sent", "Bytes sent in requests bodies."),
+            ("response_bytes_total", "received", "Bytes received in responses bodies."),
+            ("retries_total", "retries", "Calls retried."),
+            ("redirects_total", "redirects", "Redirections followed."),
+            ("pool_wait_seconds_total", "pool_wait", "Time spent waiting for a connection."),
+        )
+        for suffix, attr, description in counters:
+            name = f"{prefix}_{suffix}"
+            lines += [f"# HELP {name} {description}", f"# TYPE {name} counter"]
+            for (method, endpoint), details, _ in items:
+                lines.append(f"{name}{{{_labels(method=method, endpoint=endpoint)}}} {details[attr]!r}")
+
+        name = f"{prefix}_phase_seconds_total"
+        lines += [
+            f"# HELP {name} Time spent in each step of requests: dns, connect, tls, send, ttfb and transfer.",
+            f"# TYPE {name} counter",
+        ]
+        for (method, endpoint), details, _ in items:
+            for phase, seconds in sorted(details["phases"].items()):
+                lines.append(f"{name}{{{_labels(method=method, endpoint=endpoint, phase=phase)}}} {seconds!r}")
+
+        return "\n".join(lines) + "\n"
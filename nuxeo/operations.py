@@ -1,19 +1,25 @@
 # coding: utf-8
+import logging
 from collections.abc import Sequence
 from os import fsync
-from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Type
+from time import monotonic, sleep
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Type
+from urllib.parse import urlparse
 
 from requests import Response
 
 from . import constants
+from .buffers import iter_response
 from .endpoint import APIEndpoint
-from .exceptions import BadQuery, CorruptedFile
+from .exceptions import BadQuery, CorruptedFile, OperationTimeout
 from .models import Blob, Operation
 from .utils import get_digester
 
 if TYPE_CHECKING:
     from .client import NuxeoClient
 
+logger = logging.getLogger(__name__)
+
 # Types allowed for operations parameters
 # See https://docs.oracle.com/javase/tutorial/java/nutsandbolts/datatypes.html
 # for default values
@@ -39,13 +45,71 @@ PARAM_TYPES = {
 }  # type: Dict[str, Tuple[Type, ...]]
 
 
+class ParamsValidator(object):
+    """
+    Check the parameters given to an operation, compiled once
+    from its definition in the registry to be cheap to call.
+
+    :param operation: The definition of the operation
+    """
+
+    __slots__ = ("command", "types", "required")
+
+    def __init__(self, operation):
+        # type: (Dict[str, Any]) -> None
+        self.command = operation["id"]
+        #: Accepted types of each parameter
+        self.types = {}  # type: Dict[str, Tuple[Type, ...]]
+        #: Names of the required parameters, in the definition order
+        self.required = []  # type: List[str]
+
+        for param in operation["params"]:
+            # Unknown types, from newer servers, cannot be checked
+            types_accepted, default = PARAM_TYPES.get(param["type"], ((object,), None))
+            if param["required"]:
+                self.required.append(param["name"])
+            else:
+                # Allow the default value when the parameter is not required
+                types_accepted += (type(default),)
+            # Uniquify, keeping the order for error messages
+            self.types[param["name"]] = tuple(dict.fromkeys(types_accepted))
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<command={self.command!r}, params={list(self.types)!r}>"
+
+    def check(self, params):
+        # type: (Dict[str, Any]) -> None
+        """Raise BadQuery on an unexpected parameter, a value of the wrong type or a missing parameter."""
+        types = self.types
+        for name, value in params.items():
+            types_accepted = types.get(name)
+            if types_accepted is None:
+                err = f"unexpected parameter {name!r} for operation {self.command}"
+                raise BadQuery(err)
+            if not isinstance(value, types_accepted):
+                raise BadQuery(self._type_error(name, value, types_accepted))
+
+        for name in self.required:
+            if name not in params:
+                err = f"missing required parameter {name!r} for operation {self.command!r}"
+                raise BadQuery(err)
+
+    @staticmethod
+    def _type_error(name, value, types_accepted):
+        # type: (str, Any, Tuple[Type, ...]) -> str
+        types = [type_.__name__ for type_ in types_accepted]
+        if len(types) > 1:
+            types = ", ".join(types[:-1]) + " or " + types[-1]
+        else:
+            types = types[0]
+        return f"parameter {name}={value!r} should be of type {types} (current is {type(value).__name__})"
+
+
 class API(APIEndpoint):
     """Endpoint for operations."""
 
-    __slots__ = ()
-
-    # Operations cache
-    ops = {}  # type: Dict[str, Any]
+    __slots__ = ("_from_disk",)
 
     def __init__(self, client, endpoint="site/automation", headers=None):
         # type: (NuxeoClient, str, Optional[Dict[str, str]]) -> None
@@ -53,6 +117,8 @@ class API(APIEndpoint):
         headers.update({"Content-Type": "application/json", "X-NXproperties": "*"})
         super().__init__(client, endpoint=endpoint, cls=dict, headers=headers)
         self.endpoint = endpoint
+        # True when the registry comes from the server cache, it may miss new operations
+        self._from_disk = False
 
     def get(self, **kwargs):
         # type: (Any) -> Dict[str, Any]
@@ -67,6 +133,12 @@ class API(APIEndpoint):
         # type: (str) -> None
         raise NotImplementedError()
 
+    @property
+    def ops(self):
+        # type: () -> Dict[str, Any]
+        """The operations cache of the client, empty until operations are fetched."""
+        return self.client._operations or {}
+
     @property
     def operations(self):
         # type: () -> Dict[str, Any]
@@ -75,14 +147,47 @@ class API(APIEndpoint):
 
         :return: the available operations
         """
-        if not self.ops:
-            response = self.get()
-            for operation in response["operations"]:
-                self.ops[operation["id"]] = operation
-                for alias in operation.get("aliases", []):
-                    self.ops[alias] = operation
-
-        return self.ops
+        ops = self.client._operations
+        if ops is None:
+            with self.client._operations_lock:
+                # Another thread may have fetched them in the meantime
+                ops = self.client._operations
+                if ops is None:
+                    ops = self._load()
+        return ops
+
+    def refresh(self):
+        # type: () -> Dict[str, Any]
+        """Fetch the available operations from the server again, also in the server cache."""
+        with self.client._operations_lock:
+            return self._load(force=True)
+
+    def _load(self, force=False):
+        # type: (bool) -> Dict[str, Any]
+        """Get the operations registry from the server cache, or from the server."""
+        client = self.client
+        cache = client.server_cache
+        version = client.server_version if cache is not None else "unknown"
+        registry = None
+        if not force and version != "unknown":
+            registry = cache.load(client.host, "operations", version=version)
+        self._from_disk = registry is not None
+        if registry is None:
+            registry = self.get()
+            if version != "unknown":
+                cache.save(client.host, "operations", registry, version=version)
+
+        ops = {}
+        entries = {}
+        for operation in registry["operations"]:
+            validator = ParamsValidator(operation)
+            for name in [operation["id"], *operation.get("aliases", [])]:
+                ops[name] = operation
+                entries[name] = (operation, validator)
+        # Publish all operations at once, each dict is read on its own
+        client._registry = entries
+        client._operations = ops
+        return ops
 
     def check_params(self, command, params):
         # type: (str, Dict[str, Any]) -> None
@@ -91,43 +196,19 @@ class API(APIEndpoint):
         check for types whenever possible.
         """
 
-        operation = self.operations.get(command)
-        if not operation:
+        # Load the registry if needed, the operation and its validator are
+        # then read together, even if it is being refreshed meanwhile
+        self.operations
+        entry = self.client._registry.get(command)
+        if not entry and self._from_disk:
+            # The server may have been updated since the registry was saved
+            self.refresh()
+            entry = self.client._registry.get(command)
+        if not entry:
             raise BadQuery(f"{command!r} is not a registered operation")
 
-        parameters = {param["name"]: param for param in operation["params"]}
-
-        for name, value in params.items():
-            # Check for unexpected parameters.  We use `dict.pop()` to
-            # get and delete the parameter from the dict.
-            try:
-                param = parameters.pop(name)
-            except KeyError:
-                err = f"unexpected parameter {name!r} for operation {command}"
-                raise BadQuery(err)
-
-            # Check types
-            types_accepted, default = PARAM_TYPES[param["type"]]
-            if not param["required"]:
-                # Allow the default value when the parameter is not required
-                types_accepted += (type(default),)
-            types_accepted = tuple(set(types_accepted))  # Uniquify
-
-            if not isinstance(value, types_accepted):
-                types = [type_.__name__ for type_ in types_accepted]
-                if len(types) > 1:
-                    types = ", ".join(types[:-1]) + " or " + types[-1]
-                else:
-                    types = types[0]
-                err = f"parameter {name}={value!r} should be of type {types} (current is {type(value).__name__})"
-                raise BadQuery(err)
-
-        # Check for required parameters.  As of now, `parameters` may contain
-        # unclaimed parameters and we just need to check for required ones.
-        for (name, parameter) in parameters.items():
-            if parameter["required"]:
-                err = f"missing required parameter {name!r} for operation {command!r}"
-                raise BadQuery(err)
+        _, validator = entry
+        validator.check(params)
 
     def execute(
         self,
@@ -163,6 +244,105 @@ class API(APIEndpoint):
         default = kwargs.pop("default", object)
         timeout = kwargs.pop("timeout", object)
 
+        command = operation.command if operation else kwargs.get("command")
+        with self.client.tracer.span(
+            "nuxeo.operation", {"nuxeo.operation.id": command or ""}
+        ):
+            url, headers, data = self._prepare(
+                operation, headers, void_op, check_params, kwargs
+            )
+
+            resp = self.client.request(
+                "POST",
+                url,
+                data=data,
+                headers=headers,
+                enrichers=enrichers,
+                default=default,
+                timeout=timeout,
+                ssl_verify=ssl_verify,
+            )
+
+            # Save to a file, part by part of chunk_size
+            if file_out:
+                return self.save_to_file(
+                    operation, resp, file_out, callback=callback, **kwargs
+                )
+
+        # It is likely a JSON response we do not want to save to a file
+        if operation:
+            operation.progress = int(resp.headers.get("content-length", 0))
+
+        if json:
+            try:
+                return resp.json()
+            except ValueError:
+                pass
+        return resp.content
+
+    def execute_async(
+        self,
+        operation=None,  # type: Optional[Operation]
+        headers=None,  # type: Optional[Dict[str, str]]
+        ssl_verify=True,  # type: bool
+        **kwargs,  # type: Any
+    ):
+        # type: (...) -> Response
+        """
+        Execute an operation asynchronously and wait for its result.
+
+        The operation is started using the *@async* adapter, then its status
+        is polled with an exponential backoff until the server redirects to the result.
+        Arguments are the same as for :func:`execute`, plus:
+
+        :param poll_delay: the initial delay between two status checks, in seconds
+        :param poll_timeout: the maximum time to wait for the result, in seconds
+        :return: the HTTP response of the result, its content is not consumed yet
+        """
+        check_params = kwargs.pop("check_params", constants.CHECK_PARAMS)
+        enrichers = kwargs.pop("enrichers", None)
+        delay = kwargs.pop("poll_delay", constants.ASYNC_POLL_DELAY)
+        poll_timeout = kwargs.pop("poll_timeout", constants.ASYNC_POLL_TIMEOUT)
+
+        url, headers, data = self._prepare(
+            operation, headers, False, check_params, kwargs
+        )
+        command = url.rsplit("/", 1)[-1]
+
+        resp = self.client.request(
+            "POST",
+            f"{url}/@async",
+            data=data,
+            headers=headers,
+            enrichers=enrichers,
+            ssl_verify=ssl_verify,
+        )
+        if resp.status_code != 202:
+            # The server does not handle asynchronous calls, the result is already there
+            return resp
+
+        status_path = self._relative_path(resp.headers["Location"])
+        deadline = monotonic() + poll_timeout
+
+        while "the operation is running":
+            resp = self.client.request("GET", status_path, ssl_verify=ssl_verify, allow_redirects=False)
+
+            # Once done, the status endpoint redirects to the result
+            if resp.is_redirect:
+                resp.close()
+                result_path = self._relative_path(resp.headers["Location"])
+                return self.client.request("GET", result_path, ssl_verify=ssl_verify)
+
+            if monotonic() + delay > deadline:
+                raise OperationTimeout(command, poll_timeout)
+
+            logger.debug(f"Operation {command!r} is running, next check in {delay}s")
+            sleep(delay)
+            delay = min(delay * 2, constants.ASYNC_POLL_DELAY_MAX)
+
+    def _prepare(self, operation, headers, void_op, check_params, kwargs):
+        # type: (Optional[Operation], Optional[Dict[str, str]], bool, bool, Dict[str, Any]) -> Tuple[str, Dict, Dict]
+        """Compute the URL, the headers and the payload of an operation call."""
         command, input_obj, params, context = self.get_attributes(operation, **kwargs)
 
         if check_params:
@@ -185,33 +365,14 @@ class API(APIEndpoint):
                 input_obj = "docs:" + ",".join(input_obj)
             data["input"] = input_obj
 
-        resp = self.client.request(
-            "POST",
-            url,
-            data=data,
-            headers=headers,
-            enrichers=enrichers,
-            default=default,
-            timeout=timeout,
-            ssl_verify=ssl_verify,
-        )
+        return url, headers, data
 
-        # Save to a file, part by part of chunk_size
-        if file_out:
-            return self.save_to_file(
-                operation, resp, file_out, callback=callback, **kwargs
-            )
-
-        # It is likely a JSON response we do not want to save to a file
-        if operation:
-            operation.progress = int(resp.headers.get("content-length", 0))
-
-        if json:
-            try:
-                return resp.json()
-            except ValueError:
-                pass
-        return resp.content
+    def _relative_path(self, url):
+        # type: (str) -> str
+        """Make an absolute *url* of the server relative to the client host."""
+        path = urlparse(url).path
+        base = urlparse(self.client.host).path
+        return path[len(base) :] if path.startswith(base) else path
 
     @staticmethod
     def get_attributes(operation, **kwargs):
@@ -297,9 +458,21 @@ class API(APIEndpoint):
 
         locker = unlock_path(path) if use_lock else None
         try:
-            with open(path, "ab") as f:
-                chunk_size = kwargs.get("chunk_size", self.client.chunk_size)
-                for chunk in resp.iter_content(chunk_size=chunk_size):
+            chunk_size = kwargs.get("chunk_size", self.client.chunk_size)
+            buffer_pool = self.client.buffer_pool
+            # Bodies without Content-Length were not counted by the client
+            rate_limiter = self.client.rate_limiter
+            if "Content-Length" in resp.headers:
+                rate_limiter = None
+            attributes = {"nuxeo.operation.id": operation.command if operation else ""}
+            size = 0
+            with self.client.tracer.span("nuxeo.download", attributes) as span, open(
+                path, "ab"
+            ) as f, buffer_pool.buffer(chunk_size) as buffer:
+                for chunk in iter_response(resp, buffer):
+                    size += len(chunk)
+                    if rate_limiter is not None:
+                        rate_limiter.acquire_bytes(len(chunk))
                     # Check if synchronization thread was suspended
                     for callback in callbacks:
                         callback(path)
@@ -312,6 +485,7 @@ class API(APIEndpoint):
                 # Force write of file to disk
                 f.flush()
                 fsync(f.fileno())
+                span.set_attribute("nuxeo.download.bytes", size)
         finally:
             if use_lock:
                 lock_path(path, locker)
@@ -0,0 +1,325 @@
+# coding: utf-8
+"""
+Iterate over the entries of paginated listings, fetching pages as entries
+are consumed. See :meth:`nuxeo.endpoint.APIEndpoint.iterate`.
+
+Pages are addressed by their index and size (the *currentPageIndex* and
+*pageSize* parameters): the position of the iteration is the number of
+entries already given, so that the page size can change from a page to
+another, and an iteration can be resumed from it in another process.
+
+With a keyset, pages are instead addressed by the key of the last entry
+given: entries are sorted by a unique key and each page asks for the entries
+after that key. Deep pages are as fast to get as the first one, and entries
+added or removed meanwhile do not shift the next pages.
+"""
+import logging
+import re
+from functools import partial
+from time import monotonic
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from requests import Response
+
+from .constants import (
+    PAGE_SIZE,
+    PAGE_SIZE_MAX,
+    PAGE_SIZE_MIN,
+    PAGE_TARGET_DURATION,
+    PAGE_TARGET_SIZE,
+)
+from .exceptions import BadQuery
+
+logger = logging.getLogger(__name__)
+
+# The page size changes by this factor at most from a page to the next one
+_TUNING_FACTOR = 2.0
+
+# NXQL string literals, and dates as found in documents JSON
+_LITERALS = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?")
+
+# NXQL properties that are not in the "properties" of documents JSON
+_SYSTEM_PROPERTIES = {
+    "ecm:currentLifeCycleState": "state",
+    "ecm:name": "name",
+    "ecm:path": "path",
+    "ecm:primaryType": "type",
+    "ecm:uuid": "uid",
+}
+
+
+class PageIterator(object):
+    """
+    Iterator over the entries of a paginated listing.
+
+    While the entries of a page are consumed, the next page is fetched in the
+    background. With *auto_tune*, the page size is adapted after each page so
+    that fetching one takes about PAGE_TARGET_DURATION seconds and stays under
+    PAGE_TARGET_SIZE bytes.
+
+    The :attr:`cursor` tells where the iteration is, give it back to a new
+    iterator to continue from there:
+
+        >>> pages = nuxeo.documents.iter_query({"query": query})
+        >>> for doc in pages:
+        ...     checkpoint(pages.cursor)
+
+    :param fetch: Function getting a page given its index and size, it returns
+           the HTTP response or its JSON content
+    :param parse: Function building the object given for an entry
+    :param submit: Function running a call in the background, like
+           :meth:`nuxeo.client.NuxeoClient.submit_nested`: it must not queue
+           the call when iterating from one of the threads running calls
+    :param page_size: The number of entries per page
+    :param cursor: The position to start from, a previous :attr:`cursor`
+    :param prefetch: Fetch the next page while the current one is consumed
+    :param auto_tune: Adapt the page size to the server response times
+    """
+
+    __slots__ = ("fetch", "parse", "submit", "page_size", "prefetch", "auto_tune", "_position")
+
+    def __init__(
+        self,
+        fetch,  # type: Callable[[int, int], Any]
+        parse=None,  # type: Optional[Callable[[Any], Any]]
+        submit=None,  # type: Optional[Callable[..., Any]]
+        page_size=PAGE_SIZE,  # type: int
+        cursor=None,  # type: Optional[Dict[str, Any]]
+        prefetch=True,  # type: bool
+        auto_tune=False,  # type: bool
+    ):
+        # type: (...) -> None
+        self.fetch = fetch
+        self.parse = parse
+        self.submit = submit
+        self.page_size = page_size
+        self.prefetch = prefetch and submit is not None
+        self.auto_tune = auto_tune
+        self._position = 0  # type: Any
+        if cursor:
+            self._restore(cursor)
+
+    def __repr__(self):
+        # type: () -> str
+        return (
+            f"{type(self).__name__}<position={self._position!r}, page_size={self.page_size},"
+            f" prefetch={self.prefetch}, auto_tune={self.auto_tune}>"
+        )
+
+    @property
+    def cursor(self):
+        # type: () -> Dict[str, Any]
+        """The position of the iteration, after the last entry given. It can be saved as JSON."""
+        return {"offset": self._position, "pageSize": self.page_size}
+
+    def _restore(self, cursor):
+        # type: (Dict[str, Any]) -> None
+        """Start from the position saved in *cursor*."""
+        self._position = cursor["offset"]
+        self.page_size = cursor.get("pageSize") or self.page_size
+
+    def _next_position(self, entries):
+        # type: (List[Any]) -> Any
+        """The position after *entries*."""
+        return self._position + len(entries)
+
+    def _advance(self, entry):
+        # type: (Any) -> None
+        """Move the position after *entry*, once given."""
+        self._position += 1
+
+    def __iter__(self):
+        # type: () -> Iterator[Any]
+        pending = self._start(self._position)
+        while pending is not None:
+            entries, more = pending()
+            # The next page is asked for before the entries of this one are given
+            pending = self._start(self._next_position(entries)) if more and entries else None
+            for entry in entries:
+                item = self.parse(entry) if self.parse else entry
+                self._advance(entry)
+                yield item
+
+    def _start(self, position):
+        # type: (Any) -> Callable[[], Tuple[List[Any], bool]]
+        """Start fetching the page at *position*, the returned function gives it."""
+        if self.prefetch:
+            return self.submit(self._get_page, position).result
+        return partial(self._get_page, position)
+
+    def _get_page(self, position):
+        # type: (int) -> Tuple[List[Any], bool]
+        """The entries from *position* up to the end of their page, and whether more pages follow."""
+        size = self.page_size
+        index, skip = divmod(position, size)
+        entries, more = self._fetch(index, size)
+        return entries[skip:], more
+
+    def _fetch(self, position, size):
+        # type: (Any, int) -> Tuple[List[Any], bool]
+        """Fetch the page of *size* entries at *position*, tuning the size of the next ones."""
+        start = monotonic()
+        resp = self.fetch(position, size)
+        duration = monotonic() - start
+
+        if isinstance(resp, Response):
+            length = len(resp.content)
+            resp = resp.json()
+        else:
+            length = 0
+        if isinstance(resp, dict):
+            entries = resp.get("entries") or []
+            more = resp.get("isNextPageAvailable", len(entries) >= size)
+        else:
+            entries = resp or []
+            more = len(entries) >= size
+
+        if self.auto_tune and len(entries) >= size:
+            self._tune(size, duration, length)
+        return entries, more
+
+    def _tune(self, size, duration, length):
+        # type: (int, float, int) -> None
+        """Adapt the page size given the time a full page of *size* entries took, and its *length*."""
+        factor = PAGE_TARGET_DURATION / max(duration, 0.001)
+        if length:
+            factor = min(factor, PAGE_TARGET_SIZE / length)
+        factor = min(max(factor, 1 / _TUNING_FACTOR), _TUNING_FACTOR)
+        new_size = int(min(max(size * factor, PAGE_SIZE_MIN), PAGE_SIZE_MAX))
+        if new_size != self.page_size:
+            logger.debug("Page size changed from %d to %d", self.page_size, new_size)
+            self.page_size = new_size
+
+
+class KeysetIterator(PageIterator):
+    """
+    Iterator over the entries of a listing paginated with a keyset: each page
+    is made of the entries following the key of the last one given.
+    The :attr:`cursor` is that key.
+
+    :param fetch: Function getting a page given the key of the last entry
+           given (None for the first page) and its size
+    :param keyset: The keyset giving the key of entries, like :class:`NXQLKeyset`
+    :param kwargs: The other arguments of :class:`PageIterator`
+    """
+
+    __slots__ = ("keyset",)
+
+    def __init__(self, fetch, keyset, **kwargs):
+        # type: (Callable[[Any, int], Any], Any, Any) -> None
+        self.keyset = keyset
+        super().__init__(fetch, **kwargs)
+        if not kwargs.get("cursor"):
+            self._position = None
+
+    @property
+    def cursor(self):
+        # type: () -> Dict[str, Any]
+        """The position of the iteration, after the last entry given. It can be saved as JSON."""
+        return {"key": self._position, "pageSize": self.page_size}
+
+    def _restore(self, cursor):
+        # type: (Dict[str, Any]) -> None
+        self._position = cursor["key"]
+        self.page_size = cursor.get("pageSize") or self.page_size
+
+    def _next_position(self, entries):
+        # type: (List[Any]) -> Any
+        return self.keyset.key(entries[-1])
+
+    def _advance(self, entry):
+        # type: (Any) -> None
+        self._position = self.keyset.key(entry)
+
+    def _get_page(self, position):
+        # type: (Any) -> Tuple[List[Any], bool]
+        return self._fetch(position, self.page_size)
+
+
+def nxql_literal(value):
+    # type: (Any) -> str
+    """The NXQL literal of a property *value* taken from documents JSON."""
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        escaped = value.replace("\\", "\\\\").replace("'", "\\'")
+        if _DATE.fullmatch(value):
+            return f"TIMESTAMP '{escaped}'"
+        return f"'{escaped}'"
+    raise BadQuery(f"Cannot paginate on the value {value!r}")
+
+
+class NXQLKeyset(object):
+    """
+    Keyset pagination of a NXQL query: documents are sorted by *keys*, and
+    the query of a page only selects the documents after the last one given.
+
+    *ecm:uuid* is added to the keys when missing, to make the order unique.
+    The properties used as keys must be in the schemas fetched, and set on all
+    documents: the ones without a value cannot be placed.
+
+    :param query: The NXQL query, without ORDER BY clause
+    :param keys: The properties to sort documents by
+    """
+
+    __slots__ = ("query", "keys", "_where")
+
+    def __init__(self, query, keys=("ecm:uuid",)):
+        # type: (str, Iterable[str]) -> None
+        self.keys = [keys] if isinstance(keys, str) else list(keys)
+        if "ecm:uuid" not in self.keys:
+            self.keys.append("ecm:uuid")
+
+        # Keywords are looked for outside of string literals
+        self.query = query.strip()
+        masked = _LITERALS.sub(lambda match: "_" * len(match.group()), self.query)
+        if re.search(r"\bORDER\s+BY\b", masked, re.IGNORECASE):
+            raise BadQuery("A query paginated with a keyset is sorted by its keys, remove its ORDER BY clause.")
+        where = re.search(r"\bWHERE\b", masked, re.IGNORECASE)
+        self._where = where.end() if where else None
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<query={self.query!r}, keys={self.keys!r}>"
+
+    def key(self, entry):
+        # type: (Dict[str, Any]) -> List[Any]
+        """The values of the keys of the document *entry* JSON."""
+        values = []
+        for key in self.keys:
+            field = _SYSTEM_PROPERTIES.get(key)
+            if field:
+                value = entry.get(field)
+            else:
+                value = (entry.get("properties") or {}).get(key)
+            if value is None:
+                raise BadQuery(f"A document has no {key!r} value to paginate on, is it in the schemas fetched?")
+            values.append(value)
+        return values
+
+    def query_after(self, last=None):
+        # type: (Optional[List[Any]]) -> str
+        """The query of the documents after the *last* key, all of them if None."""
+        query = self.query
+        if last is not None:
+            literals = [nxql_literal(value) for value in last]
+            # (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ...
+            clauses = []
+            for idx, key in enumerate(self.keys):
+                terms = [f"{k} = {v}" for k, v in zip(self.keys[:idx], literals[:idx])]
+                terms.append(f"{key} > {literals[idx]}")
+                clauses.append(" AND ".join(terms))
+            after = " OR ".join(f"({clause})" for clause in clauses) if len(clauses) > 1 else clauses[0]
+            if self._where is None:
+                query = f"{query} WHERE {after}"
+            else:
+                query = f"{query[:self._where]} ({after}) AND ({query[self._where:].strip()})"
+        return f"{query} ORDER BY {', '.join(self.keys)}"
+
+    def params(self, last=None):
+        # type: (Optional[List[Any]]) -> Dict[str, str]
+        """The parameters of the request of the page after the *last* key."""
+        return {"query": self.query_after(last)}
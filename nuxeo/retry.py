@@ -0,0 +1,232 @@
+# coding: utf-8
+"""
+Retry policy of HTTP calls. On demand: decorrelated jitter between attempts,
+capped Retry-After headers, and a budget to cap the share of retries in the
+traffic. See the *retries* argument of NuxeoClient.
+"""
+import logging
+from random import uniform
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Optional
+
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+
+from .constants import RETRY_BUDGET_MIN_PER_SECOND, RETRY_BUDGET_RATIO
+from .metrics import MAX_ENDPOINTS, endpoint_template
+
+logger = logging.getLogger(__name__)
+
+
+class RetryBudget(object):
+    """
+    Cap the number of retries to a share of the requests, so that a restarting
+    or overloaded server does not receive several times its usual traffic.
+
+    Each request deposits *ratio* token and each retry withdraws one token.
+    Tokens are also refilled at *min_per_second* per second to allow retries
+    when there is little traffic. The balance never exceeds *max_balance*,
+    the number of retries allowed at once after a quiet period.
+
+    A RetryBudget also counts retries per endpoint, see
+    :func:`nuxeo.metrics.endpoint_template`.
+
+    :param ratio: The share of requests that can be retries, 0.1 for 10%
+    :param min_per_second: The retries allowed per second, whatever the traffic
+    :param max_balance: The maximum number of tokens kept
+    """
+
+    __slots__ = (
+        "ratio",
+        "min_per_second",
+        "max_balance",
+        "requests",
+        "retries",
+        "rejected",
+        "endpoints",
+        "_balance",
+        "_last",
+        "_lock",
+    )
+
+    def __init__(
+        self,
+        ratio=RETRY_BUDGET_RATIO,  # type: float
+        min_per_second=RETRY_BUDGET_MIN_PER_SECOND,  # type: float
+        max_balance=10.0,  # type: float
+    ):
+        # type: (...) -> None
+        if ratio < 0 or min_per_second < 0 or max_balance < 1:
+            raise ValueError("ratio and min_per_second must be positive, max_balance at least 1")
+
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_balance = float(max_balance)
+        self._lock = Lock()
+        self.reset()
+
+    def __repr__(self):
+        # type: () -> str
+        return (
+            f"{type(self).__name__}<ratio={self.ratio!r},"
+            f" min_per_second={self.min_per_second!r}, balance={self.balance:.2f}>"
+        )
+
+    def __getstate__(self):
+        # type: () -> Dict[str, Any]
+        return {attr: getattr(self, attr) for attr in self.__slots__ if attr != "_lock"}
+
+    def __setstate__(self, state):
+        # type: (Dict[str, Any]) -> None
+        for attr, value in state.items():
+            setattr(self, attr, value)
+        self._lock = Lock()
+
+    def after_fork(self):
+        # type: () -> None
+        """Reset the lock shared with the parent process, in a child process."""
+        self._lock = Lock()
+
+    def reset(self):
+        # type: () -> None
+        """Fill the budget and reset counters."""
+        with self._lock:
+            self.requests = 0
+            self.retries = 0
+            self.rejected = 0
+            self.endpoints = {}  # type: Dict[str, int]
+            self._balance = self.max_balance
+            self._last = monotonic()
+
+    @property
+    def balance(self):
+        # type: () -> float
+        """The number of retries currently allowed."""
+        with self._lock:
+            self._refill()
+            return self._balance
+
+    def _refill(self):
+        # type: () -> None
+        now = monotonic()
+        self._balance = min(
+            self.max_balance, self._balance + (now - self._last) * self.min_per_second
+        )
+        self._last = now
+
+    def deposit(self):
+        # type: () -> None
+        """Account for a request, called once per request by NuxeoClient."""
+        with self._lock:
+            self.requests += 1
+            self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def withdraw(self, url):
+        # type: (str) -> bool
+        """Take a token to retry a call to *url*, return False if the budget is exhausted."""
+        name = endpoint_template(url)
+        with self._lock:
+            self._refill()
+            if self._balance < 1:
+                self.rejected += 1
+                return False
+
+            self._balance -= 1
+            self.retries += 1
+            if name not in self.endpoints and len(self.endpoints) >= MAX_ENDPOINTS:
+                name = "other"
+            self.endpoints[name] = self.endpoints.get(name, 0) + 1
+            return True
+
+    def as_dict(self):
+        # type: () -> Dict[str, Any]
+        with self._lock:
+            self._refill()
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "balance": self._balance,
+                "endpoints": dict(self.endpoints),
+            }
+
+
+class NuxeoRetry(Retry):
+    """
+    Retry policy spreading retries over time to avoid thundering herds.
+
+    It behaves like :class:`urllib3.util.retry.Retry` unless asked otherwise:
+
+    - With *jitter*, the sleep between two attempts uses the "decorrelated
+      jitter" algorithm: a random duration between *backoff_factor* and three
+      times the previous sleep, capped by *backoff_max*. Clients failing at
+      the same time do not retry in lockstep. The Retry-After header of 413,
+      429 and 503 responses is capped by *backoff_max* too, and gets a jitter
+      of up to *backoff_factor* seconds.
+    - When a *budget* is given, a call is not retried once it is exhausted:
+      the last response is returned, or the last error raised.
+
+    :param budget: The retry budget shared by all calls of a client
+    :param jitter: Use decorrelated jitter instead of the exponential backoff
+    :param kwargs: kwargs passed to :class:`urllib3.util.retry.Retry`
+    """
+
+    def __init__(self, budget=None, jitter=False, backoff=0.0, **kwargs):
+        # type: (Optional[RetryBudget], bool, float, Any) -> None
+        kwargs.setdefault("respect_retry_after_header", True)
+        super().__init__(**kwargs)
+        self.budget = budget
+        self.jitter = jitter
+        # The sleep computed for the next attempt
+        self.backoff = backoff
+
+    @property
+    def max_backoff(self):
+        # type: () -> float
+        # The attribute does not exist before urllib3 2.0
+        return getattr(self, "backoff_max", Retry.DEFAULT_BACKOFF_MAX)
+
+    def new(self, **kw):
+        # type: (Any) -> NuxeoRetry
+        kw.setdefault("budget", self.budget)
+        kw.setdefault("jitter", self.jitter)
+        kw.setdefault("backoff", self.backoff)
+        return super().new(**kw)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        # type: (...) -> NuxeoRetry
+        new_retry = super().increment(
+            method=method,
+            url=url,
+            response=response,
+            error=error,
+            _pool=_pool,
+            _stacktrace=_stacktrace,
+        )
+        if response and response.get_redirect_location():
+            return new_retry
+
+        if self.budget is not None and not self.budget.withdraw(url or ""):
+            logger.warning("Retry budget exhausted, not retrying %s %s", method, url)
+            reason = error or ResponseError("retry budget exhausted")
+            raise MaxRetryError(_pool, url, reason) from reason
+
+        if self.jitter:
+            base = self.backoff_factor
+            new_retry.backoff = min(self.max_backoff, uniform(base, max(base, self.backoff) * 3))
+        return new_retry
+
+    def get_backoff_time(self):
+        # type: () -> float
+        if not self.jitter:
+            return super().get_backoff_time()
+        return self.backoff
+
+    def get_retry_after(self, response):
+        # type: (Any) -> Optional[float]
+        seconds = super().get_retry_after(response)
+        if seconds is None or not self.jitter:
+            return seconds
+        # Clients told to come back at the same time must not do it in lockstep
+        return min(self.max_backoff, seconds) + uniform(0, self.backoff_factor)
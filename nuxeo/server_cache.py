@@ -0,0 +1,146 @@
+# coding: utf-8
+"""
+On-disk cache of server documents that are heavy to get and rarely change:
+the server information and the automation operations registry. Processes
+started later reuse them instead of downloading them again.
+See the *server_cache* argument of NuxeoClient.
+
+Each document is a file made of a JSON header line followed by the JSON
+document itself. The header tells which server, and which server version,
+the document is from, when it was saved and the SHA-256 checksum of the
+document: a file that does not match, is too old or is corrupted is ignored.
+"""
+import hashlib
+import json
+import logging
+import os
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from time import time
+from typing import Any, Optional
+
+from .constants import SERVER_CACHE_MAX_AGE, WINDOWS
+
+logger = logging.getLogger(__name__)
+
+# Version of the files format, files in another format are ignored
+FORMAT = 1
+
+
+def default_directory():
+    # type: () -> str
+    """The user cache directory of the platform."""
+    if WINDOWS:
+        root = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        root = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(root, "nuxeo-python-client")
+
+
+class ServerCache(object):
+    """
+    Cache of server documents, shared by all processes using the same *directory*.
+
+    :param directory: Where files are saved, the user cache directory by default
+    :param max_age: The duration documents are used for, in seconds
+    """
+
+    __slots__ = ("directory", "max_age", "_lock")
+
+    def __init__(self, directory=None, max_age=SERVER_CACHE_MAX_AGE):
+        # type: (Optional[str], float) -> None
+        self.directory = directory or default_directory()
+        self.max_age = max_age
+        self._lock = Lock()
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<directory={self.directory!r}, max_age={self.max_age}>"
+
+    def after_fork(self):
+        # type: () -> None
+        """Reset the lock shared with the parent process, in a child process."""
+        self._lock = Lock()
+
+    def path(self, host, name=None):
+        # type: (str, Optional[str]) -> str
+        """The folder of the *host* files, or the file of its *name* document."""
+        folder = os.path.join(self.directory, hashlib.sha256(host.encode("utf-8")).hexdigest()[:16])
+        return folder if name is None else os.path.join(folder, f"{name}.json")
+
+    def load(self, host, name, version=None):
+        # type: (str, str, Optional[str]) -> Optional[Any]
+        """The *name* document of *host*, None if it is not cached or not valid anymore."""
+        path = self.path(host, name)
+        try:
+            with open(path, "rb") as file:
+                header = json.loads(file.readline())
+                content = file.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            logger.warning("Ignoring the invalid server cache file %r", path, exc_info=True)
+            return None
+
+        if (
+            not isinstance(header, dict)
+            or header.get("format") != FORMAT
+            or header.get("host") != host
+            or header.get("version") != version
+        ):
+            return None
+        if time() - header.get("saved", 0) > self.max_age:
+            return None
+        if hashlib.sha256(content).hexdigest() != header.get("checksum"):
+            logger.warning("Ignoring the corrupted server cache file %r", path)
+            return None
+
+        try:
+            return json.loads(content)
+        except ValueError:
+            logger.warning("Ignoring the invalid server cache file %r", path, exc_info=True)
+            return None
+
+    def save(self, host, name, data, version=None):
+        # type: (str, str, Any, Optional[str]) -> None
+        """Save the *name* document of *host*, errors are logged and ignored."""
+        content = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        header = {
+            "format": FORMAT,
+            "host": host,
+            "name": name,
+            "version": version,
+            "saved": time(),
+            "checksum": hashlib.sha256(content).hexdigest(),
+        }
+        path = self.path(host, name)
+        folder = os.path.dirname(path)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            # Written aside and then moved, other processes never read a partial file
+            with NamedTemporaryFile(dir=folder, prefix=f".{name}-", delete=False) as file:
+                file.write(json.dumps(header).encode("utf-8") + b"\n")
+                file.write(content)
+            os.replace(file.name, path)
+        except OSError:
+            logger.warning("Cannot save the server cache file %r", path, exc_info=True)
+
+    def invalidate(self, host=None, name=None):
+        # type: (Optional[str], Optional[str]) -> None
+        """Remove the *name* document of *host*, all its documents, or everything."""
+        with self._lock:
+            if host is None:
+                hosts = os.listdir(self.directory) if os.path.isdir(self.directory) else []
+                folders = [os.path.join(self.directory, folder) for folder in hosts]
+            else:
+                folders = [self.path(host)]
+
+            for folder in folders:
+                if not os.path.isdir(folder):
+                    continue
+                for filename in os.listdir(folder):
+                    if name is None or filename == f"{name}.json":
+                        try:
+                            os.remove(os.path.join(folder, filename))
+                        except OSError:
+                            logger.warning("Cannot remove the server cache file %r", filename, exc_info=True)
@@ -1,3 +1,32 @@
+from importlib.util import find_spec
+from typing import List
+
+from .direct import DirectTransport
+from .stats import PoolStats, StatsHTTPAdapter
 from .tcp_keep_alive_probes import TCPKeepAliveHTTPSAdapter
+from .timings import RequestTimings, get_timings
+
+__all__ = (
+    "TRANSPORTS",
+    "DirectTransport",
+    "PoolStats",
+    "RequestTimings",
+    "StatsHTTPAdapter",
+    "TCPKeepAliveHTTPSAdapter",
+    "available_transports",
+    "get_timings",
+)
+
+# How requests are sent: HTTP/1.1 through Requests, HTTP/2 with HTTPX (see http2.py),
+# or HTTP/1.1 straight to urllib3 pools (see direct.py)
+TRANSPORTS = ("requests", "http2", "urllib3")
+
 
-__all__ = ("TCPKeepAliveHTTPSAdapter",)
+def available_transports():
+    # type: () -> List[str]
+    """The transports whose requirements are installed."""
+    transports = ["requests"]
+    if find_spec("httpx") and find_spec("h2"):
+        transports.append("http2")
+    transports.append("urllib3")
+    return transports
@@ -0,0 +1,161 @@
+# coding: utf-8
+"""
+Send small calls straight to the urllib3 connection pools of the transport
+adapters, skipping the Requests machinery: request preparation, settings
+merging and the redirections loop. Those cost more than the network exchange
+itself for small JSON calls on a fast network.
+
+Calls the transport does not handle are given back to the Requests session:
+bodies other than bytes and strings, authentication objects other than the
+Nuxeo ones, proxies, client certificates and Requests specific arguments.
+See the *transport* argument of NuxeoClient.
+"""
+from typing import Any, Dict, Optional
+from urllib.parse import urlsplit
+
+from requests import Request, Response, Session
+from requests.cookies import extract_cookies_to_jar, get_cookie_header
+from requests.hooks import dispatch_hook
+from requests.models import RequestEncodingMixin
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, requote_uri
+from urllib3.util import Timeout
+
+from ..auth.base import AuthBase
+from .errors import raise_requests_error
+
+# Arguments of Session.request() the transport knows about
+SUPPORTED_KWARGS = frozenset(["params", "stream", "timeout"])
+
+
+class _Request(object):
+    """The parts of a request that authentication objects and the adapter look at."""
+
+    __slots__ = ("method", "url", "headers", "body")
+
+    def __init__(self, method, url, headers, body):
+        # type: (str, str, Dict[str, str], Any) -> None
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+
+
+class DirectTransport(object):
+    """
+    Send calls with the urllib3 pools of the adapters mounted on *session*,
+    so that connections, retries and statistics are shared with calls
+    going through the session.
+
+    :param session: The Requests session of the client
+    """
+
+    __slots__ = ("session",)
+
+    def __init__(self, session):
+        # type: (Session) -> None
+        self.session = session
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<session={self.session!r}>"
+
+    def supports(self, auth, data, kwargs):
+        # type: (Any, Any, Dict[str, Any]) -> bool
+        """Check if the call can be sent directly."""
+        return (
+            (auth is None or isinstance(auth, AuthBase))
+            and (data is None or isinstance(data, (bytes, str)))
+            and kwargs.keys() <= SUPPORTED_KWARGS
+        )
+
+    def request(
+        self,
+        method,  # type: str
+        url,  # type: str
+        headers,  # type: Dict[str, str]
+        auth=None,  # type: Optional[AuthBase]
+        data=None,  # type: Any
+        verify=True,  # type: Any
+        params=None,  # type: Any
+        stream=None,  # type: Optional[bool]
+        timeout=None,  # type: Any
+    ):
+        # type: (...) -> Any
+        """Send a call, the arguments are the ones of :meth:`requests.Session.request`."""
+        session = self.session
+        adapter = session.get_adapter(url)
+        settings = session.merge_environment_settings(url, {}, stream, verify, None)
+        if settings["proxies"] or settings["cert"] or not hasattr(adapter, "poolmanager"):
+            return session.request(
+                method,
+                url,
+                headers=headers,
+                auth=auth,
+                data=data,
+                params=params,
+                stream=stream,
+                timeout=timeout,
+                verify=verify,
+                allow_redirects=False,
+            )
+
+        if params:
+            query = RequestEncodingMixin._encode_params(params)
+            if query:
+                url = f"{url}&{query}" if "?" in url else f"{url}?{query}"
+        url = requote_uri(url)
+
+        body = data.encode("utf-8") if isinstance(data, str) else data
+        request = _Request(method, url, {**session.headers, **headers}, body)
+        if body is None and method not in ("GET", "HEAD"):
+            request.headers["Content-Length"] = "0"
+        if session.cookies:
+            cookie = get_cookie_header(session.cookies, Request(method, url, request.headers))
+            if cookie:
+                request.headers["Cookie"] = cookie
+        if auth is not None:
+            auth(request)
+
+        parts = urlsplit(url)
+        path = f"{parts.path or '/'}?{parts.query}" if parts.query else parts.path or "/"
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = Timeout(connect=connect, read=read)
+        else:
+            timeout = Timeout(connect=timeout, read=timeout)
+
+        try:
+            host_params, pool_kwargs = adapter.build_connection_pool_key_attributes(request, settings["verify"], None)
+            pool = adapter.poolmanager.connection_from_host(**host_params, pool_kwargs=pool_kwargs)
+            raw = pool.urlopen(
+                method=method,
+                url=path,
+                body=body,
+                headers=request.headers,
+                redirect=False,
+                assert_same_host=False,
+                preload_content=False,
+                decode_content=False,
+                retries=adapter.max_retries,
+                timeout=timeout,
+                chunked=False,
+            )
+        except Exception as exc:
+            raise_requests_error(exc, request)
+
+        response = Response()
+        response.status_code = raw.status
+        response.headers = CaseInsensitiveDict(raw.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = raw
+        response.reason = raw.reason
+        response.url = url
+        response.connection = adapter
+        if "set-cookie" in response.headers:
+            extract_cookies_to_jar(session.cookies, Request(method, url, request.headers), raw)
+
+        response = dispatch_hook("response", session.hooks, response)
+        if not settings["stream"]:
+            response.content
+        return response
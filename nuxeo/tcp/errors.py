@@ -0,0 +1,60 @@
+# coding: utf-8
+"""
+Translate urllib3 errors into the Requests ones, for transports not going
+through the Requests HTTPAdapter.
+"""
+from typing import Any
+
+from requests.exceptions import (
+    ConnectionError,
+    ConnectTimeout,
+    InvalidHeader,
+    ProxyError,
+    ReadTimeout,
+    RetryError,
+    SSLError,
+)
+from urllib3.exceptions import (
+    ClosedPoolError,
+    ConnectTimeoutError,
+    HTTPError,
+    InvalidHeader as _InvalidHeader,
+    MaxRetryError,
+    NewConnectionError,
+    ProtocolError,
+    ProxyError as _ProxyError,
+    ReadTimeoutError,
+    ResponseError,
+    SSLError as _SSLError,
+)
+
+
+def raise_requests_error(exc, request=None):
+    # type: (BaseException, Any) -> None
+    """Raise the Requests error matching the urllib3 *exc*, as the HTTPAdapter does."""
+    if isinstance(exc, MaxRetryError):
+        reason = exc.reason
+        if isinstance(reason, ConnectTimeoutError) and not isinstance(reason, NewConnectionError):
+            raise ConnectTimeout(exc, request=request) from exc
+        if isinstance(reason, ResponseError):
+            raise RetryError(exc, request=request) from exc
+        if isinstance(reason, _ProxyError):
+            raise ProxyError(exc, request=request) from exc
+        if isinstance(reason, _SSLError):
+            raise SSLError(exc, request=request) from exc
+        raise ConnectionError(exc, request=request) from exc
+    if isinstance(exc, _ProxyError):
+        raise ProxyError(exc, request=request) from exc
+    if isinstance(exc, _SSLError):
+        raise SSLError(exc, request=request) from exc
+    if isinstance(exc, ReadTimeoutError):
+        raise ReadTimeout(exc, request=request) from exc
+    if isinstance(exc, ConnectTimeoutError) and not isinstance(exc, NewConnectionError):
+        raise ConnectTimeout(exc, request=request) from exc
+    if isinstance(exc, _InvalidHeader):
+        raise InvalidHeader(exc, request=request) from exc
+    if isinstance(exc, (ProtocolError, ClosedPoolError, NewConnectionError, OSError)):
+        raise ConnectionError(exc, request=request) from exc
+    if isinstance(exc, HTTPError):
+        raise ConnectionError(exc, request=request) from exc
+    raise exc
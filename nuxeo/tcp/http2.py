@@ -0,0 +1,368 @@
+# coding: utf-8
+"""
+Transport adapter sending requests with HTTPX, over HTTP/2 when the server
+supports it: calls made at the same time to a host share one connection,
+instead of each one opening its own with its TLS handshake.
+
+Requests still prepares requests and handles authentication, cookies, hooks
+and redirections; retries follow the urllib3 retry policy of the client.
+Requires the *http2* extra (httpx and h2). See the *transport* argument of NuxeoClient.
+"""
+import os
+import ssl
+from http.client import HTTPMessage
+from threading import Lock
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from requests.adapters import DEFAULT_POOLSIZE, DEFAULT_RETRIES, BaseAdapter
+from requests.cookies import extract_cookies_to_jar
+from requests.models import PreparedRequest, Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from urllib3.exceptions import (
+    ConnectTimeoutError,
+    MaxRetryError,
+    NewConnectionError,
+    ProtocolError,
+    ReadTimeoutError,
+)
+from urllib3.util.retry import Retry
+
+from .errors import raise_requests_error
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Size of the chunks read from file-like request bodies
+BODY_CHUNK_SIZE = 64 * 1024
+
+Timeout = Any  # None, a number or a (connect, read) tuple, as given to Requests
+
+
+def available():
+    # type: () -> bool
+    """Check if HTTPX and its HTTP/2 support are installed."""
+    if httpx is None:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _as_urllib3_error(exc):
+    # type: (Exception) -> Exception
+    """Translate an HTTPX error into the urllib3 one the retry policy knows."""
+    if isinstance(exc, httpx.ConnectTimeout):
+        return ConnectTimeoutError(str(exc))
+    if isinstance(exc, httpx.ConnectError):
+        return NewConnectionError(None, str(exc))
+    if isinstance(exc, httpx.TimeoutException):
+        return ReadTimeoutError(None, None, str(exc))
+    return ProtocolError(str(exc), exc)
+
+
+def _ssl_context(verify, cert):
+    # type: (Any, Any) -> Any
+    """The TLS settings of HTTPX from Requests *verify* and *cert* arguments."""
+    if not verify:
+        return False
+    if verify is True and not cert:
+        return True
+
+    context = ssl.create_default_context()
+    if isinstance(verify, str):
+        if os.path.isdir(verify):
+            context = ssl.create_default_context(capath=verify)
+        else:
+            context = ssl.create_default_context(cafile=verify)
+    if cert:
+        if isinstance(cert, str):
+            context.load_cert_chain(cert)
+        else:
+            context.load_cert_chain(*cert)
+    return context
+
+
+def _content(body, position):
+    # type: (Any, Optional[int]) -> Any
+    """The content given to HTTPX for a Requests *body*, file-like ones are rewound to *position*."""
+    if not hasattr(body, "read"):
+        return body
+    if position is not None:
+        body.seek(position)
+    read = body.read
+    return iter(lambda: read(BODY_CHUNK_SIZE), b"")
+
+
+class _RetryResponse(object):
+    """What urllib3 retry policies need to know about an answer."""
+
+    __slots__ = ("status", "headers")
+
+    def __init__(self, status, headers):
+        # type: (int, Any) -> None
+        self.status = status
+        self.headers = headers
+
+    def get_redirect_location(self):
+        # type: () -> bool
+        # Redirections are handled by Requests and the client
+        return False
+
+
+class _OriginalResponse(object):
+    """The bare minimum Requests needs to extract cookies."""
+
+    __slots__ = ("msg",)
+
+    def __init__(self, msg):
+        # type: (HTTPMessage) -> None
+        self.msg = msg
+
+
+class HTTP2Body(object):
+    """The body of an HTTPX response, read by Requests like an urllib3 one."""
+
+    __slots__ = ("decode_content", "retries", "_original_response", "_response", "_chunks", "_buffer")
+
+    def __init__(self, response, retries):
+        # type: (httpx.Response, Retry) -> None
+        self._response = response
+        self._chunks = None  # type: Optional[Iterator[bytes]]
+        self._buffer = b""
+        #: The retry policy state, with the *history* of attempts
+        self.retries = retries
+        #: Decode the body according to its Content-Encoding, when read() is not told
+        self.decode_content = True
+
+        # Requests extracts cookies from http.client headers
+        self._original_response = None  # type: Optional[_OriginalResponse]
+        if "set-cookie" in response.headers:
+            msg = HTTPMessage()
+            for name, value in response.headers.multi_items():
+                msg[name] = value
+            self._original_response = _OriginalResponse(msg)
+
+    @property
+    def version_string(self):
+        # type: () -> str
+        """The HTTP version of the answer, like "HTTP/2"."""
+        return self._response.http_version
+
+    def _next_chunk(self, decode_content):
+        # type: (bool) -> bytes
+        # The body is decoded, or not, from its first chunk to the end
+        if self._chunks is None:
+            response = self._response
+            self._chunks = response.iter_bytes() if decode_content else response.iter_raw()
+        try:
+            return next(self._chunks, b"")
+        except httpx.TransportError as exc:
+            # Requests turns those into ChunkedEncodingError and ReadTimeout
+            raise _as_urllib3_error(exc) from exc
+
+    def read(self, amt=None, decode_content=None, **kwargs):
+        # type: (Optional[int], Optional[bool], Any) -> bytes
+        """Read data, as much as *amt* bytes, or until the end."""
+        if decode_content is None:
+            decode_content = self.decode_content
+        data = [self._buffer]
+        size = len(self._buffer)
+        while amt is None or size < amt:
+            chunk = self._next_chunk(decode_content)
+            if not chunk:
+                break
+            data.append(chunk)
+            size += len(chunk)
+        data = b"".join(data)
+        if amt is None:
+            self._buffer = b""
+            return data
+        self._buffer = data[amt:]
+        return data[:amt]
+
+    def stream(self, amt=BODY_CHUNK_SIZE, decode_content=None):
+        # type: (int, Optional[bool]) -> Iterator[bytes]
+        while True:
+            data = self.read(amt, decode_content=decode_content)
+            if not data:
+                break
+            yield data
+
+    def close(self):
+        # type: () -> None
+        self._response.close()
+
+    def release_conn(self):
+        # type: () -> None
+        # The HTTP/2 stream is freed when the response is closed
+        self._response.close()
+
+
+class HTTP2Adapter(BaseAdapter):
+    """
+    Transport adapter sending requests with HTTPX, over HTTP/2 when possible.
+
+    :param pool_connections: The number of hosts to keep connections to
+    :param pool_maxsize: The maximum number of connections kept open per host,
+           with HTTP/2 one is usually enough as calls are multiplexed
+    :param max_retries: The retry policy, see :class:`nuxeo.retry.NuxeoRetry`
+    :param pool_block: Ignored, HTTPX always waits for a free connection
+    :param stats: Ignored, the statistics of connection pools are not tracked
+    """
+
+    __attrs__ = ["max_retries", "_pool_connections", "_pool_maxsize"]
+
+    def __init__(
+        self,
+        pool_connections=DEFAULT_POOLSIZE,  # type: int
+        pool_maxsize=DEFAULT_POOLSIZE,  # type: int
+        max_retries=DEFAULT_RETRIES,  # type: Any
+        pool_block=False,  # type: bool
+        stats=None,  # type: Any
+    ):
+        # type: (...) -> None
+        if not available():
+            raise ImportError("HTTP/2 requires the nuxeo[http2] extra: httpx and h2.")
+        super().__init__()
+        if max_retries == DEFAULT_RETRIES:
+            self.max_retries = Retry(0, read=False)
+        else:
+            self.max_retries = Retry.from_int(max_retries)
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._clients = {}  # type: Dict[Tuple[Any, ...], httpx.Client]
+        self._lock = Lock()
+
+    def __getstate__(self):
+        # type: () -> Dict[str, Any]
+        return {attr: getattr(self, attr, None) for attr in self.__attrs__}
+
+    def __setstate__(self, state):
+        # type: (Dict[str, Any]) -> None
+        for attr, value in state.items():
+            setattr(self, attr, value)
+        self._clients = {}
+        self._lock = Lock()
+
+    def client(self, verify=True, cert=None, proxy=None):
+        # type: (Any, Any, Optional[str]) -> httpx.Client
+        """The HTTPX client for these TLS and proxy settings, created on first use."""
+        key = (verify, cert, proxy)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = httpx.Client(
+                        http2=True,
+                        verify=_ssl_context(verify, cert),
+                        proxy=proxy,
+                        limits=httpx.Limits(
+                            max_connections=self._pool_connections * self._pool_maxsize,
+                            max_keepalive_connections=self._pool_maxsize,
+                        ),
+                        follow_redirects=False,
+                        trust_env=False,
+                    )
+        return client
+
+    def send(
+        self,
+        request,  # type: PreparedRequest
+        stream=False,  # type: bool
+        timeout=None,  # type: Timeout
+        verify=True,  # type: Any
+        cert=None,  # type: Any
+        proxies=None,  # type: Optional[Dict[str, str]]
+    ):
+        # type: (...) -> Response
+        scheme = request.url.split(":", 1)[0]
+        client = self.client(verify=verify, cert=cert, proxy=(proxies or {}).get(scheme))
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            timeout = httpx.Timeout(read, connect=connect)
+        else:
+            timeout = httpx.Timeout(timeout)
+
+        # File-like bodies are sent again from where they started on retries
+        position = None
+        if hasattr(request.body, "read"):
+            try:
+                position = request.body.tell()
+            except (AttributeError, OSError):
+                pass
+        rewindable = position is not None or not hasattr(request.body, "read")
+
+        retries = self.max_retries
+        while True:
+            try:
+                resp = client.send(
+                    client.build_request(
+                        request.method,
+                        request.url,
+                        headers=request.headers,
+                        content=_content(request.body, position),
+                        timeout=timeout,
+                    ),
+                    stream=True,
+                )
+            except httpx.TransportError as exc:
+                error = _as_urllib3_error(exc)
+                if not rewindable:
+                    raise_requests_error(error, request)
+                try:
+                    retries = retries.increment(request.method, request.url, error=error)
+                except Exception as final:
+                    raise_requests_error(final, request)
+                retries.sleep()
+                continue
+
+            has_retry_after = "retry-after" in resp.headers
+            if not retries.is_retry(request.method, resp.status_code, has_retry_after):
+                break
+
+            answer = _RetryResponse(resp.status_code, resp.headers)
+            try:
+                retries = retries.increment(request.method, request.url, response=answer)
+            except MaxRetryError as exc:
+                if retries.raise_on_status:
+                    resp.close()
+                    raise_requests_error(exc, request)
+                break
+            if rewindable:
+                resp.close()
+                retries.sleep(answer)
+                continue
+            # The body cannot be sent again
+            break
+
+        response = self.build_response(request, resp, retries)
+        if not stream:
+            response.content
+        return response
+
+    def build_response(self, request, resp, retries):
+        # type: (PreparedRequest, httpx.Response, Retry) -> Response
+        response = Response()
+        response.status_code = resp.status_code
+        response.headers = CaseInsensitiveDict(resp.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = HTTP2Body(resp, retries)
+        response.reason = resp.reason_phrase
+        response.url = request.url
+        extract_cookies_to_jar(response.cookies, request, response.raw)
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        # type: () -> None
+        with self._lock:
+            clients, self._clients = self._clients, {}
+        for client in clients.values():
+            client.close()
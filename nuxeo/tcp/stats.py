@@ -0,0 +1,214 @@
+# coding: utf-8
+"""
+Connection pools keeping track of how connections are used.
+See NuxeoClient.pool_stats().
+"""
+import queue
+from threading import Lock, local
+from time import monotonic
+from typing import Any, Dict, Optional
+
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool, PoolManager
+
+from .timings import TimedHTTPConnection, TimedHTTPSConnection
+
+
+class PoolStats(object):
+    """Counters shared by all the connection pools of a client."""
+
+    __slots__ = (
+        "active",
+        "discarded",
+        "new_connections",
+        "requests",
+        "wait_time",
+        "_lock",
+        "_local",
+    )
+
+    def __init__(self):
+        # type: () -> None
+        self._lock = Lock()
+        self._local = local()
+        self.reset()
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<{self.as_dict()!r}>"
+
+    def __getstate__(self):
+        # type: () -> Dict[str, Any]
+        # Adapters are pickled with the session, the lock cannot be
+        return {attr: getattr(self, attr) for attr in self.__slots__ if attr not in ("_lock", "_local")}
+
+    def __setstate__(self, state):
+        # type: (Dict[str, Any]) -> None
+        self._lock = Lock()
+        self._local = local()
+        for attr, value in state.items():
+            setattr(self, attr, value)
+
+    def reset(self):
+        # type: () -> None
+        with self._lock:
+            self.active = 0
+            self.discarded = 0
+            self.new_connections = 0
+            self.requests = 0
+            self.wait_time = 0.0
+
+    def as_dict(self, idle=0):
+        # type: (int) -> Dict[str, Any]
+        """
+        Return a snapshot of the counters.
+
+        :param idle: the number of idle connections, computed by the caller
+        """
+        with self._lock:
+            return {
+                "active": self.active,
+                "idle": idle,
+                "discarded": self.discarded,
+                "new_connections": self.new_connections,
+                "requests": self.requests,
+                # Connections taken from a pool rather than opened for the request
+                "reused_connections": max(0, self.requests - self.new_connections),
+                "wait_time": self.wait_time,
+            }
+
+    def thread_wait_time(self):
+        # type: () -> float
+        """Total time spent by the current thread getting a connection, in seconds."""
+        return getattr(self._local, "wait_time", 0.0)
+
+    def on_new_connection(self):
+        # type: () -> None
+        with self._lock:
+            self.new_connections += 1
+
+    def on_checkout(self, wait):
+        # type: (float) -> None
+        self._local.wait_time = self.thread_wait_time() + wait
+        with self._lock:
+            self.active += 1
+            self.requests += 1
+            self.wait_time += wait
+
+    def on_checkin(self, discarded=False):
+        # type: (bool) -> None
+        with self._lock:
+            self.active = max(0, self.active - 1)
+            if discarded:
+                self.discarded += 1
+
+
+class StatsConnectionPoolMixin(object):
+    """Update the pool manager statistics on connections checkout/checkin."""
+
+    # Set by the pool manager, right after the pool creation
+    stats = None  # type: Optional[PoolStats]
+
+    def _new_conn(self):
+        conn = super()._new_conn()
+        if self.stats:
+            self.stats.on_new_connection()
+        return conn
+
+    def _get_conn(self, timeout=None):
+        start = monotonic()
+        conn = super()._get_conn(timeout=timeout)
+        if self.stats:
+            self.stats.on_checkout(monotonic() - start)
+        return conn
+
+    def _put_conn(self, conn):
+        timings = getattr(conn, "timings", None)
+        if timings is not None:
+            # The answer was read, or will not be
+            conn.timings = None
+            timings.on_complete()
+
+        discarded = False
+        if self.pool is not None and conn is not None:
+            try:
+                self.pool.put(conn, block=False)
+            except queue.Full:
+                # The parent class will close it (and log or raise, depending on *block*)
+                discarded = True
+            else:
+                if self.stats:
+                    self.stats.on_checkin()
+                return
+
+        if self.stats:
+            self.stats.on_checkin(discarded=discarded)
+        super()._put_conn(conn)
+
+    def idle_connections(self):
+        # type: () -> int
+        """Number of open connections waiting in the pool."""
+        if self.pool is None:
+            return 0
+        return sum(1 for conn in list(self.pool.queue) if conn is not None)
+
+
+class StatsHTTPConnectionPool(StatsConnectionPoolMixin, HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class StatsHTTPSConnectionPool(StatsConnectionPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class StatsPoolManager(PoolManager):
+    """Pool manager creating connection pools that share the same statistics."""
+
+    def __init__(self, num_pools=10, headers=None, stats=None, **connection_pool_kw):
+        super().__init__(num_pools=num_pools, headers=headers, **connection_pool_kw)
+        self.stats = stats or PoolStats()
+        self.pool_classes_by_scheme = {
+            "http": StatsHTTPConnectionPool,
+            "https": StatsHTTPSConnectionPool,
+        }
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super()._new_pool(scheme, host, port, request_context=request_context)
+        pool.stats = self.stats
+        return pool
+
+    def idle_connections(self):
+        # type: () -> int
+        """Number of open connections waiting in all pools."""
+        with self.pools.lock:
+            pools = list(self.pools._container.values())
+        return sum(pool.idle_connections() for pool in pools)
+
+
+class StatsHTTPAdapter(HTTPAdapter):
+    """Transport adapter keeping track of its connections usage."""
+
+    __attrs__ = HTTPAdapter.__attrs__ + ["stats"]
+
+    def __init__(self, stats=None, **kwargs):
+        # type: (Optional[PoolStats], Any) -> None
+        # Must be set before the parent creates the pool manager
+        self.stats = stats or PoolStats()
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        """Override the default pool manager."""
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
+        self.poolmanager = StatsPoolManager(
+            num_pools=connections,
+            maxsize=maxsize,
+            block=block,
+            stats=self.stats,
+            **pool_kwargs,
+        )
+
+    def idle_connections(self):
+        # type: () -> int
+        return self.poolmanager.idle_connections()
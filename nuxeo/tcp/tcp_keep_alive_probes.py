@@ -5,10 +5,13 @@ See NXPY-183 and linked tickets for details.
 """
 import socket
 
-from requests.adapters import HTTPAdapter
-from urllib3 import HTTPSConnectionPool, PoolManager
-
 from ..constants import LINUX, MAC, TCP_KEEPINTVL, TCP_KEEPIDLE, WINDOWS
+from .stats import (
+    StatsHTTPAdapter,
+    StatsHTTPConnectionPool,
+    StatsHTTPSConnectionPool,
+    StatsPoolManager,
+)
 
 
 class TCPKeepAliveValidationMethods(object):
@@ -45,7 +48,7 @@ class TCPKeepAliveValidationMethods(object):
             sock.ioctl(socket.SIO_KEEPALIVE_VALS, opt)
 
 
-class TCPKeepAliveHTTPSConnectionPool(HTTPSConnectionPool):
+class TCPKeepAliveHTTPSConnectionPool(StatsHTTPSConnectionPool):
     """
     This class overrides the _validate_conn method in the HTTPSConnectionPool class. This is the entry point to use
     for modifying the socket as it is called after the socket is created and before the request is made.
@@ -57,7 +60,7 @@ class TCPKeepAliveHTTPSConnectionPool(HTTPSConnectionPool):
         TCPKeepAliveValidationMethods.adjust_connection_socket(conn)
 
 
-class TCPKeepAlivePoolManager(PoolManager):
+class TCPKeepAlivePoolManager(StatsPoolManager):
     """
     This pool manager has only had the *pool_classes_by_scheme* variable changed.
     This now points at our custom connection pools rather than the default connection pools.
@@ -66,15 +69,23 @@ class TCPKeepAlivePoolManager(PoolManager):
     def __init__(self, num_pools=10, headers=None, **connection_pool_kw):
         super().__init__(num_pools=num_pools, headers=headers, **connection_pool_kw)
         self.pool_classes_by_scheme = {
+            "http": StatsHTTPConnectionPool,
             "https": TCPKeepAliveHTTPSConnectionPool,
         }
 
 
-class TCPKeepAliveHTTPSAdapter(HTTPAdapter):
+class TCPKeepAliveHTTPSAdapter(StatsHTTPAdapter):
     """"Transport adapter that allows us to set TCP keep-alive options."""
 
-    def init_poolmanager(self, connections, maxsize, **pool_kwargs):
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
         """Override the default pool manager."""
+        self._pool_connections = connections
+        self._pool_maxsize = maxsize
+        self._pool_block = block
         self.poolmanager = TCPKeepAlivePoolManager(
-            num_pools=connections, maxsize=maxsize, **pool_kwargs
+            num_pools=connections,
+            maxsize=maxsize,
+            block=block,
+            stats=self.stats,
+            **pool_kwargs,
         )
@@ -0,0 +1,223 @@
+# coding: utf-8
+"""
+Connections measuring the duration of each step of a request:
+DNS resolution, TCP connection, TLS handshake, sending, waiting for
+the first byte of the answer and receiving its body.
+See NuxeoResponse.timings.
+"""
+import logging
+import socket
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.exceptions import ConnectTimeoutError
+from urllib3.util.connection import allowed_gai_family
+
+logger = logging.getLogger(__name__)
+
+
+class RequestTimings(object):
+    """
+    Durations of the steps of a request, in seconds.
+
+    *dns*, *connect* and *tls* are 0 when the connection was reused (*reused* is True).
+    *transfer* is None until the body of the answer is read or the response closed.
+    """
+
+    __slots__ = (
+        "dns",
+        "connect",
+        "tls",
+        "send",
+        "ttfb",
+        "transfer",
+        "reused",
+        "_sent_at",
+        "_headers_at",
+        "_callbacks",
+    )
+
+    # The steps known as soon as headers of the answer are received
+    PHASES = ("dns", "connect", "tls", "send", "ttfb")
+
+    def __init__(self):
+        # type: () -> None
+        self.dns = 0.0
+        self.connect = 0.0
+        self.tls = 0.0
+        self.send = 0.0
+        self.ttfb = 0.0
+        self.transfer = None  # type: Optional[float]
+        self.reused = True
+        self._sent_at = 0.0
+        self._headers_at = 0.0
+        self._callbacks = []  # type: List[Callable[[RequestTimings], Any]]
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<{self.as_dict()!r}>"
+
+    @property
+    def total(self):
+        # type: () -> float
+        return sum(self.phases().values()) + (self.transfer or 0.0)
+
+    def phases(self):
+        # type: () -> Dict[str, float]
+        """Durations of the steps done before the body of the answer is read."""
+        return {phase: getattr(self, phase) for phase in self.PHASES}
+
+    def as_dict(self):
+        # type: () -> Dict[str, Any]
+        details = self.phases()  # type: Dict[str, Any]
+        details["transfer"] = self.transfer
+        details["reused"] = self.reused
+        return details
+
+    def when_complete(self, callback):
+        # type: (Callable[[RequestTimings], Any]) -> None
+        """Call *callback* with these timings once the transfer is done, right now if it is."""
+        if self.transfer is None:
+            self._callbacks.append(callback)
+        else:
+            callback(self)
+
+    def on_sent(self, duration):
+        # type: (float) -> None
+        self.send = duration
+        self._sent_at = perf_counter()
+
+    def on_headers(self):
+        # type: () -> None
+        self._headers_at = perf_counter()
+        self.ttfb = self._headers_at - self._sent_at
+
+    def on_complete(self):
+        # type: () -> None
+        """The body was read, or the connection given back: the transfer is done."""
+        if self.transfer is not None or not self._headers_at:
+            return
+
+        self.transfer = perf_counter() - self._headers_at
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                logger.warning("Timings callback %r failed", callback, exc_info=True)
+
+
+class TimedConnectionMixin(object):
+    """Measure the steps of requests sent through the connection."""
+
+    #: Timings of the current request
+    timings = None  # type: Optional[RequestTimings]
+
+    #: Whether a TLS handshake is done on connect
+    secure = False
+
+    # (dns, connect, tls, started at, total duration) of a connection not yet used by a request
+    _opened = None  # type: Optional[Tuple[float, float, float, float, float]]
+    _dns = 0.0
+    _tcp = 0.0
+
+    def _new_conn(self):
+        start = perf_counter()
+        host = self._dns_host
+        try:
+            addresses = self._resolve(host)
+        except socket.gaierror:
+            addresses = []
+        if not addresses:
+            # Let urllib3 raise its own error
+            return super()._new_conn()
+        resolved = perf_counter()
+        self._dns = resolved - start
+
+        # Try each address, as the standard library does, without resolving names twice
+        error = None
+        try:
+            for address in addresses:
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except ConnectTimeoutError as exc:
+                    error = exc
+            else:
+                raise error
+        finally:
+            self._dns_host = host
+            error = None
+
+        self._tcp = perf_counter() - resolved
+        return sock
+
+    def _resolve(self, host):
+        # type: (str) -> List[str]
+        """The IP addresses of *host*, in the order given by the system."""
+        if host.startswith("["):
+            host = host.strip("[]")
+        addresses = []  # type: List[str]
+        for *_, sockaddr in socket.getaddrinfo(host, self.port, allowed_gai_family(), socket.SOCK_STREAM):
+            if sockaddr[0] not in addresses:
+                addresses.append(sockaddr[0])
+        return addresses
+
+    def connect(self):
+        start = perf_counter()
+        self._dns = self._tcp = 0.0
+        super().connect()
+        duration = perf_counter() - start
+        tls = max(0.0, duration - self._dns - self._tcp) if self.secure else 0.0
+        self._opened = (self._dns, self._tcp, tls, start, duration)
+
+    def request(self, *args, **kwargs):
+        timings = self.timings = RequestTimings()
+        start = perf_counter()
+        super().request(*args, **kwargs)
+        send = perf_counter() - start
+
+        opened, self._opened = self._opened, None
+        if opened:
+            timings.dns, timings.connect, timings.tls, connected_at, duration = opened
+            timings.reused = False
+            if connected_at >= start:
+                # Plain HTTP connections are opened when sending the request
+                send -= duration
+        timings.on_sent(max(0.0, send))
+
+    def getresponse(self, *args, **kwargs):
+        response = super().getresponse(*args, **kwargs)
+        timings = self.timings
+        if timings is not None:
+            timings.on_headers()
+            response.timings = timings
+        return response
+
+    def close(self):
+        super().close()
+        timings = self.timings
+        if timings is not None:
+            self.timings = None
+            timings.on_complete()
+
+
+class TimedHTTPConnection(TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(TimedConnectionMixin, HTTPSConnection):
+    secure = True
+
+
+def get_timings(response):
+    # type: (Any) -> Optional[RequestTimings]
+    """The timings of a Requests or urllib3 *response*, if known."""
+    raw = getattr(response, "raw", response)
+    timings = getattr(raw, "timings", None)
+    if timings is None:
+        # urllib3 < 2 wraps the response given by the connection
+        timings = getattr(getattr(raw, "_original_response", None), "timings", None)
+    return timings
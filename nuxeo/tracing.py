@@ -0,0 +1,168 @@
+# coding: utf-8
+"""
+Tracing of HTTP calls, uploads and operations.
+
+Tracing is disabled by default. When OpenTelemetry is installed, spans are
+sent to the configured tracer provider and the trace context is given to the
+server with the W3C *traceparent* header, so that server traces link up.
+See the *tracer* argument of NuxeoClient.
+"""
+from contextlib import contextmanager
+from importlib.util import find_spec
+from typing import Any, Dict, Generator, Optional, Type, Union
+
+from . import __version__
+from .exceptions import InvalidTracer
+
+Attributes = Optional[Dict[str, Any]]
+
+
+class NoopSpan(object):
+    """A span doing nothing, also a context manager."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        # type: () -> NoopSpan
+        return self
+
+    def __exit__(self, *args):
+        # type: (Any) -> None
+        pass
+
+    def set_attribute(self, key, value):
+        # type: (str, Any) -> None
+        pass
+
+    def record_exception(self, exception, **kwargs):
+        # type: (BaseException, Any) -> None
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Tracer(object):
+    """No-op tracer, the default. Subclasses send spans somewhere."""
+
+    __slots__ = ()
+
+    #: The name given to NuxeoClient(tracer=...)
+    name = "noop"
+
+    #: False when spans are not recorded, the client skips computing their attributes
+    enabled = False
+
+    def __repr__(self):
+        # type: () -> str
+        return f"{type(self).__name__}<name={self.name!r}>"
+
+    @staticmethod
+    def available():
+        # type: () -> bool
+        return True
+
+    def span(self, name, attributes=None):
+        # type: (str, Attributes) -> Any
+        """
+        Context manager of a span, the current one until it exits.
+        The yielded span has a *set_attribute(key, value)* method.
+        """
+        return NOOP_SPAN
+
+    def start_span(self, name, attributes=None):
+        # type: (str, Attributes) -> Any
+        """Start a span, child of the current one, to be given to :meth:`end_span`."""
+        return NOOP_SPAN
+
+    def end_span(self, span, response=None, error=None):
+        # type: (Any, Any, Optional[BaseException]) -> None
+        """End a span started by :meth:`start_span`, with the HTTP *response* or *error*."""
+
+    def inject(self, headers, span):
+        # type: (Dict[str, str], Any) -> Dict[str, str]
+        """Return *headers* with the trace context of *span* added."""
+        return headers
+
+
+class OpenTelemetryTracer(Tracer):
+    """
+    Tracer using the OpenTelemetry API.
+
+    :param tracer_provider: The provider of the tracer, the global one by default
+    """
+
+    __slots__ = ("_tracer", "_trace", "_propagate")
+    name = "opentelemetry"
+    enabled = True
+
+    def __init__(self, tracer_provider=None):
+        # type: (Any) -> None
+        # Imported here, it takes time and tracing is disabled by default
+        from opentelemetry import propagate, trace
+
+        self._trace = trace
+        self._propagate = propagate
+        self._tracer = trace.get_tracer("nuxeo", __version__, tracer_provider=tracer_provider)
+
+    @staticmethod
+    def available():
+        # type: () -> bool
+        return find_spec("opentelemetry") is not None and find_spec("opentelemetry.trace") is not None
+
+    @contextmanager
+    def span(self, name, attributes=None):
+        # type: (str, Attributes) -> Generator[Any, None, None]
+        with self._tracer.start_as_current_span(name, attributes=attributes) as span:
+            yield span
+
+    def start_span(self, name, attributes=None):
+        # type: (str, Attributes) -> Any
+        return self._tracer.start_span(name, kind=self._trace.SpanKind.CLIENT, attributes=attributes)
+
+    def end_span(self, span, response=None, error=None):
+        # type: (Any, Any, Optional[BaseException]) -> None
+        Status, StatusCode = self._trace.Status, self._trace.StatusCode
+        if response is not None:
+            span.set_attribute("http.response.status_code", response.status_code)
+            if response.status_code >= 400:
+                span.set_status(Status(StatusCode.ERROR))
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(Status(StatusCode.ERROR, f"{type(error).__name__}: {error}"))
+        span.end()
+
+    def inject(self, headers, span):
+        # type: (Dict[str, str], Any) -> Dict[str, str]
+        # Endpoints may give the same headers dict to several calls
+        headers = dict(headers)
+        self._propagate.inject(headers, context=self._trace.set_span_in_context(span))
+        return headers
+
+
+TRACERS = {
+    tracer.name: tracer for tracer in (Tracer, OpenTelemetryTracer)
+}  # type: Dict[str, Type[Tracer]]
+
+
+def get_tracer(name):
+    # type: (Union[str, Tracer, None]) -> Tracer
+    """
+    Get a tracer from its *name*.
+
+    :param name: one of TRACERS, "auto" to use OpenTelemetry when installed,
+           or a Tracer instance that is returned as-is
+    """
+    if isinstance(name, Tracer):
+        return name
+
+    if name is None:
+        name = "noop"
+    elif name == "auto":
+        name = "opentelemetry" if OpenTelemetryTracer.available() else "noop"
+
+    cls = TRACERS.get(name)
+    if not cls or not cls.available():
+        available = [tracer for tracer, cls in TRACERS.items() if cls.available()]
+        raise InvalidTracer(name, available)
+    return cls()
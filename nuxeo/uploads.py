@@ -79,11 +79,15 @@ class API(APIEndpoint):
 
             if handler != "default":
                 endpoint = f"{endpoint}/new/{handler}"
-        data = self.client.request(
+        response = self.client.request(
             "POST", endpoint, ssl_verify=ssl_verify, **kwargs
-        ).json()
+        )
+        data = response.json()
         # Set a uniq ID for that batch, it will be used by third-party upload handlers
         data["key"] = str(uuid4())
+        if self.client.hosts is not None:
+            # The batch lives on the node that created it
+            self.client.hosts.bind(data["batchId"], response.url)
         return Batch.parse(data, service=self)
 
     batch = post  # Alias for clarity
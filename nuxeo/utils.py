@@ -3,15 +3,18 @@ from _hashlib import HASH
 import hashlib
 import logging
 import mimetypes
+import os
+import struct
 import sys
-from packaging.version import Version
+import zlib
 from functools import lru_cache
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple
 
 from requests import Response
 
 from . import constants
 from .constants import UP_AMAZON_S3
+from .exceptions import CorruptedFile, InvalidArchive
 
 
 logger = logging.getLogger(__name__)
@@ -27,6 +30,12 @@ WIN32_PATCHED_MIME_TYPES = {
     "application/x-mspowerpoint.12": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
 }
 
+# ZIP records signatures
+# See https://pkware.cachefly.net/webdocs/casestudies/APPNOTE.TXT
+ZIP_LOCAL_FILE = b"PK\x03\x04"
+ZIP_DATA_DESCRIPTOR = b"PK\x07\x08"
+ZIP_STORED, ZIP_DEFLATED = 0, 8
+
 
 def chunk_partition(file_size, desired_chunk_size, handler=""):
     # type: (int, int, Optional[str]) -> Tuple[int, int]
@@ -71,6 +80,167 @@ def cmp(a, b):
     return 1 if str(b) == "0" else (a > b) - (a < b)
 
 
+class _StreamReader(object):
+    """Minimal reader over a non-seekable stream that allows to push data back."""
+
+    __slots__ = ("_pending", "_stream")
+
+    def __init__(self, stream):
+        # type: (BinaryIO) -> None
+        self._stream = stream
+        self._pending = b""
+
+    def read(self, size):
+        # type: (int) -> bytes
+        """Read *size* bytes, or less only when the end of the stream is reached."""
+        data = self._pending[:size]
+        self._pending = self._pending[size:]
+        while len(data) < size:
+            chunk = self._stream.read(size - len(data))
+            if not chunk:
+                break
+            data += chunk
+        return data
+
+    def read_exact(self, size):
+        # type: (int) -> bytes
+        data = self.read(size)
+        if len(data) != size:
+            raise InvalidArchive("Unexpected end of the archive.")
+        return data
+
+    def unread(self, data):
+        # type: (bytes) -> None
+        self._pending = data + self._pending
+
+
+def _zip_entry_path(dest, name):
+    # type: (str, str) -> str
+    """Return the local path of the *name* entry, preventing path traversals."""
+    name = name.replace("\\", "/")
+    parts = [part for part in name.split("/") if part not in ("", ".")]
+    if name.startswith("/") or ".." in parts or (parts and ":" in parts[0]):
+        raise InvalidArchive(f"Unsafe entry name {name!r}.")
+    return os.path.join(dest, *parts)
+
+
+def _zip64_sizes(extra, compressed_size, size):
+    # type: (bytes, int, int) -> Tuple[int, int]
+    """Get real sizes of an entry from its ZIP64 extra field, if any."""
+    while len(extra) >= 4:
+        header_id, data_size = struct.unpack("<2H", extra[:4])
+        if header_id == 0x0001:
+            data = extra[4 : 4 + data_size]
+            if size == 0xFFFFFFFF:
+                size, data = struct.unpack("<Q", data[:8])[0], data[8:]
+            if compressed_size == 0xFFFFFFFF:
+                compressed_size = struct.unpack("<Q", data[:8])[0]
+            break
+        extra = extra[4 + data_size :]
+    return compressed_size, size
+
+
+def _extract_zip_entry(reader, fd, method, compressed_size, chunk_size):
+    # type: (_StreamReader, Optional[BinaryIO], int, int, int) -> Tuple[int, int, int]
+    """
+    Extract the data of the current entry into *fd*.
+
+    :return: a tuple of the CRC-32, compressed and uncompressed sizes of the data
+    """
+    crc, consumed, size = 0, 0, 0
+
+    if method == ZIP_STORED:
+        while consumed < compressed_size:
+            chunk = reader.read_exact(min(chunk_size, compressed_size - consumed))
+            consumed += len(chunk)
+            crc = zlib.crc32(chunk, crc)
+            if fd:
+                fd.write(chunk)
+        return crc, consumed, consumed
+
+    # Deflated data is self-delimited, there is no need to know its size
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    while not decompressor.eof:
+        chunk = reader.read(chunk_size)
+        if not chunk:
+            raise InvalidArchive("Unexpected end of the archive.")
+        consumed += len(chunk)
+        data = decompressor.decompress(chunk)
+        size += len(data)
+        crc = zlib.crc32(data, crc)
+        if fd:
+            fd.write(data)
+
+    # Give back what belongs to the next record
+    reader.unread(decompressor.unused_data)
+    consumed -= len(decompressor.unused_data)
+    return crc, consumed, size
+
+
+def extract_zip_stream(stream, dest, chunk_size=constants.CHUNK_SIZE):
+    # type: (BinaryIO, str, int) -> List[str]
+    """
+    Extract a ZIP archive read sequentially from *stream* into the *dest* folder.
+
+    Entries are extracted one after the other using their local headers, so that the
+    *stream* does not need to be seekable and the archive is never fully loaded
+    in memory. The central directory, at the end of the archive, is ignored.
+
+    :param stream: a file-like object with a read() method (e.g. ``Response.raw``)
+    :param dest: the destination folder
+    :param chunk_size: the size of the data read at once from the stream
+    :return: the list of extracted files
+    """
+    reader = _StreamReader(stream)
+    dest = os.path.abspath(dest)
+    files = []  # type: List[str]
+
+    while reader.read(4) == ZIP_LOCAL_FILE:
+        header = struct.unpack("<5H3L2H", reader.read_exact(26))
+        _, flags, method, _, _, crc, compressed_size, size, name_len, extra_len = header
+        encoding = "utf-8" if flags & 0x800 else "cp437"
+        name = reader.read_exact(name_len).decode(encoding)
+        extra = reader.read_exact(extra_len)
+        descriptor = bool(flags & 0x08)
+
+        if flags & 0x01:
+            raise InvalidArchive(f"Encrypted entry {name!r} is not supported.")
+        if method not in (ZIP_STORED, ZIP_DEFLATED):
+            raise InvalidArchive(f"Compression method {method} of {name!r} is not supported.")
+        if method == ZIP_STORED and descriptor:
+            raise InvalidArchive(f"Stored entry {name!r} has no size, it cannot be streamed.")
+
+        compressed_size, size = _zip64_sizes(extra, compressed_size, size)
+        path = _zip_entry_path(dest, name)
+
+        if name.endswith("/"):
+            os.makedirs(path, exist_ok=True)
+            computed = _extract_zip_entry(reader, None, method, compressed_size, chunk_size)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as fd:
+                computed = _extract_zip_entry(reader, fd, method, compressed_size, chunk_size)
+            files.append(path)
+        computed_crc, compressed_size, size = computed
+
+        if descriptor:
+            # The CRC-32 and sizes are written after the data,
+            # the signature is optional and sizes may be on 4 or 8 bytes (ZIP64).
+            data = reader.read_exact(4)
+            if data == ZIP_DATA_DESCRIPTOR:
+                data = reader.read_exact(4)
+            crc = struct.unpack("<L", data)[0]
+            sizes = reader.read_exact(8)
+            if struct.unpack("<2L", sizes) != (compressed_size, size):
+                reader.read_exact(8)
+
+        if computed_crc != crc:
+            raise CorruptedFile(path, f"{crc:08x}", f"{computed_crc:08x}")
+        logger.debug(f"Extracted {name!r} ({size:,} bytes)")
+
+    return files
+
+
 def get_digest_algorithm(digest):
     # type: (str) -> Optional[str]
 
@@ -310,6 +480,9 @@ def version_compare_client(x, y):
     if y and "-I" in y:
         y = y.split("-")[0]
 
+    # Imported here as it is only needed to compare server versions
+    from packaging.version import Version
+
     try:
         return cmp(Version(x), Version(y))
     except Exception:
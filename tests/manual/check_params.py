@@ -0,0 +1,124 @@
+# coding: utf-8
+"""
+Measure the cost of checking operation parameters, alone and per execute(), without any network I/O.
+
+The transport adapter is replaced by one answering with a registry of generated
+operations, and with a small document to operation calls.
+
+    python -m tests.manual.check_params [--count 20000]
+"""
+import argparse
+import json
+from time import perf_counter
+
+from requests import Response
+from requests.adapters import BaseAdapter
+
+from nuxeo.client import Nuxeo
+from nuxeo.operations import PARAM_TYPES
+from tests.constants import NUXEO_SERVER_URL
+
+TYPES = sorted(PARAM_TYPES)
+
+
+def registry(count=700):
+    operations = []
+    for idx in range(count):
+        params = [
+            {"name": f"param{param}", "type": TYPES[(idx + param) % len(TYPES)], "required": param < 2}
+            for param in range(6)
+        ]
+        operations.append({"id": f"Operation.Number{idx}", "aliases": [f"Alias.Number{idx}"], "params": params})
+    operations.append(
+        {
+            "id": "Document.Query",
+            "params": [
+                {"name": "query", "type": "string", "required": True},
+                {"name": "pageSize", "type": "integer", "required": False},
+                {"name": "currentPageIndex", "type": "integer", "required": False},
+                {"name": "sortBy", "type": "stringlist", "required": False},
+                {"name": "queryParams", "type": "stringlist", "required": False},
+            ],
+        }
+    )
+    return {"operations": operations}
+
+
+class CannedAdapter(BaseAdapter):
+    """Answer with the registry, or with the same small JSON document."""
+
+    registry = json.dumps(registry()).encode("utf-8")
+    body = b'{"entity-type": "documents", "entries": []}'
+
+    def send(self, request, **kwargs):
+        resp = Response()
+        resp.status_code = 200
+        resp.headers["Content-Type"] = "application/json"
+        resp._content = self.registry if request.url.endswith("/site/automation") else self.body
+        resp.request = request
+        resp.url = request.url
+        return resp
+
+    def close(self):
+        pass
+
+
+def legacy_check_params(operations, command, params):
+    """The parameters check before validators were compiled, for comparison."""
+    operation = operations.get(command)
+    parameters = {param["name"]: param for param in operation["params"]}
+    for name, value in params.items():
+        param = parameters.pop(name)
+        types_accepted, default = PARAM_TYPES[param["type"]]
+        if not param["required"]:
+            types_accepted += (type(default),)
+        types_accepted = tuple(set(types_accepted))
+        assert isinstance(value, types_accepted)
+    for name, parameter in parameters.items():
+        assert not parameter["required"]
+
+
+def timeit(label, count, func):
+    # Warm-up
+    for _ in range(100):
+        func()
+    start = perf_counter()
+    for _ in range(count):
+        func()
+    elapsed = perf_counter() - start
+    print(f"{label:>32}: {elapsed / count * 1e6:7.2f} µs")
+
+
+def bench(count):
+    server = Nuxeo(host=NUXEO_SERVER_URL, auth=("Administrator", "Administrator"))
+    server.client._session.hooks["response"] = []
+    for prefix in ("http://", "https://"):
+        server.client._session.mount(prefix, CannedAdapter())
+
+    start = perf_counter()
+    operations = server.operations.operations
+    print(f"Registry of {len(operations):,} operations and aliases loaded in {(perf_counter() - start) * 1e3:.1f} ms")
+
+    params = {"query": "SELECT * FROM Document", "pageSize": 50, "currentPageIndex": 2, "sortBy": ["dc:title"]}
+    check = server.operations.check_params
+    timeit("check_params() before", count, lambda: legacy_check_params(operations, "Document.Query", params))
+    timeit("check_params()", count, lambda: check("Document.Query", params))
+
+    execute = server.operations.execute
+    for check_params in (False, True):
+        timeit(
+            f"execute(check_params={check_params})",
+            count,
+            lambda: execute(command="Document.Query", params=dict(params), check_params=check_params),
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=20_000)
+    args = parser.parse_args()
+    bench(args.count)
+
+
+if __name__ == "__main__":
+    main()
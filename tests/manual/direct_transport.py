@@ -0,0 +1,96 @@
+# coding: utf-8
+"""
+Compare the Requests and urllib3 transports on small calls sent one after the other.
+
+The client CPU time is measured, and not the wall-clock time, so the result is
+the number of calls a single core can send. Without --host, a small keep-alive
+server is started in another process:
+
+    python -m tests.manual.direct_transport [--host URL] [--count 20000]
+"""
+import argparse
+import socket
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import Process
+from time import perf_counter, process_time, sleep
+
+from nuxeo.client import Nuxeo
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    body = b'{"entity-type": "document", "uid": "1234", "title": "doc"}'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(port):
+    httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    httpd.daemon_threads = True
+    httpd.serve_forever()
+
+
+def wait_for(port):
+    for _ in range(50):
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            return
+        except OSError:
+            sleep(0.1)
+
+
+def bench(host, transport, count):
+    server = Nuxeo(host=host, auth=("Administrator", "Administrator"), transport=transport)
+    client = server.client
+    params = {"properties": "*", "pageSize": 10}
+
+    # Warm-up: open the connection and authenticate
+    for _ in range(100):
+        client.request("GET", "api/v1/path/", params=params).json()
+
+    start, cpu = perf_counter(), process_time()
+    for _ in range(count):
+        client.request("GET", "api/v1/path/", params=params).json()
+    elapsed, cpu = perf_counter() - start, process_time() - cpu
+
+    print(
+        f"{transport:>8}: {count:,} calls in {elapsed:.3f} sec, "
+        f"{count / cpu:,.0f} calls/sec per core, {cpu / count * 1e6:.1f} µs of CPU per call"
+    )
+    client.on_exit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", help="a Nuxeo server, a local one is started by default")
+    parser.add_argument("--count", type=int, default=20_000)
+    parser.add_argument("--port", type=int, default=8765, help="the port of the local server")
+    args = parser.parse_args()
+
+    local = None
+    host = args.host
+    if not host:
+        local = Process(target=serve, args=(args.port,), daemon=True)
+        local.start()
+        wait_for(args.port)
+        host = f"http://127.0.0.1:{args.port}/nuxeo/"
+
+    try:
+        for transport in ("requests", "urllib3"):
+            bench(host, transport, args.count)
+    finally:
+        if local:
+            local.terminate()
+
+
+if __name__ == "__main__":
+    main()
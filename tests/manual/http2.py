@@ -0,0 +1,59 @@
+# coding: utf-8
+"""
+Compare the HTTP/1.1 and HTTP/2 transports on many small metadata calls sent
+concurrently. HTTP/2 needs a server speaking it, usually behind TLS:
+
+    python -m tests.manual.http2 --host https://nuxeo.example.org/nuxeo [--count 2000] [--threads 16]
+
+Requires the nuxeo[http2] extra.
+"""
+import argparse
+from time import perf_counter
+
+from nuxeo.client import Nuxeo
+from tests.constants import NUXEO_SERVER_URL
+
+
+def bench(host, transport, count, threads, verify):
+    server = Nuxeo(
+        host=host,
+        auth=("Administrator", "Administrator"),
+        transport=transport,
+        max_workers=threads,
+        verify=verify,
+    )
+    client = server.client
+
+    # Warm-up: open connections and authenticate
+    for future in client.map(lambda _: client.request("GET", "api/v1/path/").content, range(threads)):
+        future.result()
+
+    start = perf_counter()
+    futures = client.map(lambda _: client.request("GET", "api/v1/path/").content, range(count))
+    for future in futures:
+        future.result()
+    elapsed = perf_counter() - start
+
+    version = getattr(client.request("GET", "api/v1/path/").raw, "version_string", "HTTP/1.1")
+    connections = client.pool_stats()["new_connections"] if transport == "requests" else "n/a"
+    print(
+        f"{transport:>8} ({version}): {count:,} calls in {elapsed:.3f} sec, "
+        f"{count / elapsed:,.0f} calls/sec, connections opened: {connections}"
+    )
+    client.on_exit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default=NUXEO_SERVER_URL)
+    parser.add_argument("--count", type=int, default=2_000)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--insecure", action="store_true", help="do not verify TLS certificates")
+    args = parser.parse_args()
+
+    for transport in ("requests", "http2"):
+        bench(args.host, transport, args.count, args.threads, not args.insecure)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# coding: utf-8
+"""
+Measure the time taken by `import nuxeo.client` and Nuxeo(), with `python -X importtime`.
+
+Requests is imported first, so that only the time spent by the client and its
+other dependencies is measured. The command fails when the median time goes over
+the threshold, to catch regressions:
+
+    python -m tests.manual.import_time [--runs 10] [--threshold 100] [--top 10]
+"""
+import argparse
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+
+SCRIPT = """
+import requests
+from time import perf_counter
+start = perf_counter()
+from nuxeo.client import Nuxeo
+Nuxeo()
+print(perf_counter() - start)
+"""
+
+
+def run():
+    """Import times of modules in seconds, and the time to import the client and construct Nuxeo()."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    requests_imported = False
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, name = line[len("import time:"):].split("|")
+        if requests_imported:
+            modules[name.strip()] = int(self_time) / 1e6
+        # Modules are listed after the ones they import
+        requests_imported = requests_imported or name == " requests"
+    return modules, float(proc.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=100, help="in milliseconds")
+    parser.add_argument("--top", type=int, default=10, help="the number of slowest modules to show")
+    args = parser.parse_args()
+
+    start = perf_counter()
+    runs = [run() for _ in range(args.runs)]
+    elapsed = perf_counter() - start
+
+    totals = [total for _, total in runs]
+    slowest = {}
+    for modules, _ in runs:
+        for name, self_time in modules.items():
+            slowest.setdefault(name, []).append(self_time)
+    slowest = sorted(((median(times), name) for name, times in slowest.items()), reverse=True)
+
+    print(f"Slowest modules to import (self time, median of {args.runs} runs):")
+    for self_time, name in slowest[: args.top]:
+        print(f"  {self_time * 1e3:7.2f} ms  {name}")
+
+    total = median(totals) * 1e3
+    print(f"import nuxeo.client and Nuxeo(): {total:.1f} ms (min {min(totals) * 1e3:.1f} ms), in {elapsed:.1f} sec")
+    if total > args.threshold:
+        print(f"Over the threshold of {args.threshold:.0f} ms!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
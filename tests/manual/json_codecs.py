@@ -0,0 +1,97 @@
+# coding: utf-8
+"""
+Compare JSON codecs on a large query page, as returned by the Search endpoint.
+
+    python -m tests.manual.json_codecs [--entries 1000] [--count 50]
+"""
+import argparse
+import uuid
+from time import perf_counter
+
+from nuxeo.json_codecs import CODECS, get_codec
+
+
+def make_page(entries):
+    """A page of documents with the dublincore, file and common schemas."""
+    docs = []
+    for idx in range(entries):
+        uid = str(uuid.uuid4())
+        docs.append(
+            {
+                "entity-type": "document",
+                "repository": "default",
+                "uid": uid,
+                "path": f"/default-domain/workspaces/ws/doc-{idx}",
+                "type": "File",
+                "state": "project",
+                "parentRef": str(uuid.uuid4()),
+                "isCheckedOut": True,
+                "isVersion": False,
+                "isProxy": False,
+                "changeToken": f"1-{idx}",
+                "title": f"Document n°{idx}",
+                "lastModified": "2026-10-19T10:00:00.000Z",
+                "facets": ["Versionable", "Publishable", "Commentable", "Downloadable"],
+                "properties": {
+                    "dc:title": f"Document n°{idx}",
+                    "dc:description": "Lorem ipsum dolor sit amet " * 4,
+                    "dc:creator": "Administrator",
+                    "dc:contributors": ["Administrator", "alice", "bob"],
+                    "dc:created": "2026-10-19T10:00:00.000Z",
+                    "dc:modified": "2026-10-19T10:00:00.000Z",
+                    "dc:subjects": [],
+                    "common:size": None,
+                    "file:content": {
+                        "name": f"file-{idx}.pdf",
+                        "mime-type": "application/pdf",
+                        "encoding": None,
+                        "digestAlgorithm": "MD5",
+                        "digest": uuid.uuid4().hex,
+                        "length": str(idx * 1024),
+                        "data": f"https://nuxeo.example.org/nuxeo/nxfile/default/{uid}/file:content/file-{idx}.pdf",
+                    },
+                },
+            }
+        )
+
+    return {
+        "entity-type": "documents",
+        "isPaginable": True,
+        "resultsCount": entries,
+        "pageSize": entries,
+        "currentPageIndex": 0,
+        "numberOfPages": 1,
+        "entries": docs,
+    }
+
+
+def bench(func, count):
+    func()  # Warm-up
+    start = perf_counter()
+    for _ in range(count):
+        func()
+    return (perf_counter() - start) / count * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--count", type=int, default=50)
+    args = parser.parse_args()
+
+    page = make_page(args.entries)
+    payload = get_codec("json").dumps(page).encode("utf-8")
+    print(f"Page of {args.entries:,} entries, {len(payload):,} bytes")
+
+    for name, cls in CODECS.items():
+        if not cls.available():
+            print(f"{name:>8}: not installed")
+            continue
+        codec = cls()
+        loads = bench(lambda: codec.loads(payload), args.count)
+        dumps = bench(lambda: codec.dumps(page), args.count)
+        print(f"{name:>8}: loads {loads:7.2f} ms, dumps {dumps:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
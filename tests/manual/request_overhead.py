@@ -0,0 +1,70 @@
+# coding: utf-8
+"""
+Measure the client overhead of NuxeoClient.request(), without any network I/O.
+
+The transport adapter is replaced by one returning a canned response, so the
+measured time is only spent preparing the request and handling the response.
+
+    python -m tests.manual.request_overhead [--count 20000]
+"""
+import argparse
+import logging
+from time import perf_counter
+
+from requests import Response
+from requests.adapters import BaseAdapter
+
+from nuxeo.client import Nuxeo
+from tests.constants import NUXEO_SERVER_URL
+
+
+class CannedAdapter(BaseAdapter):
+    """Answer every request with the same small JSON document."""
+
+    body = b'{"entity-type": "document", "uid": "1234", "title": "doc"}'
+
+    def send(self, request, **kwargs):
+        resp = Response()
+        resp.status_code = 200
+        resp.headers["Content-Type"] = "application/json"
+        resp._content = self.body
+        resp.request = request
+        resp.url = request.url
+        return resp
+
+    def close(self):
+        pass
+
+
+def bench(count):
+    server = Nuxeo(host=NUXEO_SERVER_URL, auth=("Administrator", "Administrator"))
+    server.client._session.hooks["response"] = []
+    for prefix in ("http://", "https://"):
+        server.client._session.mount(prefix, CannedAdapter())
+
+    params = {"properties": "*", "pageSize": 10}
+    headers = {"X-Custom-Header": "value"}
+
+    # Warm-up
+    for _ in range(100):
+        server.client.request("GET", "api/v1/path/", headers=headers.copy(), params=params).json()
+
+    start = perf_counter()
+    for _ in range(count):
+        server.client.request("GET", "api/v1/path/", headers=headers.copy(), params=params).json()
+    elapsed = perf_counter() - start
+
+    print(f"{count:,} requests in {elapsed:.3f} sec: {elapsed / count * 1e6:.1f} µs per request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=20_000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    bench(args.count)
+
+
+if __name__ == "__main__":
+    main()
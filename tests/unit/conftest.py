@@ -0,0 +1,121 @@
+# coding: utf-8
+import json
+import re
+from http.server import ThreadingHTTPServer
+from threading import Lock, Thread
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import responses
+from nuxeo.client import Nuxeo
+from ..constants import NUXEO_SERVER_URL
+
+API = f"{NUXEO_SERVER_URL}/api/v1"
+
+
+@pytest.fixture
+def start_http_server(request):
+    """
+    Start local HTTP servers, stopped at the end of the test.
+
+    ``start_http_server(handler=None)`` answers with *handler*, the *Handler*
+    class of the test module by default. The server *url* is the one of a
+    Nuxeo server, and handlers can record what they receive in its *calls*
+    and *bodies* lists.
+    """
+    servers = []
+
+    def start(handler=None):
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler or request.module.Handler)
+        httpd.daemon_threads = True
+        httpd.calls = []
+        httpd.bodies = []
+        httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/nuxeo/"
+        Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        return httpd
+
+    yield start
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def http_server(start_http_server):
+    """A local HTTP server answering with the *Handler* class of the test module."""
+    return start_http_server()
+
+
+@pytest.fixture
+def nuxeo_client():
+    """
+    Create Nuxeo clients, closed at the end of the test.
+
+    ``nuxeo_client(host=NUXEO_SERVER_URL, **kwargs)`` gives a client of *host*
+    authenticated as Administrator, other *kwargs* are given to Nuxeo().
+    """
+    servers = []
+
+    def create(host=NUXEO_SERVER_URL, **kwargs):
+        kwargs.setdefault("auth", ("Administrator", "Administrator"))
+        server = Nuxeo(host=host, **kwargs)
+        servers.append(server)
+        return server
+
+    yield create
+    for server in servers:
+        server.client.on_exit()
+
+
+class Repository(object):
+    """
+    Documents answered by the mocked REST API, recording the calls.
+
+    NXQL queries on uids give the *existing* documents, in any order.
+    Creations fail for the names in *failing*, else they are recorded
+    in *created* with their parent path and properties. Queries answer
+    with the *status* error when it is not 200.
+    """
+
+    def __init__(self):
+        self.existing = set()
+        self.failing = ()
+        self.status = 200
+        self.queries = []
+        self.created = []
+        self.lock = Lock()
+
+    def query(self, request):
+        params = parse_qs(urlsplit(request.url).query)
+        uids = re.findall(r"'([^']+)'", params["query"][0])
+        with self.lock:
+            self.queries.append((uids, params, dict(request.headers), request.url))
+        if self.status != 200:
+            return self.status, {}, json.dumps({"entity-type": "exception", "message": "error"})
+        entries = [
+            {"entity-type": "document", "uid": uid, "title": f"title-{uid}"}
+            for uid in reversed(uids)
+            if uid in self.existing
+        ]
+        return 200, {}, json.dumps({"entity-type": "documents", "entries": entries})
+
+    def create(self, request):
+        body = json.loads(request.body)
+        if body["name"] in self.failing:
+            return 400, {}, json.dumps({"entity-type": "exception", "message": "invalid"})
+        parent = request.url[len(f"{API}/repo/default") :]
+        with self.lock:
+            self.created.append((body["name"], parent, body.get("properties")))
+        doc = {"entity-type": "document", "uid": f"uid-{body['name']}", "name": body["name"], "type": body["type"]}
+        return 201, {}, json.dumps(doc)
+
+
+@pytest.fixture
+def repository():
+    """A :class:`Repository` answering the document queries and creations of the test."""
+    repository = Repository()
+    with responses.RequestsMock(assert_all_requests_are_fired=False) as mock:
+        mock.add_callback(responses.GET, re.compile(f"{API}/query/NXQL.*"), callback=repository.query)
+        mock.add_callback(responses.POST, re.compile(f"{API}/repo/default/.*"), callback=repository.create)
+        yield repository
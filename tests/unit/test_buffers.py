@@ -0,0 +1,175 @@
+# coding: utf-8
+from http.server import BaseHTTPRequestHandler
+from io import BytesIO, StringIO
+from threading import Thread
+from time import sleep
+
+import pytest
+import responses
+from nuxeo.buffers import BufferPool, iter_response, read_chunk
+from nuxeo.models import Batch, FileBlob
+from requests import get
+from ..constants import NUXEO_SERVER_URL
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = bytes(range(256)) * 100
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_buffer_pool_reuse():
+    pool = BufferPool(max_size=1024)
+
+    with pool.buffer(512) as buffer:
+        assert len(buffer) == 512
+        assert pool.in_use == 512
+    assert pool.in_use == 0
+    assert pool.allocated == 512
+
+    # The same buffer is given back
+    with pool.buffer(512) as other:
+        assert other is buffer
+    assert pool.allocated == 512
+
+
+def test_buffer_pool_eviction():
+    pool = BufferPool(max_size=1024)
+
+    with pool.buffer(512), pool.buffer(256):
+        pass
+    assert pool.allocated == 768
+
+    # Idle buffers of other sizes are dropped to stay under the cap
+    with pool.buffer(1024):
+        assert pool.allocated == 1024
+
+    pool.clear()
+    assert pool.allocated == 0
+
+
+def test_buffer_pool_oversized():
+    pool = BufferPool(max_size=1024)
+
+    # Bigger than the cap, but nothing else is used
+    with pool.buffer(2048) as buffer:
+        assert len(buffer) == 2048
+
+
+def test_buffer_pool_blocks_when_full():
+    pool = BufferPool(max_size=1024)
+    events = []
+
+    def transfer():
+        with pool.buffer(1024):
+            events.append("second acquired")
+
+    with pool.buffer(1024):
+        thread = Thread(target=transfer)
+        thread.start()
+        sleep(0.1)
+        events.append("first released")
+    thread.join(timeout=5)
+
+    assert events == ["first released", "second acquired"]
+
+
+def test_buffer_pool_timeout():
+    pool = BufferPool(max_size=1024)
+    with pool.buffer(1024):
+        with pytest.raises(TimeoutError):
+            pool.acquire(1024, timeout=0.01)
+
+
+def test_read_chunk():
+    buffer = bytearray(4)
+    src = BytesIO(b"abcdef")
+
+    data = read_chunk(src, buffer)
+    assert isinstance(data, memoryview)
+    assert data == b"abcd"
+    assert read_chunk(src, buffer) == b"ef"
+    assert not read_chunk(src, buffer)
+
+    # No readinto(), the data is simply read
+    assert read_chunk(StringIO("abcdef"), buffer) == "abcd"
+
+
+@responses.activate
+@pytest.mark.parametrize("encoding", [None, "gzip"])
+def test_iter_response(encoding):
+    import gzip
+
+    content = bytes(range(256)) * 100
+    headers = {}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    url = f"{NUXEO_SERVER_URL}/blob"
+    responses.add(
+        responses.GET,
+        url,
+        body=gzip.compress(content) if encoding else content,
+        headers=headers,
+    )
+
+    resp = get(url, stream=True)
+    buffer = bytearray(1000)
+    received = b"".join(bytes(chunk) for chunk in iter_response(resp, buffer))
+    assert received == content
+
+
+def test_iter_response_releases_the_connection(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url)
+    buffer = bytearray(1000)
+    for _ in range(3):
+        resp = server.client.request("GET", "blob")
+        received = b"".join(bytes(chunk) for chunk in iter_response(resp, buffer))
+        assert received == bytes(range(256)) * 100
+
+    # The connection went back to the pool after each download
+    stats = server.client.pool_stats()
+    assert stats["active"] == 0
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] == 2
+
+
+@responses.activate
+def test_chunked_upload_uses_the_pool(tmp_path, nuxeo_client):
+    server = nuxeo_client()
+    file = tmp_path / "file.bin"
+    file.write_bytes(b"0123456789" * 10)
+    url = f"{NUXEO_SERVER_URL}/api/v1/upload/batch-1/0"
+
+    # No chunk uploaded yet
+    responses.add(responses.GET, url, status=404)
+    for index in range(4):
+        uploaded = [str(i) for i in range(index + 1)]
+        responses.add(
+            responses.POST,
+            url,
+            json={"fileIdx": "0", "uploadedChunkIds": uploaded, "uploadedSize": "100"},
+        )
+
+    batch = Batch(batchId="batch-1", service=server.uploads)
+    blob = FileBlob(str(file))
+    uploader = server.uploads.get_uploader(batch, blob, chunked=True, chunk_size=30)
+    uploader.upload()
+
+    assert uploader.is_complete()
+    bodies = [bytes(call.request.body) for call in responses.calls[1:]]
+    assert b"".join(bodies) == file.read_bytes()
+    assert [len(body) for body in bodies] == [30, 30, 30, 10]
+    assert server.client.buffer_pool.allocated == 30
+    assert not server.client.buffer_pool.in_use
@@ -0,0 +1,156 @@
+# coding: utf-8
+import zipfile
+from io import BytesIO
+
+import pytest
+import responses
+from nuxeo.exceptions import CorruptedFile, InvalidArchive, OperationTimeout
+from nuxeo.utils import extract_zip_stream
+from ..constants import NUXEO_SERVER_URL
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+AUTOMATION = f"{NUXEO_SERVER_URL}/site/automation/Blob.BulkDownload"
+STATUS = f"{AUTOMATION}/@async/exec-1/status"
+RESULT = f"{AUTOMATION}/@async/exec-1"
+
+
+class NonSeekable(object):
+    """Only expose read() to ensure the archive is consumed sequentially."""
+
+    def __init__(self, data):
+        self._io = BytesIO(data)
+
+    def read(self, size=-1):
+        # Return short reads to stress the buffering
+        return self._io.read(min(size, 7) if size > 0 else size)
+
+
+def make_zip(entries, streamed=True, compression=zipfile.ZIP_DEFLATED):
+    buffer = BytesIO()
+    # Writing into a non-seekable output forces the use of data descriptors
+    output = NonSeekableWriter(buffer) if streamed else buffer
+    with zipfile.ZipFile(output, "w", compression=compression) as archive:
+        for name, data in entries.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+class NonSeekableWriter(object):
+    def __init__(self, buffer):
+        self._buffer = buffer
+
+    def write(self, data):
+        return self._buffer.write(data)
+
+    def flush(self):
+        pass
+
+    def tell(self):
+        raise OSError("not seekable")
+
+
+ENTRIES = {
+    "file.txt": b"Some content" * 1024,
+    "folder/": b"",
+    "folder/sub/data.bin": bytes(range(256)) * 64,
+    "empty.txt": b"",
+    "unicodé.txt": "ça marche".encode("utf-8"),
+}
+
+
+@pytest.mark.parametrize("streamed", [True, False])
+@pytest.mark.parametrize("compression", [zipfile.ZIP_DEFLATED, zipfile.ZIP_STORED])
+def test_extract_zip_stream(tmp_path, streamed, compression):
+    if streamed and compression == zipfile.ZIP_STORED:
+        pytest.skip("zipfile cannot write stored entries into a non-seekable output")
+
+    data = make_zip(ENTRIES, streamed=streamed, compression=compression)
+    files = extract_zip_stream(NonSeekable(data), str(tmp_path), chunk_size=64)
+
+    assert len(files) == 4
+    for name, content in ENTRIES.items():
+        path = tmp_path / name
+        if name.endswith("/"):
+            assert path.is_dir()
+        else:
+            assert path.read_bytes() == content
+
+
+def test_extract_zip_stream_corrupted(tmp_path):
+    data = bytearray(make_zip({"file.txt": b"a" * 1024}, streamed=False, compression=zipfile.ZIP_STORED))
+    # Alter the content of the entry, the CRC-32 will not match
+    index = data.index(b"a" * 1024)
+    data[index] = ord("b")
+
+    with pytest.raises(CorruptedFile):
+        extract_zip_stream(NonSeekable(bytes(data)), str(tmp_path))
+
+
+def test_extract_zip_stream_truncated(tmp_path):
+    data = make_zip({"file.txt": bytes(range(256)) * 64})
+    with pytest.raises(InvalidArchive):
+        extract_zip_stream(NonSeekable(data[:200]), str(tmp_path))
+
+
+@pytest.mark.parametrize("name", ["../evil.txt", "/etc/evil.txt", "a/../../evil.txt", "C:/evil.txt"])
+def test_extract_zip_stream_unsafe_names(tmp_path, name):
+    data = make_zip({name: b"evil"})
+    with pytest.raises(InvalidArchive):
+        extract_zip_stream(NonSeekable(data), str(tmp_path / "dest"))
+    assert not (tmp_path / "evil.txt").exists()
+
+
+@responses.activate
+def test_bulk_download(tmp_path, nuxeo_client):
+    server = nuxeo_client()
+    archive = make_zip(ENTRIES)
+
+    responses.add(
+        responses.POST,
+        f"{AUTOMATION}/@async",
+        status=202,
+        headers={"Location": STATUS},
+    )
+    responses.add(responses.GET, STATUS, json={"status": "RUNNING"})
+    responses.add(responses.GET, STATUS, status=303, headers={"Location": RESULT})
+    responses.add(
+        responses.GET,
+        RESULT,
+        body=archive,
+        content_type="application/zip",
+    )
+
+    files = server.documents.bulk_download(["uid1", "uid2"], str(tmp_path), poll_delay=0.01)
+
+    assert len(files) == 4
+    assert (tmp_path / "file.txt").read_bytes() == ENTRIES["file.txt"]
+    payload = responses.calls[0].request.body
+    assert '"input": "docs:uid1,uid2"' in payload
+    assert '"filename": "documents.zip"' in payload
+
+    # The status is asked once per check, then the result once
+    urls = [call.request.url for call in responses.calls[1:]]
+    assert urls == [STATUS, STATUS, RESULT]
+
+
+@responses.activate
+def test_execute_async_timeout(nuxeo_client):
+    server = nuxeo_client()
+
+    responses.add(
+        responses.POST,
+        f"{AUTOMATION}/@async",
+        status=202,
+        headers={"Location": STATUS},
+    )
+    responses.add(responses.GET, STATUS, json={"status": "RUNNING"})
+
+    with pytest.raises(OperationTimeout):
+        server.operations.execute_async(
+            command="Blob.BulkDownload",
+            input_obj=["uid1"],
+            poll_delay=0.01,
+            poll_timeout=0.05,
+        )
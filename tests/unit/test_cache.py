@@ -0,0 +1,193 @@
+# coding: utf-8
+import responses
+from nuxeo.auth import BasicAuth, JWTAuth, TokenAuth
+from nuxeo.cache import CacheEntry, ResponseCache, parse_cache_control
+from nuxeo.models import Document
+from ..constants import NUXEO_SERVER_URL
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+API = f"{NUXEO_SERVER_URL}/api/v1"
+DOC = {"entity-type": "document", "uid": "uid1", "title": "doc", "properties": {}}
+
+
+def test_parse_cache_control():
+    assert parse_cache_control('private, Max-Age=60, no-cache="Set-Cookie"') == {
+        "private": None,
+        "max-age": "60",
+        "no-cache": "Set-Cookie",
+    }
+    assert parse_cache_control("") == {}
+
+
+@responses.activate
+def test_revalidation(nuxeo_client):
+    server = nuxeo_client(cache=ResponseCache())
+    url = f"{API}/repo/default/id/uid1"
+    responses.add(responses.GET, url, json=DOC, headers={"ETag": '"v1"'})
+    responses.add(responses.GET, url, status=304, headers={"ETag": '"v1"'})
+
+    doc = server.documents.get(uid="uid1")
+    assert "If-None-Match" not in responses.calls[0].request.headers
+
+    # The server answers with a 304, the document comes from the cache
+    doc2 = server.documents.get(uid="uid1")
+    assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+    assert isinstance(doc2, Document)
+    assert doc2.as_dict() == doc.as_dict()
+    assert server.client.cache.stats == {"hits": 0, "revalidated": 1, "misses": 1, "stored": 1}
+
+    # Validators do not leak into the endpoint headers
+    assert "If-None-Match" not in server.documents.headers
+
+
+@responses.activate
+def test_modified(nuxeo_client):
+    server = nuxeo_client(cache=ResponseCache())
+    url = f"{API}/repo/default/id/uid1"
+    responses.add(responses.GET, url, json=DOC, headers={"Last-Modified": "Mon, 19 Oct 2026 10:00:00 GMT"})
+    responses.add(responses.GET, url, json={**DOC, "title": "new"}, headers={"ETag": '"v2"'})
+
+    assert server.documents.get(uid="uid1").title == "doc"
+    assert server.documents.get(uid="uid1").title == "new"
+    assert responses.calls[1].request.headers["If-Modified-Since"] == "Mon, 19 Oct 2026 10:00:00 GMT"
+
+    # The new version replaced the old one
+    responses.add(responses.GET, url, status=304)
+    assert server.documents.get(uid="uid1").title == "new"
+    assert responses.calls[2].request.headers["If-None-Match"] == '"v2"'
+    assert "If-Modified-Since" not in responses.calls[2].request.headers
+
+
+@responses.activate
+def test_fresh_entries(nuxeo_client):
+    server = nuxeo_client(cache=ResponseCache())
+    url = f"{API}/user/alice"
+    responses.add(
+        responses.GET,
+        url,
+        json={"entity-type": "user", "id": "alice", "properties": {"username": "alice"}},
+        headers={"Cache-Control": "max-age=60"},
+    )
+
+    for _ in range(3):
+        assert server.users.get("alice").uid == "alice"
+    assert len(responses.calls) == 1
+    assert server.client.cache.stats["hits"] == 2
+
+    # The cache can be bypassed
+    server.client.request("GET", "api/v1/user/alice", cache=False)
+    assert len(responses.calls) == 2
+
+
+@responses.activate
+def test_not_cacheable(nuxeo_client):
+    server = nuxeo_client(cache=ResponseCache())
+    responses.add(responses.GET, f"{API}/a", json={}, headers={"ETag": '"1"', "Cache-Control": "no-store"})
+    responses.add(responses.GET, f"{API}/b", body=b"data", headers={"ETag": '"1"'})
+    # No validators
+    responses.add(responses.GET, f"{API}/c", json={})
+
+    for path in ("a", "b", "c"):
+        server.client.request("GET", f"api/v1/{path}")
+    assert not len(server.client.cache)
+
+
+@responses.activate
+def test_writes_invalidate(nuxeo_client):
+    server = nuxeo_client(cache=ResponseCache())
+    url = f"{API}/repo/default/id/uid1"
+    responses.add(responses.GET, url, json=DOC, headers={"Cache-Control": "max-age=60"})
+    responses.add(responses.PUT, url, json=DOC)
+
+    server.documents.get(uid="uid1")
+    server.documents.get(uid="uid1")
+    assert len(responses.calls) == 1
+
+    server.client.request("PUT", "api/v1/repo/default/id/uid1", data={})
+    server.documents.get(uid="uid1")
+    assert len(responses.calls) == 3
+
+
+@responses.activate
+def test_writes_invalidate_other_node(nuxeo_client):
+    server = nuxeo_client(cache=ResponseCache())
+    other = NUXEO_SERVER_URL.replace("localhost", "127.0.0.1")
+    url = f"{other}/api/v1/repo/default/id/uid1"
+    responses.add(responses.GET, url, json=DOC, headers={"Cache-Control": "max-age=60"})
+    responses.add(responses.PUT, f"{API}/repo/default/id/uid1", json=DOC)
+
+    # The entry is stored under the URL of the request, whatever the node answering
+    server.client.request("GET", "api/v1/repo/default/id/uid1", host=other)
+    assert len(server.client.cache) == 1
+
+    server.client.request("PUT", "api/v1/repo/default/id/uid1", data={})
+    assert not len(server.client.cache)
+
+
+@responses.activate
+def test_disk_tier(tmp_path, nuxeo_client):
+    url = f"{API}/repo/default/id/uid1"
+    responses.add(responses.GET, url, json=DOC, headers={"ETag": '"v1"'})
+    responses.add(responses.GET, url, status=304)
+
+    server = nuxeo_client(cache=ResponseCache(directory=str(tmp_path)))
+    server.documents.get(uid="uid1")
+    assert len(list(tmp_path.iterdir())) == 1
+
+    # Another client finds the entry on the disk
+    server = nuxeo_client(cache=ResponseCache(directory=str(tmp_path)))
+    assert server.documents.get(uid="uid1").title == "doc"
+    assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+
+    server.client.cache.clear()
+    assert not list(tmp_path.iterdir())
+
+
+def test_disk_tier_eviction(tmp_path):
+    cache = ResponseCache(directory=str(tmp_path), disk_max_size=3000)
+    for idx in range(5):
+        cache.set(str(idx), CacheEntry(f"url{idx}", 200, {"ETag": "1"}, b"a" * 900))
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert len(files) < 5
+    assert "4" in files
+    assert cache._disk_size == sum(path.stat().st_size for path in tmp_path.iterdir())
+
+
+def test_memory_lru():
+    cache = ResponseCache(max_size=100, max_entry_size=60)
+    cache.set("a", CacheEntry("a", 200, {}, b"a" * 40))
+    cache.set("b", CacheEntry("b", 200, {}, b"b" * 40))
+    # Too big
+    cache.set("c", CacheEntry("c", 200, {}, b"c" * 80))
+    assert len(cache) == 2
+
+    # "a" becomes the most recently used, "b" is dropped
+    assert cache.get("a")
+    cache.set("d", CacheEntry("d", 200, {}, b"d" * 40))
+    assert cache.get("b") is None
+    assert cache.get("a")
+    assert cache.size == 80
+
+
+def test_key():
+    key = ResponseCache.key
+    assert key("url", {"a": 1, "b": 2}, {"X-A": "1"}) == key("url", {"b": 2, "a": 1}, {"x-a": "1"})
+    assert key("url", None, {"X-A": "1"}) == key("url", None, {"X-A": "1", "If-None-Match": "x"})
+    assert key("url", None, {"X-NXRepository": "default"}) != key("url", None, {"X-NXRepository": "other"})
+
+
+def test_key_credentials():
+    key = ResponseCache.key
+    assert key("url", None, {}, TokenAuth("token-alice")) != key("url", None, {}, TokenAuth("token-bob"))
+    assert key("url", None, {}, JWTAuth("jwt-alice")) != key("url", None, {}, JWTAuth("jwt-bob"))
+    assert key("url", None, {}, TokenAuth("token")) == key("url", None, {}, TokenAuth("token"))
+    assert key("url", None, {}, BasicAuth("alice", "1")) != key("url", None, {}, BasicAuth("alice", "2"))
+    assert key("url", None, {}, BasicAuth("alice", "1")) == key("url", None, {}, ("alice", "1"))
+    assert key("url", None, {}, TokenAuth("x")) != key("url", None, {})
+
+    # Unknown auth objects are only the same user as themselves
+    auth = object()
+    assert key("url", None, {}, auth) == key("url", None, {}, auth)
+    assert key("url", None, {}, auth) != key("url", None, {}, object())
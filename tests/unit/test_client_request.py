@@ -0,0 +1,149 @@
+# coding: utf-8
+import pytest
+import responses
+from nuxeo.client import Nuxeo, NuxeoResponse
+from nuxeo.compression import Compression
+from nuxeo.hosts import HostPool
+from nuxeo.limiters import AdaptiveLimiter
+from nuxeo.tracing import Tracer
+from ..constants import NUXEO_SERVER_URL
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+API = f"{NUXEO_SERVER_URL}/api/v1"
+
+
+@responses.activate
+def test_request_response_class(nuxeo_client):
+    client = nuxeo_client().client
+    responses.add(
+        responses.GET,
+        f"{API}/user/alice",
+        json={"entity-type": "user", "id": "uuid-alice", "properties": {"username": "alice"}},
+    )
+
+    resp = client.request("GET", "api/v1/user/alice")
+    assert type(resp) is NuxeoResponse
+    assert resp.json()["id"] == "alice"
+    assert client.userid_mapper == {"alice": "uuid-alice"}
+
+
+@responses.activate
+def test_request_static_headers(nuxeo_client):
+    client = nuxeo_client().client
+    url = f"{API}/path/"
+    responses.add(responses.GET, url, json={})
+
+    client.request("GET", "api/v1/path/", enrichers=["acls"])
+    headers = responses.calls[-1].request.headers
+    assert headers["X-NXRepository"] == "default"
+    assert headers["X-NXDocumentProperties"] == "*"
+    assert headers["enrichers-document"] == "acls"
+
+    # Changes to the client settings are taken into account
+    client.set(repository="other", schemas=["dublincore", "file"])
+    client.headers["X-Custom"] = "value"
+    client.request("GET", "api/v1/path/")
+    headers = responses.calls[-1].request.headers
+    assert headers["X-NXRepository"] == "other"
+    assert headers["X-NXDocumentProperties"] == "dublincore,file"
+    assert headers["X-Custom"] == "value"
+
+
+@responses.activate
+def test_request_keys_format_checked_once(nuxeo_client):
+    client = nuxeo_client().client
+    responses.add(responses.GET, f"{API}/path/", json={})
+
+    client.request("GET", "api/v1/path/", params={"good-key": 1})
+    assert {"good-key", "X-NXRepository", "Content-Type"} <= client._valid_keys
+
+    # Bad keys are never remembered, the warning is emitted each time
+    for _ in range(2):
+        with pytest.warns(DeprecationWarning, match="'bad.key' param should not contain"):
+            client.request("GET", "api/v1/path/", params={"bad.key": 1})
+    assert "bad.key" not in client._valid_keys
+
+
+@responses.activate
+def test_request_redirections_not_followed(nuxeo_client):
+    client = nuxeo_client().client
+    responses.add(responses.GET, f"{API}/old/", status=303, headers={"Location": f"{API}/new/"})
+    responses.add(responses.GET, f"{API}/new/", json={})
+
+    resp = client.request("GET", "api/v1/old/", allow_redirects=False)
+    assert resp.status_code == 303
+    assert [call.request.url for call in responses.calls] == [f"{API}/old/"]
+
+
+def test_session_environment_looked_up_once(monkeypatch):
+    from nuxeo.client import NuxeoSession
+
+    monkeypatch.setenv("HTTPS_PROXY", "http://proxy:3128")
+    monkeypatch.setenv("REQUESTS_CA_BUNDLE", "/path/to/ca.pem")
+    session = NuxeoSession()
+
+    settings = session.merge_environment_settings("https://example.org/nuxeo/api", {}, None, True, None)
+    assert settings["proxies"]["https"] == "http://proxy:3128"
+    assert settings["verify"] == "/path/to/ca.pem"
+
+    # Explicit settings win over the environment
+    settings = session.merge_environment_settings(
+        "https://example.org/nuxeo/site", {"https": "http://other:8080"}, None, False, None
+    )
+    assert settings["proxies"]["https"] == "http://other:8080"
+    assert settings["verify"] is False
+
+    # The environment is not read again for the same host
+    monkeypatch.delenv("HTTPS_PROXY")
+    settings = session.merge_environment_settings("https://example.org/nuxeo/api", {}, None, True, None)
+    assert settings["proxies"]["https"] == "http://proxy:3128"
+    assert len(session._environment) == 1
+
+
+class RecordingTracer(Tracer):
+    enabled = True
+
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, attributes=None):
+        span = {"name": name, "ended": False}
+        self.spans.append(span)
+        return span
+
+    def end_span(self, span, response=None, error=None):
+        span["ended"] = True
+        span["error"] = error
+
+
+class FailingCompression(Compression):
+    def compress(self, server, data):
+        raise MemoryError("no memory left")
+
+
+@pytest.mark.parametrize("failing", ["tracer", "compression"])
+def test_request_releases_resources_on_setup_error(failing, nuxeo_client):
+    hosts = HostPool([NUXEO_SERVER_URL, NUXEO_SERVER_URL.replace("localhost", "127.0.0.1")])
+    limiter = AdaptiveLimiter(initial_limit=2)
+    tracer = RecordingTracer()
+    if failing == "tracer":
+        tracer.start_span = None
+    client = nuxeo_client(
+        host=hosts,
+        limiter=limiter,
+        tracer=tracer,
+        compression=FailingCompression(min_size=0),
+    ).client
+
+    with pytest.raises((TypeError, MemoryError)):
+        client.request("POST", "api/v1/path/", data={"key": "value"})
+
+    # Nothing was sent, nothing is left acquired
+    assert limiter.in_flight == 0
+    assert limiter.as_dict()["requests"] == 0
+    assert all(node.outstanding == 0 and node.requests == 0 for node in hosts.nodes)
+    assert all(span["ended"] for span in tracer.spans)
+    if failing == "compression":
+        assert isinstance(tracer.spans[0]["error"], MemoryError)
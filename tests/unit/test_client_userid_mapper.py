@@ -8,12 +8,15 @@ Covers:
   - request() integration    (response JSON wrapping via _translate_user_entity)
   - execute() integration    (end-to-end through request wrapper)
 """
+from threading import RLock
 from unittest.mock import MagicMock, patch
 
 import requests
 
 from nuxeo.client import NuxeoClient
+from nuxeo.json_codecs import JSONCodec
 from nuxeo.operations import API
+from nuxeo.tracing import Tracer
 
 # We do not need to set-up a server and log the current test
 skip_logging = True
@@ -30,6 +33,7 @@ def _make_client():
         client = NuxeoClient.__new__(NuxeoClient)
     # Manually set the attributes that would be set by __init__
     client.userid_mapper = {}
+    client._lock = RLock()
     return client
 
 
@@ -38,6 +42,7 @@ def _make_api():
     client = _make_client()
     # Set minimal attributes needed by APIEndpoint / API
     client.api_path = "api/v1"
+    client.tracer = Tracer()
     # Mock request to avoid real HTTP calls
     client.request = MagicMock()
     api = API(client)
@@ -342,11 +347,24 @@ class TestRequestIntegration:
         with patch.object(NuxeoClient, "__init__", lambda self: None):
             client = NuxeoClient.__new__(NuxeoClient)
         client.userid_mapper = {}
+        client._lock = RLock()
         client.host = "http://localhost:8080/nuxeo/"
+        client.hosts = None
+        client._transport = None
+        client.compression = None
         client.api_path = "api/v1"
         client.schemas = "*"
         client.repository = "default"
         client.headers = {}
+        client._static_headers_cache = None
+        client._valid_keys = set()
+        client.codec = JSONCodec()
+        client.cache = None
+        client.limiter = None
+        client.rate_limiter = None
+        client.retries = None
+        client.metrics = None
+        client.tracer = Tracer()
         client.client_kwargs = {}
         client.ssl_verify_needed = True
         client.auth = MagicMock()
@@ -0,0 +1,197 @@
+# coding: utf-8
+import gzip
+import json
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+from nuxeo.client import DEFAULT_RETRY, Nuxeo
+from nuxeo.compression import Compression, GzipStream, gzip_compress
+from nuxeo.exceptions import HTTPError
+from nuxeo.metrics import Metrics
+from requests.utils import super_len
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+DATA = json.dumps({"params": {"ids": [f"{i:08}-uid" for i in range(20_000)]}}).encode("utf-8")
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            body = b""
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                body += self.rfile.read(size)
+                self.rfile.readline()
+                if not size:
+                    return body
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def do_POST(self):
+        # "/nuxeo/<status>/..." answers with that status, "/nuxeo/flaky/..." fails once
+        body = self.read_body()
+        encoding = self.headers.get("Content-Encoding")
+        self.server.calls.append((encoding, self.headers.get("Transfer-Encoding"), len(body)))
+        status = self.path.split("/")[2]
+        if status == "flaky":
+            status = "503" if len(self.server.calls) == 1 else "200"
+        status = int(status)
+        data = json.dumps({"size": len(body), "valid": body == DATA}).encode("utf-8")
+        if encoding == "gzip":
+            if not self.server.gzip:
+                status = self.server.rejection
+                data = b'{"message": "Not in GZIP format"}'
+            else:
+                body = gzip.decompress(body)
+                data = json.dumps({"size": len(body), "valid": body == DATA}).encode("utf-8")
+        self.send_response(status)
+        if status == 503:
+            self.send_header("Retry-After", "0")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server(http_server):
+    http_server.gzip = True
+    http_server.rejection = 415
+    return http_server
+
+
+def test_gzip_stream():
+    stream = GzipStream(DATA, chunk_size=4096)
+    compressed = b"".join(stream)
+    assert gzip.decompress(compressed) == DATA
+    assert stream.tell() == len(compressed)
+
+    # Rewinding starts over
+    assert stream.seek(0) == 0
+    assert stream.read(10) == compressed[:10]
+    assert stream.read() == compressed[10:]
+    assert stream.read() == b""
+
+    # The size is unknown, Requests sends it chunked
+    stream.seek(0)
+    assert super_len(stream) == 0
+    with pytest.raises(OSError):
+        stream.seek(0, 2)
+
+
+def test_compress():
+    compression = Compression(min_size=1024, stream_size=len(DATA))
+    assert compression.compress("server", b"small") is None
+    assert gzip.decompress(compression.compress("server", DATA[:-1].decode("utf-8"))) == DATA[:-1]
+    assert isinstance(compression.compress("server", DATA), GzipStream)
+
+    # Sizes are in bytes, not characters
+    compression = Compression(min_size=10)
+    assert compression.compress("server", "é" * 6) is not None
+    assert compression.compress("server", "e" * 6) is None
+
+    compression.reject("server")
+    assert compression.is_rejected("server")
+    assert compression.compress("server", DATA) is None
+    assert compression.compress("other", DATA) is not None
+    assert "server" in repr(compression)
+
+    assert gzip.decompress(gzip_compress(DATA, level=1)) == DATA
+
+
+@pytest.mark.parametrize("transport", ["requests", "urllib3"])
+def test_request(http_server, nuxeo_client, transport):
+    server = nuxeo_client(host=http_server.url, compression=Compression(), transport=transport)
+    resp = server.client.request("POST", "200/automation/Document.Fetch", data=DATA)
+    assert resp.json() == {"size": len(DATA), "valid": True}
+    encoding, chunked, size = http_server.calls[0]
+    assert encoding == "gzip"
+    assert not chunked
+    assert size < len(DATA) / 2
+
+    # Small bodies are sent as they are
+    server.client.request("POST", "200/automation/Document.Fetch", data={"params": {}})
+    assert http_server.calls[1][0] is None
+
+
+def test_request_stream(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, compression=Compression(stream_size=len(DATA)))
+    resp = server.client.request("POST", "200/automation/Document.Fetch", data=DATA)
+    assert resp.json() == {"size": len(DATA), "valid": True}
+    assert http_server.calls == [("gzip", "chunked", http_server.calls[0][2])]
+
+
+def test_request_stream_retried(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, compression=Compression(stream_size=len(DATA)))
+    server.client.retries = DEFAULT_RETRY.new(backoff_factor=0)
+    server.client.enable_retry()
+    resp = server.client.request("POST", "flaky/automation/Document.Fetch", data=DATA)
+    # The whole body is compressed again
+    assert resp.json() == {"size": len(DATA), "valid": True}
+    assert len(http_server.calls) == 2
+    assert http_server.calls[0] == http_server.calls[1]
+
+
+@pytest.mark.parametrize("stream_size", [len(DATA) * 2, len(DATA)])
+def test_request_metrics(http_server, nuxeo_client, stream_size):
+    metrics = Metrics()
+    compression = Compression(stream_size=stream_size)
+    server = nuxeo_client(host=http_server.url, compression=compression, metrics=metrics)
+    server.client.request("POST", "200/automation/Document.Fetch", data=DATA)
+    # The compressed size is counted
+    (stats,) = metrics.as_dict().values()
+    assert stats["POST"]["sent"] == http_server.calls[0][2]
+    assert stats["POST"]["sent"] < len(DATA) / 2
+
+
+def test_request_metrics_rejected(http_server, nuxeo_client):
+    http_server.gzip = False
+    metrics = Metrics()
+    server = nuxeo_client(host=http_server.url, compression=Compression(), metrics=metrics)
+    server.client.request("POST", "200/automation/Document.Fetch", data=DATA)
+    # The body sent again uncompressed is counted
+    (stats,) = metrics.as_dict().values()
+    assert stats["POST"]["sent"] == len(DATA)
+
+
+@pytest.mark.parametrize("status", [400, 415])
+def test_request_rejected(http_server, nuxeo_client, status):
+    http_server.gzip = False
+    http_server.rejection = status
+    compression = Compression()
+    server = nuxeo_client(host=http_server.url, compression=compression)
+    resp = server.client.request("POST", "200/automation/Document.Fetch", data=DATA)
+    assert resp.json() == {"size": len(DATA), "valid": True}
+    assert [call[0] for call in http_server.calls] == ["gzip", None]
+    assert compression.is_rejected(http_server.url.split("/")[2])
+
+    # The server is known now
+    server.client.request("POST", "200/automation/Document.Fetch", data=DATA)
+    assert [call[0] for call in http_server.calls] == ["gzip", None, None]
+
+
+def test_request_error(http_server, nuxeo_client):
+    compression = Compression()
+    server = nuxeo_client(host=http_server.url, compression=compression)
+    with pytest.raises(HTTPError):
+        server.client.request("POST", "400/automation/Document.Fetch", data=DATA)
+    # A bad call not about the encoding is not sent again
+    assert [call[0] for call in http_server.calls] == ["gzip"]
+    assert not compression.is_rejected(http_server.url.split("/")[2])
+
+
+def test_request_rejected_then_error(http_server, nuxeo_client):
+    http_server.gzip = False
+    compression = Compression()
+    server = nuxeo_client(host=http_server.url, compression=compression)
+    with pytest.raises(HTTPError):
+        server.client.request("POST", "415/automation/Document.Fetch", data=DATA)
+    # A bad call also failing without compression tells nothing about the server
+    assert [call[0] for call in http_server.calls] == ["gzip", None]
+    assert not compression.is_rejected(http_server.url.split("/")[2])
@@ -0,0 +1,118 @@
+# coding: utf-8
+from nuxeo.exceptions import BadQuery, HTTPError
+from nuxeo.models import BufferBlob, Document
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+
+def make_doc(name, doc_type="File", **properties):
+    return Document(name=name, type=doc_type, properties=properties)
+
+
+def test_create_many_in_order(nuxeo_client, repository):
+    server = nuxeo_client(max_workers=2)
+
+    docs = [make_doc(f"doc-{idx}", **{"dc:title": str(idx)}) for idx in range(10)]
+    results = server.documents.create_many(docs, parent="/ws")
+
+    assert [result.index for result in results] == list(range(10))
+    assert all(result.ok for result in results)
+    assert [result.document.uid for result in results] == [f"uid-doc-{idx}" for idx in range(10)]
+    assert isinstance(results[0].document, Document)
+    assert results[0].document.service is server.documents
+    assert {parent for _, parent, _ in repository.created} == {"/path/ws"}
+    # Documents given are not modified
+    assert docs[0].uid is None
+
+
+def test_create_many_in_the_executor(nuxeo_client, repository):
+    server = nuxeo_client(max_workers=2)
+
+    # Creations are done inline, instead of waiting for workers that all wait
+    futures = [
+        server.documents.submit("create_many", [make_doc(f"doc-{run}-{idx}") for idx in range(5)], parent="/ws")
+        for run in range(2)
+    ]
+    for future in futures:
+        assert all(result.ok for result in future.result(timeout=10))
+    assert len(repository.created) == 10
+
+
+def test_create_many_parents_of_the_call(nuxeo_client, repository):
+    server = nuxeo_client()
+
+    folder = make_doc("folder", "Folder")
+    sub = make_doc("sub", "Folder")
+    file1 = make_doc("file1")
+    file2 = make_doc("file2")
+    existing = Document(uid="uid-existing")
+
+    # Children may come before their parent
+    results = server.documents.create_many(
+        [(file2, sub), folder, (sub, folder), (file1, folder), (make_doc("other"), existing)],
+        parent="uid-root",
+    )
+
+    assert all(result.ok for result in results)
+    parents = {name: parent for name, parent, _ in repository.created}
+    assert parents == {
+        "folder": "/id/uid-root",
+        "sub": "/id/uid-folder",
+        "file1": "/id/uid-folder",
+        "file2": "/id/uid-sub",
+        "other": "/id/uid-existing",
+    }
+    names = [name for name, _, _ in repository.created]
+    assert names.index("folder") < names.index("sub") < names.index("file2")
+
+
+def test_create_many_errors(nuxeo_client, repository):
+    repository.failing = ("folder",)
+    server = nuxeo_client()
+
+    folder = make_doc("folder", "Folder")
+    sub = make_doc("sub", "Folder")
+    loop = make_doc("loop")
+    results = server.documents.create_many(
+        [
+            folder,
+            (sub, folder),
+            (make_doc("file"), sub),
+            make_doc("fine"),
+            (make_doc("orphan"), None),
+            (loop, loop),
+        ],
+        parent="/ws",
+    )
+
+    assert [result.ok for result in results] == [False, False, False, True, False, False]
+    assert isinstance(results[0].error, HTTPError)
+    assert results[0].error.status == 400
+    assert results[0].document is None
+    assert isinstance(results[1].error, BadQuery)
+    assert isinstance(results[2].error, BadQuery)
+    assert results[3].document.uid == "uid-fine"
+    assert "Invalid parent" in str(results[4].error)
+    assert "one of its children" in str(results[5].error)
+    assert [name for name, _, _ in repository.created] == ["fine"]
+
+
+def test_create_many_attaches_blobs(nuxeo_client, repository):
+    server = nuxeo_client()
+
+    blob = BufferBlob(data=b"data", name="file.txt")
+    blob.batchId = "batch-1"
+    blob.fileIdx = 0
+    doc = make_doc("file", **{"file:content": blob, "files:files": [{"file": blob}]})
+    results = server.documents.create_many([doc], parent="/ws")
+
+    assert results[0].ok
+    ref = {"upload-batch": "batch-1", "upload-fileId": "0"}
+    assert repository.created[0][2] == {"file:content": ref, "files:files": [{"file": ref}]}
+    # The properties of the document are left untouched
+    assert doc.properties["file:content"] is blob
+
+
+def test_create_many_nothing(nuxeo_client):
+    assert nuxeo_client().documents.create_many([]) == []
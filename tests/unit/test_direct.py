@@ -0,0 +1,146 @@
+# coding: utf-8
+import json
+import socket
+from http.server import BaseHTTPRequestHandler
+from io import BytesIO
+
+import pytest
+import requests
+from nuxeo.client import DEFAULT_RETRY, Nuxeo
+from nuxeo.exceptions import HTTPError
+from nuxeo.metrics import Metrics
+from nuxeo.retry import RetryBudget
+from nuxeo.tcp import DirectTransport
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def answer(self, body=b""):
+        # "/nuxeo/<status>/..." answers with that status
+        self.server.calls.append((self.command, self.path))
+        status = int(self.path.split("/")[2])
+        data = json.dumps(
+            {
+                "path": self.path,
+                "body": body.decode("utf-8"),
+                "authorization": self.headers.get("Authorization"),
+                "cookie": self.headers.get("Cookie"),
+                "repository": self.headers.get("X-NXRepository"),
+            }
+        ).encode("utf-8")
+        self.send_response(status)
+        if 300 <= status < 400:
+            self.send_header("Location", "/nuxeo/200/target")
+        if status == 503:
+            self.send_header("Retry-After", "0")
+        self.send_header("Set-Cookie", "JSESSIONID=42; Path=/nuxeo")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.answer()
+
+    def do_POST(self):
+        self.answer(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+
+    def do_PUT(self):
+        self.answer(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+
+    def log_message(self, *args):
+        pass
+
+
+def test_supports():
+    transport = DirectTransport(requests.Session())
+    assert transport.supports(None, None, {})
+    assert transport.supports(None, b"data", {"params": {}, "timeout": 10})
+    assert not transport.supports(None, BytesIO(b"data"), {})
+    assert not transport.supports(("user", "password"), None, {})
+    assert not transport.supports(None, None, {"files": {}})
+
+
+def test_request(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, transport="urllib3")
+    client = server.client
+    assert client._transport is not None
+
+    resp = client.request("GET", "200/ping", params={"q": "a b", "ids": ["1", "2"]})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["path"] == "/nuxeo/200/ping?q=a+b&ids=1&ids=2"
+    assert data["authorization"].startswith("Basic ")
+    assert data["repository"] == "default"
+
+    # The session cookie is kept
+    assert client._session.cookies["JSESSIONID"] == "42"
+    assert client.request("GET", "200/ping").json()["cookie"] == "JSESSIONID=42"
+
+    data = client.request("POST", "200/automation/Document.Fetch", data={"params": {}}).json()
+    assert json.loads(data["body"]) == {"params": {}}
+
+    # Body-less calls still tell their length
+    assert client.request("PUT", "200/doc").json()["body"] == ""
+
+    # Streamed bodies can be read by chunks
+    expected = client.request("GET", "200/ping").content
+    resp = client.request("GET", "200/ping")
+    assert b"".join(resp.iter_content(chunk_size=3)) == expected
+
+    # Connections are reused
+    assert client.pool_stats()["new_connections"] == 1
+
+    with pytest.raises(HTTPError) as exc:
+        client.request("GET", "404/ping")
+    assert exc.value.status == 404
+
+
+def test_fallback(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, transport="urllib3")
+    data = server.client.request("POST", "200/upload", data=BytesIO(b"file content"), raw=True).json()
+    assert data["body"] == "file content"
+
+
+def test_redirect(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, transport="urllib3")
+    resp = server.client.request("GET", "302/path/doc")
+    assert resp.status_code == 200
+    assert resp.url.endswith("/nuxeo/200/target")
+
+
+def test_retries(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, transport="urllib3")
+    client = server.client
+    client.retries = DEFAULT_RETRY.new(budget=RetryBudget(min_per_second=0, max_balance=2))
+    client.enable_retry()
+
+    with pytest.raises(HTTPError):
+        client.request("GET", "503/ping")
+    # The first attempt, and the 2 retries the budget allows
+    assert len(http_server.calls) == 3
+    assert client.retry_stats()["retries"] == 2
+
+
+def test_connection_error(nuxeo_client):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = nuxeo_client(host=f"http://127.0.0.1:{port}/nuxeo/", transport="urllib3")
+    server.client.disable_retry()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        server.client.request("GET", "200/ping")
+
+
+def test_metrics_and_timings(http_server, nuxeo_client):
+    metrics = Metrics()
+    server = nuxeo_client(host=http_server.url, transport="urllib3", metrics=metrics)
+    resp = server.client.request("GET", "200/ping")
+    resp.close()
+    assert resp.timings is not None
+    assert resp.timings.ttfb is not None
+    assert metrics.as_dict()
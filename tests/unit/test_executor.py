@@ -0,0 +1,93 @@
+# coding: utf-8
+from concurrent.futures import Future
+from threading import Event
+
+import responses
+from nuxeo.models import Document, User
+from ..constants import NUXEO_SERVER_URL
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+API = f"{NUXEO_SERVER_URL}/api/v1"
+
+
+def test_executor_is_bounded_and_lazy(nuxeo_client):
+    server = nuxeo_client(max_workers=2)
+    assert server.client._executor is None
+    assert server.client.executor._max_workers == 2
+    assert server.client.executor is server.client.executor
+    assert "max_workers" not in server.client.client_kwargs
+
+
+def test_pool_size_follows_workers(nuxeo_client):
+    server = nuxeo_client(max_workers=32)
+    for prefix in ("http://", "https://"):
+        adapter = server.client._session.adapters[prefix]
+        assert adapter._pool_maxsize == 32
+
+    # The default pool size is kept for few workers
+    server = nuxeo_client(max_workers=2)
+    assert server.client._session.adapters["http://"]._pool_maxsize == 10
+
+
+def test_submit_and_map(nuxeo_client):
+    server = nuxeo_client()
+    future = server.submit(sum, [1, 2, 3])
+    assert isinstance(future, Future)
+    assert future.result() == 6
+
+    futures = server.map(pow, [2, 3], [2, 2])
+    assert [future.result() for future in futures] == [4, 9]
+
+
+@responses.activate
+def test_endpoint_submit(nuxeo_client):
+    server = nuxeo_client()
+    responses.add(
+        responses.GET,
+        f"{API}/repo/default/id/uid1",
+        json={"entity-type": "document", "uid": "uid1", "title": "doc"},
+    )
+
+    doc = server.documents.submit("get", uid="uid1").result()
+    assert isinstance(doc, Document)
+    assert doc.uid == "uid1"
+
+
+@responses.activate
+def test_endpoint_map_keeps_order(nuxeo_client):
+    server = nuxeo_client(max_workers=4)
+    names = [f"user{i}" for i in range(10)]
+    for name in names:
+        responses.add(
+            responses.GET,
+            f"{API}/user/{name}",
+            json={
+                "entity-type": "user",
+                "id": f"uuid-{name}",
+                "properties": {"username": name},
+            },
+        )
+
+    users = [future.result() for future in server.users.map("get", names)]
+    assert all(isinstance(user, User) for user in users)
+    assert [user.uid for user in users] == names
+    assert server.client.userid_mapper == {name: f"uuid-{name}" for name in names}
+
+
+@responses.activate
+def test_server_info_fetched_once(nuxeo_client):
+    server = nuxeo_client(max_workers=8)
+    started = Event()
+
+    def callback(request):
+        started.wait(timeout=5)
+        return 200, {}, '{"default": {"productVersion": "2025.1"}}'
+
+    responses.add_callback(responses.GET, f"{NUXEO_SERVER_URL}/json/cmis", callback=callback)
+
+    futures = [server.submit(server.client.server_info) for _ in range(8)]
+    started.set()
+    assert all(future.result()["productVersion"] == "2025.1" for future in futures)
+    assert len(responses.calls) == 1
@@ -0,0 +1,166 @@
+# coding: utf-8
+import json
+import os
+import signal
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+from nuxeo.cache import ResponseCache
+from nuxeo.client import DEFAULT_RETRY
+from nuxeo.hosts import HostPool
+from nuxeo.limiters import AdaptiveLimiter, RateLimiter
+from nuxeo.metrics import Metrics
+from nuxeo.retry import RetryBudget
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        data = json.dumps({"port": self.client_address[1]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_after_fork(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url)
+    client = server.client
+    client.disable_retry()
+    client._session.cookies.set("JSESSIONID", "42")
+    client.executor
+    session = client._session
+
+    client._after_fork()
+    assert client._session is not session
+    assert client._session.cookies["JSESSIONID"] == "42"
+    assert client._session.hooks == session.hooks
+    assert client._session.adapters["https://"].max_retries.total == 0
+    assert client._executor is None
+    assert client.request("GET", "ping").json()
+    assert client.pool_stats()["new_connections"] == 1
+
+    session.close()
+
+
+def test_after_fork_hosts(http_server, nuxeo_client):
+    hosts = HostPool([http_server.url, http_server.url.replace("127.0.0.1", "localhost")])
+    server = nuxeo_client(host=hosts)
+    node = hosts.acquire()
+    assert node.outstanding == 1
+    thread = hosts._thread
+
+    server.client._after_fork()
+    assert node.outstanding == 0
+    assert hosts._thread is not thread
+    assert hosts._thread.is_alive()
+
+
+def test_after_fork_components(http_server, nuxeo_client):
+    limiter = AdaptiveLimiter(initial_limit=4)
+    rate_limiter = RateLimiter(requests_per_second=100, bytes_per_second=1024)
+    cache = ResponseCache()
+    metrics = Metrics()
+    budget = RetryBudget()
+    server = nuxeo_client(
+        host=http_server.url,
+        retries=DEFAULT_RETRY.new(budget=budget),
+        limiter=limiter,
+        rate_limiter=rate_limiter,
+        cache=cache,
+        metrics=metrics,
+    )
+    client = server.client
+    locks = [budget._lock, rate_limiter.requests._lock, rate_limiter.bandwidth._lock, cache._lock, metrics._lock]
+
+    # State of calls in progress in other threads of the parent process
+    limiter.acquire()
+    limiter.acquire()
+    client.buffer_pool.release(client.buffer_pool.acquire(1024))
+    client.buffer_pool.acquire(2048)
+
+    client._after_fork()
+    assert limiter.in_flight == 0
+    assert client.buffer_pool.in_use == 0
+    assert client.buffer_pool.allocated == 1024
+    new_locks = [budget._lock, rate_limiter.requests._lock, rate_limiter.bandwidth._lock, cache._lock, metrics._lock]
+    assert all(new is not old for new, old in zip(new_locks, locks))
+    assert client.request("GET", "ping").json()
+    assert limiter.in_flight == 0
+    assert limiter.as_dict()["requests"] == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork() is not available")
+def test_fork_with_calls_in_flight(http_server, nuxeo_client):
+    limiter = AdaptiveLimiter(initial_limit=2, max_limit=2)
+    server = nuxeo_client(host=http_server.url, limiter=limiter)
+    client = server.client
+
+    # Two calls in flight in other threads of the parent process
+    limiter.acquire()
+    limiter.acquire()
+
+    read, write = os.pipe()
+    pid = os.fork()
+    if not pid:  # pragma: no cover
+        # Do not hang forever if the limiter still counts the parent calls
+        signal.alarm(10)
+        try:
+            client.request("GET", "ping").json()
+            result = json.dumps([limiter.in_flight, limiter.limit])
+        except Exception as exc:
+            result = json.dumps([repr(exc), 0])
+        os.write(write, result.encode("utf-8"))
+        os._exit(0)
+
+    os.close(write)
+    with os.fdopen(read) as pipe:
+        result = pipe.read()
+    os.waitpid(pid, 0)
+
+    # The parent calls are still accounted for
+    assert limiter.in_flight == 2
+    limiter.release(0.1)
+    limiter.release(0.1)
+
+    in_flight, limit = json.loads(result)
+    assert in_flight == 0
+    assert limit == 2
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="fork() is not available")
+def test_fork(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url)
+    client = server.client
+    port = client.request("GET", "ping").json()["port"]
+
+    read, write = os.pipe()
+    pid = os.fork()
+    if not pid:  # pragma: no cover
+        # The child opens its own connection
+        try:
+            result = client.request("GET", "ping").json()["port"]
+            result = json.dumps([result, client.pool_stats()["new_connections"]])
+        except Exception as exc:
+            result = json.dumps([repr(exc), 0])
+        os.write(write, result.encode("utf-8"))
+        os._exit(0)
+
+    os.close(write)
+    with os.fdopen(read) as pipe:
+        child_port, new_connections = json.loads(pipe.read())
+    os.waitpid(pid, 0)
+    assert child_port != port
+    assert new_connections == 1
+
+    # The parent connection is still fine
+    assert client.request("GET", "ping").json()["port"] == port
+    assert client.pool_stats()["new_connections"] == 1
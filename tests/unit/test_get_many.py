@@ -0,0 +1,107 @@
+# coding: utf-8
+from urllib.parse import quote_plus, urlsplit
+
+import pytest
+from nuxeo.client import Nuxeo
+from nuxeo.constants import GET_MANY_CHUNK_SIZE, GET_MANY_QUERY_SIZE
+from nuxeo.exceptions import BadQuery, HTTPError
+from nuxeo.models import Document
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+
+def test_get_many_in_order_with_misses(nuxeo_client, repository):
+    repository.existing = {"a", "b", "d"}
+    server = nuxeo_client()
+
+    docs = server.documents.get_many(["d", "a", "missing", "b", "a"])
+
+    assert [doc.uid if doc else None for doc in docs] == ["d", "a", None, "b", "a"]
+    assert isinstance(docs[0], Document)
+    assert docs[0].service is server.documents
+    assert docs[1] is docs[4]
+
+    # One query, each uid asked once
+    assert len(repository.queries) == 1
+    uids, params, _, _ = repository.queries[0]
+    assert uids == ["d", "a", "missing", "b"]
+    assert params["query"] == ["SELECT * FROM Document WHERE ecm:uuid IN ('d', 'a', 'missing', 'b')"]
+    assert params["pageSize"] == ["4"]
+
+
+def test_get_many_chunks(nuxeo_client, repository):
+    uids = [f"{idx:08d}-1234-5678-9abc-def012345678" for idx in range(500)]
+    repository.existing = set(uids)
+    server = nuxeo_client()
+
+    docs = server.documents.get_many(uids)
+
+    assert [doc.uid for doc in docs] == uids
+    assert len(repository.queries) > 1
+    asked = sorted(uid for chunk, _, _, _ in repository.queries for uid in chunk)
+    assert asked == uids
+    for _, _, _, url in repository.queries:
+        assert len(urlsplit(url).query) < GET_MANY_QUERY_SIZE + 100
+
+
+def test_get_many_in_the_executor(nuxeo_client, repository):
+    uids = [f"{idx:08d}-1234-5678-9abc-def012345678" for idx in range(500)]
+    repository.existing = set(uids)
+    server = nuxeo_client(max_workers=2)
+
+    # Chunks are fetched inline, instead of waiting for workers that all wait
+    futures = [server.documents.submit("get_many", uids) for _ in range(2)]
+    for future in futures:
+        assert [doc.uid for doc in future.result(timeout=10)] == uids
+    assert len(repository.queries) > 2
+
+
+def test_uid_chunks(monkeypatch):
+    chunks = list(Nuxeo().documents._uid_chunks(str(idx) for idx in range(1000)))
+    assert all(len(quote_plus(", ".join(f"'{uid}'" for uid in chunk))) <= GET_MANY_QUERY_SIZE for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == 1000
+
+    long_uids = ["x" * 1000 for _ in range(10)]
+    chunks = list(Nuxeo().documents._uid_chunks(long_uids))
+    assert all(len(chunk) <= 4 for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == 10
+
+    monkeypatch.setattr("nuxeo.documents.GET_MANY_QUERY_SIZE", 1024 * 1024)
+    chunks = list(Nuxeo().documents._uid_chunks(str(idx) for idx in range(2500)))
+    assert [len(chunk) for chunk in chunks] == [GET_MANY_CHUNK_SIZE, GET_MANY_CHUNK_SIZE, 500]
+
+    assert list(Nuxeo().documents._uid_chunks([])) == []
+
+
+def test_get_many_schemas_and_enrichers(nuxeo_client, repository):
+    repository.existing = {"a"}
+    server = nuxeo_client()
+
+    server.documents.get_many(["a"], schemas=["dublincore", "file"], enrichers=["permissions"])
+    headers = repository.queries[-1][2]
+    assert headers["X-NXDocumentProperties"] == "dublincore,file"
+    assert headers["enrichers-document"] == "permissions"
+
+    # The client schemas are used by default
+    server.documents.get_many(["a"])
+    headers = repository.queries[-1][2]
+    assert headers["X-NXDocumentProperties"] == "*"
+    assert "enrichers-document" not in headers
+
+
+@pytest.mark.parametrize("uid", ["a'b", "a\\b"])
+def test_get_many_invalid_uid(uid, nuxeo_client):
+    with pytest.raises(BadQuery):
+        nuxeo_client().documents.get_many(["a", uid])
+
+
+def test_get_many_error(nuxeo_client, repository):
+    repository.existing = {"a"}
+    repository.status = 403
+    with pytest.raises(HTTPError):
+        nuxeo_client().documents.get_many(["a"])
+
+
+def test_get_many_nothing(nuxeo_client):
+    assert nuxeo_client().documents.get_many([]) == []
@@ -0,0 +1,216 @@
+# coding: utf-8
+import json
+from http.server import BaseHTTPRequestHandler
+from time import sleep
+
+import pytest
+from nuxeo.client import DEFAULT_RETRY
+from nuxeo.exceptions import HTTPError
+from nuxeo.hosts import HostPool, sticky_key
+from nuxeo.limiters import AdaptiveLimiter
+from nuxeo.metrics import Metrics
+from nuxeo.retry import RetryBudget
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def answer(self):
+        self.server.calls.append(self.path)
+        body = json.dumps({"batchId": f"batch-{self.server.server_address[1]}"}).encode("utf-8")
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.answer()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.answer()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def nodes(start_http_server):
+    servers = [start_http_server() for _ in range(2)]
+    for httpd in servers:
+        httpd.status = 200
+    return servers
+
+
+@pytest.mark.parametrize(
+    "path, key",
+    [
+        ("api/v1/upload/", None),
+        ("api/v1/upload/handlers", None),
+        ("api/v1/upload/new/s3", None),
+        ("api/v1/upload/batch-42", "batch-42"),
+        ("api/v1/upload/batch-42/0/execute/Blob.Attach", "batch-42"),
+        ("api/v1/path/upload", None),
+    ],
+)
+def test_sticky_key(path, key):
+    assert sticky_key(path) == key
+
+
+def test_invalid_pool():
+    with pytest.raises(ValueError):
+        HostPool([])
+    with pytest.raises(ValueError):
+        HostPool(["http://a/nuxeo"], strategy="random")
+
+
+def test_least_outstanding():
+    hosts = HostPool(["http://a/nuxeo", "http://b/nuxeo"])
+    first = hosts.acquire()
+    assert first.url.endswith("/")
+    # The other node has no call in progress
+    second = hosts.acquire()
+    assert second is not first
+    hosts.release(first, 0.1)
+    assert hosts.acquire() is first
+
+
+def test_ewma():
+    hosts = HostPool(["http://a/nuxeo", "http://b/nuxeo"], strategy="ewma")
+    slow, fast = hosts.nodes
+    slow.latency, fast.latency = 0.95, 0.1
+    assert all(hosts.acquire() is fast for _ in range(9))
+    # Until calls in progress make it slower than the other one
+    assert hosts.acquire() is slow
+
+    hosts.release(fast, 0.2)
+    assert fast.latency == pytest.approx(0.13)
+
+
+def test_ejection():
+    hosts = HostPool(["http://a/nuxeo", "http://b/nuxeo"], max_failures=2, ejection_time=60)
+    bad, good = hosts.nodes
+    for _ in range(2):
+        bad.outstanding += 1
+        hosts.release(bad, 0.1, failed=True)
+    assert bad.ejections == 1
+    assert all(hosts.acquire() is good for _ in range(10))
+
+    # Every node is ejected: use them all again
+    for _ in range(2):
+        hosts.release(good, 0.1, failed=True)
+    assert {hosts.acquire().url for _ in range(50)} == {bad.url, good.url}
+
+    stats = hosts.as_dict()
+    assert stats[bad.url]["errors"] == 2
+    assert stats[good.url]["ejections"] == 1
+
+
+def test_health_check():
+    hosts = HostPool(["http://a/nuxeo", "http://b/nuxeo", "http://c/nuxeo"])
+    a, b, c = hosts.nodes
+
+    def is_healthy(url):
+        if url == c.url:
+            raise ConnectionError()
+        return url == a.url
+
+    hosts.check(is_healthy)
+    assert [node.healthy for node in hosts.nodes] == [True, False, False]
+    assert all(hosts.acquire() is a for _ in range(10))
+
+    hosts.check(lambda url: True)
+    assert all(node.healthy for node in hosts.nodes)
+
+
+def test_health_check_thread():
+    checked = []
+    hosts = HostPool(["http://a/nuxeo", "http://b/nuxeo"], health_check_interval=0.01)
+    hosts.start(checked.append)
+    for _ in range(100):
+        if len(checked) >= 2:
+            break
+        sleep(0.01)
+    hosts.stop()
+    assert set(checked) == {"http://a/nuxeo/", "http://b/nuxeo/"}
+
+
+def test_sticky():
+    hosts = HostPool(["http://a/nuxeo", "http://b/nuxeo"])
+    node = hosts.acquire("batch-1")
+    node.outstanding += 10
+    assert hosts.acquire("batch-1") is node
+
+    hosts.bind("batch-2", "http://b/nuxeo/api/v1/upload/")
+    assert hosts.acquire("batch-2").url == "http://b/nuxeo/"
+
+
+def test_client_spreads_calls(nodes, nuxeo_client):
+    server = nuxeo_client(host=[httpd.url for httpd in nodes])
+    client = server.client
+    client.disable_retry()
+    assert client.host == nodes[0].url
+
+    for _ in range(20):
+        client.request("GET", "api/v1/ping").content
+    assert all(httpd.calls for httpd in nodes)
+
+    # A failing node is ejected
+    bad, good = nodes
+    bad.status = 503
+    for _ in range(20):
+        try:
+            client.request("GET", "api/v1/ping").content
+        except HTTPError:
+            pass
+    bad.calls.clear()
+    good.calls.clear()
+    for _ in range(10):
+        client.request("GET", "api/v1/ping").content
+    assert not bad.calls
+    assert len(good.calls) == 10
+
+    # A node can be checked on its own
+    assert not client.is_reachable(host=bad.url)
+    assert client.is_reachable(host=good.url.rstrip("/"))
+
+
+def test_client_health_checks(nodes, nuxeo_client):
+    limiter = AdaptiveLimiter()
+    metrics = Metrics()
+    hosts = HostPool([httpd.url for httpd in nodes], health_check_interval=0)
+    retries = DEFAULT_RETRY.new(budget=RetryBudget())
+    server = nuxeo_client(host=hosts, retries=retries, limiter=limiter, metrics=metrics)
+    client = server.client
+    bad, good = nodes
+    bad.status = 503
+
+    hosts.check(client._is_healthy)
+    assert [node.healthy for node in hosts.nodes] == [False, True]
+
+    # A single bare call per node, even with retries enabled
+    assert bad.calls == good.calls == ["/nuxeo/runningstatus"]
+    assert limiter.as_dict()["requests"] == 0
+    assert not metrics.as_dict()
+    assert client.retry_stats()["requests"] == 0
+
+    # An unreachable node
+    assert not client._is_healthy("http://127.0.0.1:1/nuxeo/")
+
+
+def test_client_batch_sticks_to_its_node(nodes, nuxeo_client):
+    hosts = HostPool([httpd.url for httpd in nodes], health_check_interval=0)
+    server = nuxeo_client(host=hosts)
+    server.client.disable_retry()
+    assert server.client.hosts is hosts
+
+    batch = server.uploads.batch()
+    (owner,) = [httpd for httpd in nodes if batch.batchId == f"batch-{httpd.server_address[1]}"]
+    owner.calls.clear()
+    for _ in range(10):
+        server.client.request("GET", f"api/v1/upload/{batch.batchId}").content
+    assert len(owner.calls) == 10
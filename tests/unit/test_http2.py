@@ -0,0 +1,199 @@
+# coding: utf-8
+import json
+import pickle
+import socket
+import zipfile
+from io import BytesIO
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+import requests
+from nuxeo.client import DEFAULT_RETRY, Nuxeo
+from nuxeo.compression import GzipStream, gzip_compress
+from nuxeo.exceptions import HTTPError, InvalidTransport
+from nuxeo.retry import RetryBudget
+from nuxeo.tcp import available_transports
+
+pytestmark = pytest.mark.skipif(
+    "http2" not in available_transports(), reason="httpx and h2 are not installed"
+)
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def answer(self, body=b""):
+        # "/nuxeo/<status>/..." answers with that status
+        self.server.calls.append((self.command, self.path))
+        status = int(self.path.split("/")[2])
+        data = json.dumps(
+            {
+                "body": body.decode("utf-8", errors="replace"),
+                "authorization": self.headers.get("Authorization"),
+                "cookie": self.headers.get("Cookie"),
+            }
+        ).encode("utf-8")
+        self.send_response(status)
+        if 300 <= status < 400:
+            self.send_header("Location", "/nuxeo/200/target")
+        if status == 503:
+            self.send_header("Retry-After", "0")
+        self.send_header("Set-Cookie", "JSESSIONID=42; Path=/nuxeo")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.endswith(".zip"):
+            return self.archive()
+        self.answer()
+
+    def archive(self):
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("file.txt", b"content" * 1024)
+        data = gzip_compress(buffer.getvalue())
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip")
+        self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.headers.get("Transfer-Encoding") == "chunked":
+            body = b""
+            while True:
+                size = int(self.rfile.readline().strip(), 16)
+                chunk = self.rfile.read(size + 2)[:size]
+                if not size:
+                    break
+                body += chunk
+        else:
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.server.bodies.append(body)
+        self.answer(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_invalid_transport():
+    with pytest.raises(InvalidTransport) as exc:
+        Nuxeo(transport="carrier-pigeon")
+    assert "carrier-pigeon" in str(exc.value)
+
+
+def test_request(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, transport="http2")
+    client = server.client
+
+    resp = client.request("GET", "200/ping")
+    assert resp.raw.version_string == "HTTP/1.1"
+    data = resp.json()
+    assert data["authorization"].startswith("Basic ")
+    # The session cookie is kept
+    assert client._session.cookies["JSESSIONID"] == "42"
+    assert client.request("GET", "200/ping").json()["cookie"] == "JSESSIONID=42"
+
+    data = client.request("POST", "200/automation/Document.Fetch", data={"params": {}}).json()
+    assert json.loads(data["body"]) == {"params": {}}
+
+    # Streamed bodies can be read by chunks
+    expected = client.request("GET", "200/ping").content
+    resp = client.request("GET", "200/ping")
+    assert b"".join(resp.iter_content(chunk_size=3)) == expected
+
+    with pytest.raises(HTTPError):
+        client.request("GET", "404/ping")
+
+
+@pytest.mark.parametrize("compressed", [False, True])
+def test_file_body(http_server, nuxeo_client, compressed):
+    server = nuxeo_client(host=http_server.url, transport="http2")
+    client = server.client
+    data = b"file content " * 1024
+    body = GzipStream(data, chunk_size=1024) if compressed else BytesIO(data)
+    expected = gzip_compress(data) if compressed else data
+
+    client.request("POST", "200/upload", data=body, raw=True)
+    assert http_server.bodies == [expected]
+
+
+def test_file_body_retried(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, transport="http2")
+    client = server.client
+    client.retries = DEFAULT_RETRY.new(total=2, allowed_methods=None, backoff_factor=0)
+    client.enable_retry()
+
+    data = b"file content " * 1024
+    with pytest.raises(HTTPError):
+        client.request("POST", "503/upload", data=BytesIO(data), raw=True)
+    # The body is sent whole on each attempt
+    assert http_server.bodies == [data] * 3
+
+
+def test_bulk_download(http_server, nuxeo_client, monkeypatch, tmp_path):
+    server = nuxeo_client(host=http_server.url, transport="http2")
+    monkeypatch.setattr(
+        "nuxeo.operations.API.execute_async",
+        lambda self, **kwargs: self.client.request("GET", "200/documents.zip"),
+    )
+
+    files = server.documents.bulk_download(["uid"], str(tmp_path))
+    assert files == [str(tmp_path / "file.txt")]
+    assert (tmp_path / "file.txt").read_bytes() == b"content" * 1024
+
+
+def test_body_not_decoded(http_server, nuxeo_client):
+    resp = nuxeo_client(host=http_server.url, transport="http2").client.request("GET", "200/documents.zip")
+    resp.raw.decode_content = False
+    assert resp.raw.read(2) == b"\x1f\x8b"
+    resp.close()
+
+
+def test_redirect(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, transport="http2")
+    resp = server.client.request("GET", "302/path/doc")
+    assert resp.status_code == 200
+    assert resp.url.endswith("/nuxeo/200/target")
+
+
+def test_retries(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, transport="http2")
+    client = server.client
+    client.retries = DEFAULT_RETRY.new(budget=RetryBudget(min_per_second=0, max_balance=2))
+    client.enable_retry()
+
+    with pytest.raises(HTTPError):
+        client.request("GET", "503/ping")
+    # The first attempt, and the 2 retries the budget allows
+    assert len(http_server.calls) == 3
+    assert client.retry_stats()["retries"] == 2
+
+
+def test_connection_error(nuxeo_client):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = nuxeo_client(host=f"http://127.0.0.1:{port}/nuxeo/", transport="http2")
+    server.client.disable_retry()
+    with pytest.raises(requests.exceptions.ConnectionError):
+        server.client.request("GET", "200/ping")
+
+
+def test_adapter_pickling(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, transport="http2")
+    adapter = server.client._session.get_adapter(http_server.url)
+    adapter.send(requests.Request("GET", f"{http_server.url}200/ping").prepare()).content
+
+    copy = pickle.loads(pickle.dumps(adapter))
+    assert copy.max_retries.total == adapter.max_retries.total
+    resp = copy.send(requests.Request("GET", f"{http_server.url}200/ping").prepare())
+    assert resp.status_code == 200
+    copy.close()
+    adapter.close()
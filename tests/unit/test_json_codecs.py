@@ -0,0 +1,95 @@
+# coding: utf-8
+import math
+
+import pytest
+import responses
+from nuxeo.exceptions import InvalidJSONCodec
+from nuxeo.json_codecs import CODECS, JSONCodec, get_codec
+from nuxeo.models import Blob
+from requests.exceptions import JSONDecodeError
+from ..constants import NUXEO_SERVER_URL
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+API = f"{NUXEO_SERVER_URL}/api/v1"
+
+codecs = pytest.mark.parametrize(
+    "name",
+    [
+        pytest.param(
+            name,
+            marks=pytest.mark.skipif(not cls.available(), reason=f"{name} is not installed"),
+        )
+        for name, cls in CODECS.items()
+    ],
+)
+
+
+@codecs
+def test_roundtrip(name):
+    codec = get_codec(name)
+    blob = Blob(batchId="batch-1", fileIdx=2)
+    obj = {"input": blob, "params": {"title": "ça marche", "count": 10**30, 1: None}}
+
+    # Decoded with the standard library: orjson reads integers bigger than 64 bits as floats
+    data = get_codec("json").loads(codec.dumps(obj))
+    assert data == {
+        "input": {"upload-batch": "batch-1", "upload-fileId": "2"},
+        "params": {"title": "ça marche", "count": 10**30, "1": None},
+    }
+    assert codec.loads(b'{"entries": [{"uid": "1234", "size": 42}]}') == {"entries": [{"uid": "1234", "size": 42}]}
+
+
+@codecs
+def test_loads_fallback(name):
+    codec = get_codec(name)
+    assert math.isnan(codec.loads(b'{"value": NaN}')["value"])
+    assert codec.loads('{"title": "ça"}'.encode("utf-16")) == {"title": "ça"}
+    with pytest.raises(ValueError):
+        codec.loads(b"not JSON")
+
+
+def test_get_codec():
+    codec = JSONCodec()
+    assert get_codec(codec) is codec
+    assert get_codec("auto").available()
+
+    with pytest.raises(InvalidJSONCodec) as exc:
+        get_codec("simplejson")
+    assert "'simplejson' is not one of" in str(exc.value)
+
+
+@codecs
+@responses.activate
+def test_client_codec(name, nuxeo_client):
+    server = nuxeo_client(json_codec=name)
+    assert server.client.codec.name == name
+    responses.add(
+        responses.POST,
+        f"{API}/path/",
+        json={
+            "entity-type": "user",
+            "id": "uuid-alice",
+            "properties": {"username": "alice", "firstName": "Alice"},
+        },
+    )
+
+    resp = server.client.request("POST", "api/v1/path/", data={"input": Blob(batchId="b", fileIdx=0)})
+    body = responses.calls[0].request.body
+    assert get_codec("json").loads(body) == {"input": {"upload-batch": "b", "upload-fileId": "0"}}
+
+    # User entities are translated whatever the codec
+    assert resp.json()["id"] == "alice"
+    assert server.client.userid_mapper == {"alice": "uuid-alice"}
+
+
+@codecs
+@responses.activate
+def test_client_codec_invalid_response(name, nuxeo_client):
+    server = nuxeo_client(json_codec=name)
+    responses.add(responses.GET, f"{API}/path/", body="<html>Not JSON</html>")
+
+    resp = server.client.request("GET", "api/v1/path/")
+    with pytest.raises(JSONDecodeError):
+        resp.json()
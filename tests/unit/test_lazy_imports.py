@@ -0,0 +1,73 @@
+# coding: utf-8
+import json
+import subprocess
+import sys
+
+import pytest
+from nuxeo.client import Nuxeo
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+# Modules that `import nuxeo.client` and Nuxeo() must not import
+LAZY_MODULES = (
+    "authlib",
+    "jwt",
+    "nuxeo.auth.oauth2",
+    "nuxeo.documents",
+    "nuxeo.operations",
+    "nuxeo.uploads",
+    "opentelemetry",
+    "orjson",
+    "packaging",
+    "ujson",
+)
+
+
+def imported_modules(code):
+    script = f"import json, sys\n{code}\nprint(json.dumps(sorted(sys.modules)))"
+    output = subprocess.check_output([sys.executable, "-c", script])
+    return json.loads(output)
+
+
+def test_import():
+    modules = imported_modules("from nuxeo.client import Nuxeo\nNuxeo()")
+    loaded = [name for name in modules if name.split(".")[0] in LAZY_MODULES or name in LAZY_MODULES]
+    assert not loaded
+
+
+def test_endpoint_import():
+    modules = imported_modules("from nuxeo.client import Nuxeo\nNuxeo().documents")
+    assert "nuxeo.documents" in modules
+    assert "nuxeo.operations" in modules
+    assert "nuxeo.uploads" not in modules
+
+
+def test_endpoints():
+    server = Nuxeo()
+    assert "documents" not in vars(server)
+    documents = server.documents
+    assert server.documents is documents
+    assert documents.operations is server.operations
+    assert server.workflows.tasks_api is server.tasks
+    assert type(Nuxeo.documents).__name__ == "_Endpoint"
+
+    # Endpoints can still be replaced
+    server.users = "users"
+    assert server.users == "users"
+    server.client.on_exit()
+
+
+def test_lazy_auth():
+    import nuxeo.auth
+
+    with pytest.raises(AttributeError):
+        nuxeo.auth.Kerberos
+    try:
+        import authlib  # noqa: F401
+    except ImportError:
+        pytest.skip("authlib is not installed")
+    from nuxeo.auth import OAuth2
+    from nuxeo.auth.oauth2 import OAuth2 as cls
+
+    assert OAuth2 is cls
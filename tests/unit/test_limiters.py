@@ -0,0 +1,184 @@
+# coding: utf-8
+from multiprocessing import Process
+from threading import Thread
+from time import monotonic, sleep
+from unittest.mock import Mock
+
+import pytest
+import responses
+from nuxeo.exceptions import HTTPError
+from nuxeo.limiters import AdaptiveLimiter, RateLimiter, TokenBucket, is_overloaded
+from requests.exceptions import ConnectionError, ReadTimeout
+from urllib3.util.retry import RequestHistory, Retry
+from ..constants import NUXEO_SERVER_URL
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+
+def test_additive_increase():
+    limiter = AdaptiveLimiter(initial_limit=4, max_limit=5)
+    # About one more slot per window of *limit* successes
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(0.01)
+    assert limiter.limit == 5
+
+    # Capped
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(0.01)
+    assert limiter.limit == 5
+    assert limiter.in_flight == 0
+
+
+def test_multiplicative_decrease():
+    limiter = AdaptiveLimiter(initial_limit=16, min_limit=2)
+    limiter.acquire()
+    limiter.release(0.01, overloaded=True)
+    assert limiter.limit == 8
+
+    # Overloads of the same round trip count once
+    limiter.acquire()
+    limiter.release(10, overloaded=True)
+    assert limiter.limit == 8
+
+    limiter._last_decrease = 0
+    for _ in range(5):
+        limiter._last_decrease = 0
+        limiter.acquire()
+        limiter.release(0.01, overloaded=True)
+    assert limiter.limit == 2
+    assert limiter.as_dict()["overloads"] == 7
+
+
+def test_latency_inflation():
+    limiter = AdaptiveLimiter(initial_limit=8, latency_tolerance=2)
+    for _ in range(limiter.WARMUP + 10):
+        limiter.acquire()
+        limiter.release(0.01)
+    limit = limiter.limit
+
+    # The server slows down
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(1)
+    assert limiter.limit < limit
+    assert limiter.stats["decreases"]
+
+
+def test_acquire_blocks():
+    limiter = AdaptiveLimiter(initial_limit=1)
+    limiter.acquire()
+    with pytest.raises(TimeoutError):
+        limiter.acquire(timeout=0.01)
+
+    def release():
+        sleep(0.05)
+        limiter.release(0.05)
+
+    Thread(target=release).start()
+    limiter.acquire(timeout=5)
+    assert limiter.in_flight == 1
+
+
+def test_is_overloaded():
+    assert is_overloaded(Mock(status_code=503))
+    assert not is_overloaded(Mock(status_code=500, raw=None))
+    assert is_overloaded(ConnectionError())
+    assert is_overloaded(ReadTimeout())
+    assert not is_overloaded(ValueError())
+
+    # Retried by urllib3
+    history = (RequestHistory("GET", "/", None, 429, None),)
+    resp = Mock(status_code=200)
+    resp.raw.retries = Retry(history=history)
+    assert is_overloaded(resp)
+    resp.raw.retries = Retry()
+    assert not is_overloaded(resp)
+
+
+@responses.activate
+def test_client_limiter(nuxeo_client):
+    limiter = AdaptiveLimiter(initial_limit=8)
+    server = nuxeo_client(limiter=limiter)
+    server.client.disable_retry()
+    url = f"{NUXEO_SERVER_URL}/api/v1/path/"
+    responses.add(responses.GET, url, json={})
+    responses.add(responses.GET, url, status=429)
+
+    server.client.request("GET", "api/v1/path/")
+    assert limiter.limit == 8
+
+    with pytest.raises(HTTPError):
+        server.client.request("GET", "api/v1/path/")
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=100, capacity=10)
+    start = monotonic()
+    bucket.consume(10)
+    assert monotonic() - start < 0.05
+
+    # Empty, 5 tokens need 50 ms
+    bucket.consume(5)
+    assert monotonic() - start >= 0.04
+
+    with pytest.raises(TimeoutError):
+        bucket.consume(10, timeout=0.01)
+
+
+def test_token_bucket_debt():
+    bucket = TokenBucket(rate=1000, capacity=100)
+    bucket.charge(300)
+    assert bucket.level() < -100
+
+    # More than the capacity: allowed once the bucket is full
+    bucket = TokenBucket(rate=1000, capacity=100)
+    bucket.consume(250)
+    assert bucket.level() < -100
+
+
+def consume_shared(path, count):
+    bucket = TokenBucket(rate=200, capacity=10, path=path)
+    for _ in range(count):
+        bucket.consume(1)
+
+
+def test_token_bucket_shared_between_processes(tmp_path):
+    path = str(tmp_path / "requests.bucket")
+    processes = [Process(target=consume_shared, args=(path, 30)) for _ in range(3)]
+
+    start = monotonic()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=30)
+    elapsed = monotonic() - start
+
+    assert all(process.exitcode == 0 for process in processes)
+    # 90 tokens at 200/s, the first 10 being available right away
+    assert elapsed >= 0.4
+    assert TokenBucket(rate=200, capacity=10, path=path).level() < 10
+
+
+@responses.activate
+def test_client_rate_limiter(nuxeo_client):
+    # Budgets refilled slowly, to not be refilled during the test
+    rate_limiter = RateLimiter(requests_per_second=1, bytes_per_second=1_000, burst=10)
+    server = nuxeo_client(rate_limiter=rate_limiter)
+    url = f"{NUXEO_SERVER_URL}/api/v1/path/"
+    responses.add(
+        responses.POST,
+        url,
+        body=b"a" * 5_000,
+        content_type="application/octet-stream",
+        headers={"Content-Length": "5000"},
+    )
+
+    server.client.request("POST", "api/v1/path/", data=b"b" * 3_000)
+    # 3,000 bytes sent, 5,000 received
+    assert 2_000 <= rate_limiter.bandwidth.level() <= 2_500
+    assert rate_limiter.requests.level() < 10
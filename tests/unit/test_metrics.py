@@ -0,0 +1,181 @@
+# coding: utf-8
+from http.server import BaseHTTPRequestHandler
+
+import pytest
+from nuxeo.client import DEFAULT_RETRY, Nuxeo
+from nuxeo.exceptions import HTTPError
+from nuxeo.metrics import Metrics, endpoint_template
+from nuxeo.retry import RetryBudget
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+UID = "0a1b2c3d-0a1b-0a1b-0a1b-0a1b2c3d4e5f"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def answer(self):
+        # "/nuxeo/<status>/..." answers with that status
+        status = int(self.path.split("/")[2])
+        body = b"0123456789"
+        self.send_response(status)
+        if 300 <= status < 400:
+            self.send_header("Location", "/nuxeo/200/target")
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.answer()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.answer()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.mark.parametrize(
+    "url, template",
+    [
+        ("api/v1/path/", "api/v1/path/"),
+        ("api/v1/path/default-domain/workspaces/ws", "api/v1/path/{path}"),
+        ("api/v1/path/default-domain/workspaces/ws/@children", "api/v1/path/{path}/@children"),
+        (f"api/v1/id/{UID}?properties=*", "api/v1/id/{uid}"),
+        (f"/nuxeo/api/v1/id/{UID.upper()}/@blob/file:content", "/nuxeo/api/v1/id/{uid}/@blob/file:content"),
+        ("api/v1/upload/", "api/v1/upload/"),
+        ("api/v1/upload/handlers", "api/v1/upload/handlers"),
+        ("api/v1/upload/new/s3", "api/v1/upload/new/s3"),
+        (f"api/v1/upload/batchId-{UID}/0/complete", "api/v1/upload/{batchId}/{n}/complete"),
+        ("api/v1/user/search", "api/v1/user/search"),
+        ("api/v1/user/alice/group/admins", "api/v1/user/{username}/group/{groupname}"),
+        ("api/v1/automation/Document.Fetch", "api/v1/automation/Document.Fetch"),
+    ],
+)
+def test_endpoint_template(url, template):
+    assert endpoint_template(url) == template
+
+
+def test_observe():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.observe("GET", "api/v1/id/{uid}", "200", 0.05, received=42)
+    metrics.observe("GET", "api/v1/id/{uid}", "404", 0.1, received=10)
+    metrics.observe("GET", "api/v1/id/{uid}", "200", 2.0, retries=2, pool_wait=0.5)
+    metrics.observe("PUT", "api/v1/id/{uid}", "200", 0.5, sent=100, redirects=1)
+
+    stats = metrics.as_dict()
+    get = stats["api/v1/id/{uid}"]["GET"]
+    assert get["count"] == 3
+    assert get["latency"] == pytest.approx(2.15)
+    assert get["statuses"] == {"200": 2, "404": 1}
+    assert get["received"] == 52
+    assert get["retries"] == 2
+    assert get["pool_wait"] == 0.5
+    put = stats["api/v1/id/{uid}"]["PUT"]
+    assert put["sent"] == 100
+    assert put["redirects"] == 1
+
+    metrics.reset()
+    assert metrics.as_dict() == {}
+
+
+def test_max_endpoints():
+    metrics = Metrics(max_endpoints=2)
+    for endpoint in ("a", "b", "c", "d"):
+        metrics.observe("GET", endpoint, "200", 0.01)
+    metrics.observe("GET", "a", "200", 0.01)
+
+    stats = metrics.as_dict()
+    assert sorted(stats) == ["a", "b", "other"]
+    assert stats["a"]["GET"]["count"] == 2
+    assert stats["other"]["GET"]["count"] == 2
+
+
+def test_callback(caplog):
+    samples = []
+    metrics = Metrics(callback=samples.append)
+    metrics.observe("GET", "api/v1/path/{path}", "200", 0.01, received=5)
+    assert samples == [
+        {
+            "method": "GET",
+            "endpoint": "api/v1/path/{path}",
+            "status": "200",
+            "latency": 0.01,
+            "sent": 0,
+            "received": 5,
+            "retries": 0,
+            "redirects": 0,
+            "pool_wait": 0.0,
+            "phases": {},
+        }
+    ]
+
+    # A failing callback does not break calls
+    metrics.callback = lambda sample: 1 / 0
+    metrics.observe("GET", "api/v1/path/{path}", "200", 0.01)
+    assert "Metrics callback" in caplog.text
+    assert metrics.as_dict()["api/v1/path/{path}"]["GET"]["count"] == 2
+
+
+def test_prometheus():
+    metrics = Metrics(buckets=(0.1, 1.0))
+    metrics.observe("GET", "api/v1/id/{uid}", "200", 0.05, received=42)
+    metrics.observe("GET", "api/v1/id/{uid}", "200", 0.1)
+    metrics.observe("GET", "api/v1/id/{uid}", "500", 5.0, retries=3)
+    metrics.observe("POST", 'weird"\\endpoint', "error", 0.5)
+
+    text = metrics.prometheus(prefix="app")
+    lines = text.splitlines()
+    assert text.endswith("\n")
+    assert "# TYPE app_request_duration_seconds histogram" in lines
+    labels = 'method="GET",endpoint="api/v1/id/{uid}"'
+    assert f'app_request_duration_seconds_bucket{{{labels},le="0.1"}} 2' in lines
+    assert f'app_request_duration_seconds_bucket{{{labels},le="1.0"}} 2' in lines
+    assert f'app_request_duration_seconds_bucket{{{labels},le="+Inf"}} 3' in lines
+    assert f"app_request_duration_seconds_count{{{labels}}} 3" in lines
+    assert f'app_requests_total{{{labels},status="200"}} 2' in lines
+    assert f'app_requests_total{{{labels},status="500"}} 1' in lines
+    assert f"app_response_bytes_total{{{labels}}} 42" in lines
+    assert f"app_retries_total{{{labels}}} 3" in lines
+    # Labels values are escaped
+    assert 'app_requests_total{method="POST",endpoint="weird\\"\\\\endpoint",status="error"} 1' in lines
+
+
+def test_client_metrics(http_server, nuxeo_client):
+    metrics = Metrics()
+    server = nuxeo_client(host=http_server.url, metrics=metrics)
+    client = server.client
+    client.retries = DEFAULT_RETRY.new(budget=RetryBudget(min_per_second=0, max_balance=2))
+    client.enable_retry()
+
+    client.request("GET", f"200/id/{UID}", params={"properties": "*"}).content
+    client.request("POST", "200/automation/Document.Fetch", data={"params": {}}).content
+    client.request("GET", "302/path/to/doc", adapter="children").content
+    with pytest.raises(HTTPError):
+        client.request("GET", "503/ping")
+    client.request("GET", "404/ping", default=None)
+
+    stats = metrics.as_dict()
+    get = stats["{n}/id/{uid}"]["GET"]
+    assert get["count"] == 1
+    assert get["statuses"] == {"200": 1}
+    assert get["received"] == 10
+    assert get["pool_wait"] >= 0
+
+    post = stats["{n}/automation/Document.Fetch"]["POST"]
+    assert post["sent"] == len('{"params": {}}')
+
+    # The client asks again the original URL and then follows the redirection
+    redirected = stats["{n}/path/{path}/@children"]["GET"]
+    assert redirected["redirects"] == 2
+    assert redirected["statuses"] == {"200": 1}
+
+    ping = stats["{n}/ping"]["GET"]
+    assert ping["statuses"] == {"503": 1, "404": 1}
+    assert ping["retries"] == 2
+
+    assert 'endpoint="{n}/ping",status="503"} 1' in metrics.prometheus()
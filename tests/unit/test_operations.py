@@ -0,0 +1,139 @@
+# coding: utf-8
+from threading import Event, Thread
+
+import pytest
+import responses
+from nuxeo.exceptions import BadQuery
+from nuxeo.models import Blob
+from nuxeo.operations import ParamsValidator
+from ..constants import NUXEO_SERVER_URL
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+REGISTRY = {
+    "operations": [
+        {
+            "id": "Document.Fetch",
+            "aliases": ["Document.Get"],
+            "params": [{"name": "value", "type": "string", "required": True}],
+        },
+        {
+            "id": "Document.SetBlob",
+            "params": [
+                {"name": "file", "type": "blob", "required": True},
+                {"name": "xpath", "type": "string", "required": False},
+                {"name": "save", "type": "boolean", "required": False},
+            ],
+        },
+        {
+            "id": "Document.Query",
+            "params": [
+                {"name": "query", "type": "string", "required": True},
+                {"name": "pageSize", "type": "integer", "required": False},
+                {"name": "queryParams", "type": "stringlist", "required": False},
+                {"name": "sortBy", "type": "newtype", "required": False},
+            ],
+        },
+    ]
+}
+
+
+@pytest.fixture
+def server(nuxeo_client):
+    with responses.RequestsMock() as rsps:
+        rsps.add(responses.GET, f"{NUXEO_SERVER_URL}/site/automation", json=REGISTRY)
+        server = nuxeo_client()
+        server.operations.operations
+        yield server
+
+
+@pytest.mark.parametrize(
+    "command, params",
+    [
+        ("Document.Fetch", {"value": "/"}),
+        ("Document.Get", {"value": b"/"}),
+        ("Document.SetBlob", {"file": Blob()}),
+        ("Document.SetBlob", {"file": "/path", "xpath": None, "save": True}),
+        ("Document.Query", {"query": "SELECT * FROM Document", "pageSize": 0, "queryParams": ("a", "b")}),
+        # Unknown types are not checked
+        ("Document.Query", {"query": "SELECT * FROM Document", "sortBy": object()}),
+    ],
+)
+def test_valid(server, command, params):
+    server.operations.check_params(command, params)
+
+
+@pytest.mark.parametrize(
+    "command, params, message",
+    [
+        ("Document.Fetch", {}, "missing required parameter 'value' for operation 'Document.Fetch'"),
+        ("Document.Fetch", {"value": "/", "alien": 1}, "unexpected parameter 'alien' for operation Document.Fetch"),
+        (
+            "Document.Fetch",
+            {"value": 42},
+            "parameter value=42 should be of type str or bytes (current is int)",
+        ),
+        (
+            "Document.Query",
+            {"query": "", "pageSize": "10"},
+            "parameter pageSize='10' should be of type int (current is str)",
+        ),
+        (
+            "Document.SetBlob",
+            {"file": Blob(), "save": "yes"},
+            "parameter save='yes' should be of type bool (current is str)",
+        ),
+        ("Document.Unknown", {}, "'Document.Unknown' is not a registered operation"),
+    ],
+)
+def test_invalid(server, command, params, message):
+    with pytest.raises(BadQuery) as exc:
+        server.operations.check_params(command, params)
+    assert message in str(exc.value)
+
+
+def test_validators_compiled_once(server):
+    registry = server.client._registry
+    assert registry["Document.Fetch"][1] is registry["Document.Get"][1]
+    assert registry["Document.Fetch"][0] is server.operations.operations["Document.Fetch"]
+    operation, validator = registry["Document.SetBlob"]
+    assert isinstance(validator, ParamsValidator)
+    assert validator.required == ["file"]
+    assert validator.types["xpath"] == (str, bytes, type(None))
+    assert "Document.SetBlob" in repr(validator)
+
+    server.operations.check_params("Document.SetBlob", {"file": Blob()})
+    assert server.client._registry is registry
+
+
+def test_downloads_do_not_hold_the_client_lock(monkeypatch, nuxeo_client):
+    server = nuxeo_client()
+    client = server.client
+    started = Event()
+    resume = Event()
+
+    def get(self, **kwargs):
+        started.set()
+        assert resume.wait(5)
+        return REGISTRY
+
+    def request(method, path, **kwargs):
+        started.set()
+        assert resume.wait(5)
+        raise ValueError("no server")
+
+    monkeypatch.setattr("nuxeo.operations.API.get", get)
+    monkeypatch.setattr(client, "request", request)
+    for download in (lambda: server.operations.operations, client.server_info):
+        started.clear()
+        resume.clear()
+        thread = Thread(target=download)
+        thread.start()
+        assert started.wait(5)
+        # Other calls needing the client lock are not blocked meanwhile
+        assert client._lock.acquire(timeout=1)
+        client._lock.release()
+        resume.set()
+        thread.join()
+    assert "Document.Fetch" in server.operations.operations
@@ -0,0 +1,353 @@
+# coding: utf-8
+import json
+import re
+from threading import Event, Lock
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import responses
+from nuxeo.constants import PAGE_SIZE_MAX, PAGE_SIZE_MIN
+from nuxeo.exceptions import BadQuery, HTTPError
+from nuxeo.models import Document, Task
+from nuxeo.pagination import KeysetIterator, NXQLKeyset, PageIterator, nxql_literal
+from ..constants import NUXEO_SERVER_URL
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+API = f"{NUXEO_SERVER_URL}/api/v1"
+
+
+class Listing(object):
+    """A paginated listing of *total* entries, recording the pages asked for."""
+
+    def __init__(self, total, next_flag=True):
+        self.total = total
+        self.next_flag = next_flag
+        self.calls = []
+        self.lock = Lock()
+
+    def page(self, index, size):
+        with self.lock:
+            self.calls.append((index, size))
+        entries = list(range(index * size, min((index + 1) * size, self.total)))
+        page = {"entries": entries, "currentPageIndex": index, "pageSize": size}
+        if self.next_flag:
+            page["isNextPageAvailable"] = (index + 1) * size < self.total
+        return page
+
+    def __call__(self, request):
+        params = parse_qs(urlsplit(request.url).query)
+        index, size = int(params["currentPageIndex"][0]), int(params["pageSize"][0])
+        page = self.page(index, size)
+        page["entries"] = [
+            {"entity-type": "document", "uid": f"uid-{idx}", "title": params.get("query", ["child"])[0]}
+            for idx in page["entries"]
+        ]
+        return 200, {}, json.dumps(page)
+
+
+@pytest.mark.parametrize("prefetch", [True, False])
+@pytest.mark.parametrize("next_flag", [True, False])
+def test_all_entries(prefetch, next_flag, nuxeo_client):
+    listing = Listing(25, next_flag=next_flag)
+    pages = PageIterator(listing.page, submit=nuxeo_client().client.submit, page_size=10, prefetch=prefetch)
+
+    assert list(pages) == list(range(25))
+    assert listing.calls == [(0, 10), (1, 10), (2, 10)]
+    assert pages.cursor == {"offset": 25, "pageSize": 10}
+
+
+def test_exact_pages_without_next_flag():
+    listing = Listing(20, next_flag=False)
+    assert list(PageIterator(listing.page, page_size=10)) == list(range(20))
+    # An empty page tells the end
+    assert listing.calls == [(0, 10), (1, 10), (2, 10)]
+
+
+def test_empty():
+    listing = Listing(0)
+    assert list(PageIterator(listing.page, page_size=10)) == []
+    assert listing.calls == [(0, 10)]
+
+
+def test_parse():
+    pages = PageIterator(Listing(3).page, parse=str, page_size=2)
+    assert list(pages) == ["0", "1", "2"]
+
+
+def test_prefetch_before_consumption(nuxeo_client):
+    listing = Listing(4)
+    fetched = Event()
+
+    def fetch(index, size):
+        if index == 1:
+            fetched.set()
+        return listing.page(index, size)
+
+    pages = iter(PageIterator(fetch, submit=nuxeo_client().client.submit, page_size=2))
+    assert next(pages) == 0
+    # The second page is fetched while the first one is consumed
+    assert fetched.wait(5)
+    assert list(pages) == [1, 2, 3]
+
+
+def test_resume_from_cursor():
+    listing = Listing(25)
+    pages = PageIterator(listing.page, page_size=10)
+    iterator = iter(pages)
+    consumed = [next(iterator) for _ in range(13)]
+    assert consumed == list(range(13))
+    cursor = json.loads(json.dumps(pages.cursor))
+    assert cursor == {"offset": 13, "pageSize": 10}
+
+    listing.calls.clear()
+    resumed = PageIterator(listing.page, page_size=50, cursor=cursor)
+    assert list(resumed) == list(range(13, 25))
+    assert listing.calls == [(1, 10), (2, 10)]
+
+    # With another page size, the page holding the position is fetched
+    listing.calls.clear()
+    resumed = PageIterator(listing.page, cursor={"offset": 13, "pageSize": 4})
+    assert list(resumed) == list(range(13, 25))
+    assert listing.calls[0] == (3, 4)
+
+
+def test_auto_tune(monkeypatch):
+    listing = Listing(1000)
+    pages = PageIterator(listing.page, page_size=10, auto_tune=True)
+
+    # Fast pages: the size doubles at most, up to the maximum
+    assert list(pages) == list(range(1000))
+    sizes = [size for _, size in listing.calls]
+    assert sizes[:4] == [10, 20, 40, 80]
+    assert max(sizes) <= PAGE_SIZE_MAX
+
+    # Slow pages: the size is halved at most, down to the minimum
+    times = iter(range(0, 1000, 10))
+    monkeypatch.setattr("nuxeo.pagination.monotonic", lambda: next(times))
+    listing = Listing(100)
+    pages = PageIterator(listing.page, page_size=40, auto_tune=True)
+    assert list(pages) == list(range(100))
+    sizes = [size for _, size in listing.calls]
+    assert sizes[:3] == [40, 20, PAGE_SIZE_MIN]
+
+
+def test_auto_tune_response_size():
+    pages = PageIterator(Listing(0).page, page_size=100, auto_tune=True)
+    pages._tune(100, 0.01, 8 * 1024 * 1024)
+    assert pages.page_size == 50
+    pages._tune(50, 0.01, 3 * 1024 * 1024)
+    assert pages.page_size == 66
+
+
+@responses.activate
+def test_endpoint_iterate(nuxeo_client):
+    listing = Listing(5)
+    responses.add_callback(responses.GET, re.compile(f"{API}/task.*"), callback=listing)
+    server = nuxeo_client()
+
+    tasks = list(server.tasks.iterate(params={"userId": "Administrator"}, page_size=2))
+    assert all(isinstance(task, Task) for task in tasks)
+    assert all(task.service is server.tasks for task in tasks)
+    assert len(tasks) == 5
+    params = parse_qs(urlsplit(responses.calls[0].request.url).query)
+    assert params == {"userId": ["Administrator"], "pageSize": ["2"], "currentPageIndex": ["0"]}
+
+    # Raw entries
+    entries = list(server.tasks.iterate(cls=dict, page_size=10))
+    assert entries[0]["uid"] == "uid-0"
+
+
+@responses.activate
+def test_iter_query(nuxeo_client):
+    listing = Listing(7)
+    responses.add_callback(responses.GET, re.compile(f"{API}/query/NXQL.*"), callback=listing)
+    server = nuxeo_client()
+
+    docs = server.documents.iter_query({"query": "SELECT * FROM File"}, page_size=3)
+    result = list(docs)
+    assert [doc.uid for doc in result] == [f"uid-{idx}" for idx in range(7)]
+    assert isinstance(result[0], Document)
+    assert result[0].title == "SELECT * FROM File"
+    assert docs.cursor == {"offset": 7, "pageSize": 3}
+
+    with pytest.raises(BadQuery):
+        server.documents.iter_query({})
+
+
+@responses.activate
+def test_iter_query_in_the_executor(nuxeo_client):
+    listing = Listing(7)
+    responses.add_callback(responses.GET, re.compile(f"{API}/query/NXQL.*"), callback=listing)
+    server = nuxeo_client(max_workers=1)
+
+    # Next pages are fetched inline, instead of waiting for the only worker
+    future = server.submit(lambda: list(server.documents.iter_query({"query": "SELECT * FROM File"}, page_size=3)))
+    assert [doc.uid for doc in future.result(timeout=10)] == [f"uid-{idx}" for idx in range(7)]
+
+
+@responses.activate
+def test_iter_children(nuxeo_client):
+    listing = Listing(3)
+    url = f"{API}/repo/default/id/parent/@children"
+    responses.add_callback(responses.GET, re.compile(f"{url}.*"), callback=listing)
+    server = nuxeo_client()
+
+    children = list(server.documents.iter_children(uid="parent", enrichers=["permissions"], page_size=2))
+    assert [doc.uid for doc in children] == ["uid-0", "uid-1", "uid-2"]
+    assert responses.calls[0].request.headers["enrichers-document"] == "permissions"
+
+
+@responses.activate
+def test_iterate_error(nuxeo_client):
+    responses.add(responses.GET, re.compile(f"{API}/task.*"), status=403, json={})
+    with pytest.raises(HTTPError):
+        list(nuxeo_client().tasks.iterate())
+
+
+class KeysetRepository(object):
+    """Answer NXQL queries paginated on ecm:uuid."""
+
+    def __init__(self, uids):
+        self.uids = sorted(uids)
+        self.queries = []
+
+    def __call__(self, request):
+        params = parse_qs(urlsplit(request.url).query)
+        query = params["query"][0]
+        self.queries.append((query, params))
+        assert params["currentPageIndex"] == ["0"]
+        size = int(params["pageSize"][0])
+        after = re.search(r"ecm:uuid > '([^']+)'", query)
+        uids = [uid for uid in self.uids if not after or uid > after.group(1)]
+        entries = [{"entity-type": "document", "uid": uid} for uid in uids[:size]]
+        page = {"entries": entries, "isNextPageAvailable": len(uids) > size}
+        return 200, {}, json.dumps(page)
+
+
+@responses.activate
+def test_iter_query_keyset(nuxeo_client):
+    repository = KeysetRepository(f"uid-{idx:02d}" for idx in range(25))
+    responses.add_callback(responses.GET, re.compile(f"{API}/query/NXQL.*"), callback=repository)
+    server = nuxeo_client()
+
+    docs = server.documents.iter_query(
+        {"query": "SELECT * FROM File WHERE ecm:isVersion = 0", "queryParams": "x"},
+        keyset="ecm:uuid",
+        page_size=10,
+    )
+    iterator = iter(docs)
+    first = [next(iterator).uid for _ in range(12)]
+    assert first == [f"uid-{idx:02d}" for idx in range(12)]
+    cursor = json.loads(json.dumps(docs.cursor))
+    assert cursor == {"key": ["uid-11"], "pageSize": 10}
+
+    queries = [query for query, _ in repository.queries]
+    assert queries[:2] == [
+        "SELECT * FROM File WHERE ecm:isVersion = 0 ORDER BY ecm:uuid",
+        "SELECT * FROM File WHERE (ecm:uuid > 'uid-09') AND (ecm:isVersion = 0) ORDER BY ecm:uuid",
+    ]
+    assert repository.queries[0][1]["queryParams"] == ["x"]
+
+    # Documents created meanwhile before the position do not shift the next pages
+    repository.uids = sorted(repository.uids + ["uid-00a", "uid-05a"])
+    docs = server.documents.iter_query({"query": "SELECT * FROM File"}, keyset=["ecm:uuid"], cursor=cursor)
+    rest = [doc.uid for doc in docs]
+    assert rest == [f"uid-{idx:02d}" for idx in range(12, 25)]
+    assert repository.queries[-1][0].startswith("SELECT * FROM File WHERE ecm:uuid > 'uid-")
+
+
+def test_iter_query_keyset_errors(nuxeo_client):
+    server = nuxeo_client()
+    with pytest.raises(BadQuery):
+        server.documents.iter_query({"pageProvider": "provider"}, keyset=["ecm:uuid"])
+    with pytest.raises(BadQuery):
+        server.documents.iter_query({"query": "SELECT * FROM File ORDER BY dc:title"}, keyset=["ecm:uuid"])
+
+
+def test_nxql_keyset_query():
+    keyset = NXQLKeyset("SELECT * FROM Document WHERE dc:title = 'order by where'", ["dc:modified"])
+    assert keyset.keys == ["dc:modified", "ecm:uuid"]
+    assert keyset.query_after() == (
+        "SELECT * FROM Document WHERE dc:title = 'order by where' ORDER BY dc:modified, ecm:uuid"
+    )
+    assert keyset.query_after(["2024-01-02T03:04:05.000Z", "it's"]) == (
+        "SELECT * FROM Document WHERE"
+        " ((dc:modified > TIMESTAMP '2024-01-02T03:04:05.000Z')"
+        " OR (dc:modified = TIMESTAMP '2024-01-02T03:04:05.000Z' AND ecm:uuid > 'it\\'s'))"
+        " AND (dc:title = 'order by where')"
+        " ORDER BY dc:modified, ecm:uuid"
+    )
+    assert keyset.params(None) == {"query": keyset.query_after()}
+
+    keyset = NXQLKeyset("select * from Note where ecm:isProxy = 0", ["ecm:uuid", "dc:title"])
+    assert keyset.keys == ["ecm:uuid", "dc:title"]
+
+    with pytest.raises(BadQuery):
+        NXQLKeyset("SELECT * FROM File order  by dc:title")
+
+
+def test_nxql_keyset_query_whitespace():
+    keyset = NXQLKeyset("\n    SELECT * FROM Document WHERE ecm:isTrashed = 0\n")
+    assert keyset.query_after(["uid"]) == (
+        "SELECT * FROM Document WHERE (ecm:uuid > 'uid') AND (ecm:isTrashed = 0) ORDER BY ecm:uuid"
+    )
+
+
+@pytest.mark.parametrize(
+    "value, literal",
+    [
+        ("text", "'text'"),
+        ("a\\b", "'a\\\\b'"),
+        (42, "42"),
+        (1.5, "1.5"),
+        (True, "1"),
+        ("2024-01-02T03:04:05Z", "TIMESTAMP '2024-01-02T03:04:05Z'"),
+        ("2024-01-02T03:04:05.123+02:00", "TIMESTAMP '2024-01-02T03:04:05.123+02:00'"),
+        ("2024-01-02T03:04:05", "TIMESTAMP '2024-01-02T03:04:05'"),
+        ("2024-01-01T00:00 meeting notes", "'2024-01-01T00:00 meeting notes'"),
+        ("2024-01-01T00:00:00Z notes", "'2024-01-01T00:00:00Z notes'"),
+    ],
+)
+def test_nxql_literal(value, literal):
+    assert nxql_literal(value) == literal
+
+
+def test_nxql_literal_invalid():
+    with pytest.raises(BadQuery):
+        nxql_literal(None)
+
+
+def test_nxql_keyset_key():
+    keyset = NXQLKeyset("SELECT * FROM File", ["ecm:primaryType", "dc:modified"])
+    entry = {"uid": "u1", "type": "File", "properties": {"dc:modified": "2024-01-02T03:04:05Z"}}
+    assert keyset.key(entry) == ["File", "2024-01-02T03:04:05Z", "u1"]
+
+    # The property is not fetched
+    with pytest.raises(BadQuery):
+        keyset.key({"uid": "u1", "type": "File"})
+
+
+def test_keyset_iterator():
+    keys = []
+
+    def fetch(last, size):
+        keys.append(last)
+        start = last[0] + 1 if last else 0
+        return {"entries": [{"uid": idx} for idx in range(start, min(start + size, 7))]}
+
+    class Keyset(object):
+        def key(self, entry):
+            return [entry["uid"]]
+
+    pages = KeysetIterator(fetch, Keyset(), page_size=3)
+    assert pages.cursor == {"key": None, "pageSize": 3}
+    assert [entry["uid"] for entry in pages] == list(range(7))
+    assert keys == [None, [2], [5]]
+    assert pages.cursor == {"key": [6], "pageSize": 3}
+
+    keys.clear()
+    resumed = KeysetIterator(fetch, Keyset(), cursor={"key": [3], "pageSize": 2})
+    assert [entry["uid"] for entry in resumed] == [4, 5, 6]
+    assert keys == [[3], [5]]
@@ -0,0 +1,108 @@
+# coding: utf-8
+import pickle
+from http.server import BaseHTTPRequestHandler
+from threading import Barrier, Thread
+
+import pytest
+from nuxeo.tcp import PoolStats, StatsHTTPAdapter, TCPKeepAliveHTTPSAdapter
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    # Keep connections alive
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        # Binary content is not read by the logging hook, connections stay in use
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.mark.parametrize(
+    "kwargs, maxsize",
+    [
+        ({}, 10),
+        ({"max_workers": 32}, 32),
+        ({"max_workers": 32, "pool_maxsize": 4}, 4),
+    ],
+)
+def test_pool_settings(kwargs, maxsize, nuxeo_client):
+    server = nuxeo_client(pool_connections=2, pool_block=True, **kwargs)
+    for prefix in ("http://", "https://"):
+        adapter = server.client._session.adapters[prefix]
+        assert adapter._pool_connections == 2
+        assert adapter._pool_maxsize == maxsize
+        assert adapter._pool_block
+        assert adapter.stats is server.client._pool_stats
+    assert "pool_maxsize" not in server.client.client_kwargs
+
+    # Settings survive a retry toggle
+    server.client.disable_retry()
+    assert server.client._session.adapters["http://"]._pool_maxsize == maxsize
+
+
+@pytest.mark.parametrize("cls", [StatsHTTPAdapter, TCPKeepAliveHTTPSAdapter])
+def test_adapter_pickling(cls):
+    adapter = pickle.loads(pickle.dumps(cls(pool_maxsize=3)))
+    assert isinstance(adapter.stats, PoolStats)
+    assert adapter.poolmanager.stats is adapter.stats
+    assert adapter._pool_maxsize == 3
+
+
+def test_pool_stats_reuse(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url)
+    assert server.client.pool_stats()["requests"] == 0
+
+    for _ in range(5):
+        assert server.client.request("GET", "ping").content
+
+    stats = server.client.pool_stats()
+    assert stats["requests"] == 5
+    assert stats["new_connections"] == 1
+    assert stats["reused_connections"] == 4
+    assert stats["active"] == 0
+    assert stats["idle"] == 1
+    assert stats["discarded"] == 0
+
+
+@pytest.mark.parametrize("maxsize, discarded", [(2, True), ("auto", False)])
+def test_pool_stats_discarded(http_server, maxsize, discarded, nuxeo_client):
+    threads_count = 6
+    server = nuxeo_client(host=http_server.url, max_workers=threads_count, pool_maxsize=maxsize)
+    barrier = Barrier(threads_count)
+    responses = []
+
+    def worker():
+        # Hold all connections at the same time
+        responses.append(server.client.request("GET", "ping"))
+        barrier.wait(timeout=5)
+
+    threads = [Thread(target=worker) for _ in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert server.client.pool_stats()["active"] == threads_count
+    for resp in responses:
+        # Reading the whole body gives the connection back
+        assert resp.content
+
+    stats = server.client.pool_stats()
+    assert stats["active"] == 0
+    assert stats["new_connections"] == threads_count
+    if discarded:
+        assert stats["discarded"] == threads_count - 2
+        assert stats["idle"] == 2
+    else:
+        assert stats["discarded"] == 0
+        assert stats["idle"] == threads_count
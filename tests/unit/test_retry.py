@@ -0,0 +1,157 @@
+# coding: utf-8
+import pickle
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import Mock
+
+import pytest
+from nuxeo.client import DEFAULT_RETRY, Nuxeo
+from nuxeo.exceptions import HTTPError
+from nuxeo.retry import NuxeoRetry, RetryBudget
+from urllib3.util.retry import Retry
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+UID = "0a1b2c3d-0a1b-0a1b-0a1b-0a1b2c3d4e5f"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        # "/nuxeo/<status>/..." answers with that status
+        status = int(self.path.split("/")[2])
+        body = b"{}"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_exponential_backoff():
+    retry = NuxeoRetry(total=10, backoff_factor=1, backoff_max=20)
+    for _ in range(3):
+        retry = retry.increment(method="GET", url="/nuxeo/api/v1/path/", error=ConnectionError())
+    assert retry.get_backoff_time() == Retry(total=10, backoff_factor=1, history=retry.history).get_backoff_time()
+
+    # Retry-After is used as it is
+    response = Mock(headers={"Retry-After": "3600"})
+    assert retry.get_retry_after(response) == 3600
+
+
+def test_decorrelated_jitter():
+    retry = NuxeoRetry(total=10, backoff_factor=1, backoff_max=20, jitter=True)
+    assert retry.get_backoff_time() == 0
+
+    previous = 1
+    for _ in range(10):
+        retry = retry.increment(method="GET", url="/nuxeo/api/v1/path/", error=ConnectionError())
+        backoff = retry.get_backoff_time()
+        assert 1 <= backoff <= min(20, previous * 3)
+        previous = backoff
+    assert len(retry.history) == 10
+
+
+def test_retry_after():
+    retry = NuxeoRetry(backoff_factor=0.5, backoff_max=30, jitter=True)
+    response = Mock(headers={"Retry-After": "3"})
+    assert 3 <= retry.get_retry_after(response) <= 3.5
+
+    # Capped
+    response.headers["Retry-After"] = "3600"
+    assert 30 <= retry.get_retry_after(response) <= 30.5
+
+    response.headers = {}
+    assert retry.get_retry_after(response) is None
+
+
+def test_budget():
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_balance=1)
+    assert budget.withdraw("/nuxeo/api/v1/path/")
+    assert not budget.withdraw("/nuxeo/api/v1/path/")
+
+    # Two requests allow one retry
+    budget.deposit()
+    assert not budget.withdraw(f"/nuxeo/api/v1/id/{UID}")
+    budget.deposit()
+    assert budget.withdraw(f"/nuxeo/api/v1/id/{UID}")
+
+    stats = budget.as_dict()
+    assert stats["requests"] == 2
+    assert stats["retries"] == 2
+    assert stats["rejected"] == 2
+    assert stats["balance"] == 0
+    assert stats["endpoints"] == {"/nuxeo/api/v1/path/": 1, "/nuxeo/api/v1/id/{uid}": 1}
+
+    budget.reset()
+    assert budget.as_dict()["retries"] == 0
+    assert budget.balance == 1
+
+
+def test_budget_refill():
+    budget = RetryBudget(ratio=0, min_per_second=1000, max_balance=1)
+    assert budget.withdraw("/")
+    # Refilled in a few milliseconds
+    while not budget.withdraw("/"):
+        pass
+    assert budget.balance <= 1
+
+
+def test_budget_pickling():
+    budget = RetryBudget(ratio=0.2)
+    budget.deposit()
+    copy = pickle.loads(pickle.dumps(budget))
+    assert copy.ratio == 0.2
+    assert copy.as_dict()["requests"] == 1
+
+
+def test_budget_invalid():
+    with pytest.raises(ValueError):
+        RetryBudget(ratio=-1)
+    with pytest.raises(ValueError):
+        RetryBudget(max_balance=0)
+
+
+def test_new_keeps_budget():
+    budget = RetryBudget()
+    retry = DEFAULT_RETRY.new(budget=budget, jitter=True)
+    assert DEFAULT_RETRY.budget is None
+    assert not DEFAULT_RETRY.jitter
+    copy = retry.new(total=2)
+    assert copy.budget is budget
+    assert copy.jitter
+
+
+def test_client_default_retries(nuxeo_client):
+    # No jitter nor budget by default
+    client = nuxeo_client().client
+    assert client.retries is DEFAULT_RETRY
+    assert client.retry_stats() == {}
+
+    custom = nuxeo_client(retries=DEFAULT_RETRY.new(budget=RetryBudget())).client
+    assert custom.retry_stats()["retries"] == 0
+
+
+def test_client_retries(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url)
+    client = server.client
+    client.retries = DEFAULT_RETRY.new(jitter=True, budget=RetryBudget(min_per_second=0, max_balance=2))
+    client.enable_retry()
+
+    assert client.request("GET", "200/ping").status_code == 200
+    assert client.retry_stats()["retries"] == 0
+
+    # Retries stop when the budget is exhausted, the last answer is used
+    with pytest.raises(HTTPError) as exc:
+        client.request("GET", f"503/id/{UID}")
+    assert exc.value.status == 503
+
+    stats = client.retry_stats()
+    assert stats["requests"] == 2
+    assert stats["retries"] == 2
+    assert stats["rejected"] == 1
+    assert stats["endpoints"] == {"/nuxeo/{n}/id/{uid}": 2}
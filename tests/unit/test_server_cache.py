@@ -0,0 +1,169 @@
+# coding: utf-8
+import json
+import os
+
+import pytest
+import responses
+from nuxeo.exceptions import BadQuery
+from nuxeo.server_cache import ServerCache
+from ..constants import NUXEO_SERVER_URL
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+HOST = f"{NUXEO_SERVER_URL}/"
+REGISTRY = {
+    "operations": [
+        {"id": "Document.Fetch", "aliases": ["Document.Get"], "params": []},
+        {"id": "Document.Query", "params": []},
+    ]
+}
+
+
+def add_responses(version="2025.1", registry=REGISTRY):
+    responses.add(responses.GET, f"{HOST}json/cmis", json={"default": {"productVersion": version}})
+    responses.add(responses.GET, f"{HOST}site/automation", json=registry)
+
+
+def test_save_and_load(tmp_path):
+    cache = ServerCache(directory=str(tmp_path))
+    assert cache.load(HOST, "operations", version="2025.1") is None
+
+    cache.save(HOST, "operations", REGISTRY, version="2025.1")
+    assert cache.load(HOST, "operations", version="2025.1") == REGISTRY
+
+    # Other versions and servers do not match
+    assert cache.load(HOST, "operations", version="2025.2") is None
+    assert cache.load("https://other.example.org/nuxeo/", "operations", version="2025.1") is None
+    assert "max_age" in repr(cache)
+
+
+def test_expired(tmp_path):
+    cache = ServerCache(directory=str(tmp_path), max_age=-1)
+    cache.save(HOST, "server_info", {"productVersion": "2025.1"})
+    assert cache.load(HOST, "server_info") is None
+
+
+@pytest.mark.parametrize("content", [b"", b"not json\n", b'{"format": 1}\n{}', b"[]\n"])
+def test_invalid_file(tmp_path, content):
+    cache = ServerCache(directory=str(tmp_path))
+    path = cache.path(HOST, "server_info")
+    os.makedirs(os.path.dirname(path))
+    with open(path, "wb") as file:
+        file.write(content)
+    assert cache.load(HOST, "server_info") is None
+
+
+def test_corrupted_file(tmp_path):
+    cache = ServerCache(directory=str(tmp_path))
+    cache.save(HOST, "server_info", {"productVersion": "2025.1"})
+    path = cache.path(HOST, "server_info")
+    with open(path, "rb") as file:
+        data = file.read()
+    with open(path, "wb") as file:
+        file.write(data.replace(b"2025.1", b"2025.2"))
+    assert cache.load(HOST, "server_info") is None
+
+
+def test_save_error(tmp_path):
+    # The cache directory cannot be created
+    directory = tmp_path / "file"
+    directory.write_text("")
+    cache = ServerCache(directory=str(directory))
+    cache.save(HOST, "server_info", {})
+    assert cache.load(HOST, "server_info") is None
+
+
+def test_invalidate(tmp_path):
+    cache = ServerCache(directory=str(tmp_path))
+    other = "https://other.example.org/nuxeo/"
+    for host in (HOST, other):
+        cache.save(host, "server_info", {"productVersion": "2025.1"})
+        cache.save(host, "operations", REGISTRY, version="2025.1")
+
+    cache.invalidate(HOST, "operations")
+    assert cache.load(HOST, "operations", version="2025.1") is None
+    assert cache.load(HOST, "server_info")
+
+    cache.invalidate(HOST)
+    assert cache.load(HOST, "server_info") is None
+    assert cache.load(other, "server_info")
+
+    cache.invalidate()
+    assert cache.load(other, "server_info") is None
+    assert cache.load(other, "operations", version="2025.1") is None
+
+
+def test_default_directory(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    monkeypatch.setenv("LOCALAPPDATA", str(tmp_path))
+    assert ServerCache().directory == os.path.join(str(tmp_path), "nuxeo-python-client")
+
+
+@responses.activate
+def test_client(tmp_path, nuxeo_client):
+    add_responses()
+    cache = ServerCache(directory=str(tmp_path))
+
+    server = nuxeo_client(server_cache=cache)
+    assert server.client.server_version == "2025.1"
+    assert set(server.operations.operations) == {"Document.Fetch", "Document.Get", "Document.Query"}
+    assert len(responses.calls) == 2
+
+    # Another process starting: nothing is downloaded
+    other = nuxeo_client(server_cache=cache)
+    assert other.client.server_version == "2025.1"
+    assert other.operations.operations == server.operations.operations
+    assert len(responses.calls) == 2
+
+    # Explicit invalidation
+    assert other.client.server_info(force=True)
+    assert other.operations.refresh()
+    assert len(responses.calls) == 4
+
+
+@responses.activate
+def test_client_new_version(tmp_path, nuxeo_client):
+    cache = ServerCache(directory=str(tmp_path))
+    cache.save(HOST, "operations", {"operations": []}, version="2023.0")
+    add_responses()
+
+    # The registry of another version is not used
+    server = nuxeo_client(server_cache=cache)
+    assert "Document.Fetch" in server.operations.operations
+    assert json.loads(responses.calls[1].response.text) == REGISTRY
+
+
+@responses.activate
+def test_client_unknown_operation(tmp_path, nuxeo_client):
+    cache = ServerCache(directory=str(tmp_path))
+    cache.save(HOST, "server_info", {"productVersion": "2025.1"})
+    cache.save(HOST, "operations", {"operations": []}, version="2025.1")
+    add_responses()
+
+    # An operation missing from the saved registry: it is downloaded again
+    server = nuxeo_client(server_cache=cache)
+    server.operations.check_params("Document.Fetch", {})
+    assert [call.request.url for call in responses.calls] == [f"{HOST}site/automation"]
+
+    # Unknown operations are unknown
+    with pytest.raises(BadQuery):
+        server.operations.check_params("Document.Unknown", {})
+    assert len(responses.calls) == 1
+    assert cache.load(HOST, "operations", version="2025.1") == REGISTRY
+
+
+@responses.activate
+def test_operations_per_client(nuxeo_client):
+    add_responses()
+    other_host = "https://other.example.org/nuxeo/"
+    responses.add(responses.GET, f"{other_host}site/automation", json={"operations": []})
+
+    server = nuxeo_client()
+    other = nuxeo_client(host=other_host)
+    assert server.operations.ops == {}
+    assert "Document.Fetch" in server.operations.operations
+    assert server.operations.ops
+    assert other.operations.operations == {}
+    # Without the server cache, the server version is not needed
+    assert [call.request.url for call in responses.calls] == [f"{HOST}site/automation", f"{other_host}site/automation"]
@@ -0,0 +1,100 @@
+# coding: utf-8
+import pickle
+from http.server import BaseHTTPRequestHandler
+from time import sleep
+
+import pytest
+from nuxeo.metrics import Metrics
+from nuxeo.tcp import RequestTimings, StatsHTTPAdapter, get_timings
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        # "/nuxeo/<delay>/..." waits <delay> milliseconds before answering
+        sleep(int(self.path.split("/")[2]) / 1000)
+        body = b"0123456789" * 1000
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server(http_server, nuxeo_client):
+    server = nuxeo_client(host=http_server.url)
+    server.client.disable_retry()
+    return server
+
+
+def test_request_timings():
+    timings = RequestTimings()
+    assert timings.reused
+    assert timings.transfer is None
+
+    calls = []
+    timings.when_complete(calls.append)
+    timings.when_complete(lambda timings: 1 / 0)
+    timings.on_sent(0.1)
+    timings.on_headers()
+    assert not calls
+    timings.on_complete()
+    assert calls == [timings]
+    assert timings.transfer >= 0
+    assert set(timings.as_dict()) == {"dns", "connect", "tls", "send", "ttfb", "transfer", "reused"}
+    assert timings.total >= 0.1
+
+    # Already complete
+    timings.when_complete(calls.append)
+    assert len(calls) == 2
+
+
+def test_timings(local_server):
+    server = local_server
+    # Bodies are streamed: only headers are read yet
+    resp = server.client.request("GET", "0/ping")
+    timings = resp.timings
+    assert isinstance(timings, RequestTimings)
+    assert not timings.reused
+    assert timings.dns >= 0
+    assert timings.connect > 0
+    assert timings.tls == 0
+    assert timings.send >= 0
+    assert timings.transfer is None
+    resp.content
+    assert timings.transfer >= 0
+
+    # The connection is reused
+    resp = server.client.request("GET", "50/ping")
+    timings = get_timings(resp)
+    assert timings.reused
+    assert timings.dns == timings.connect == timings.tls == 0
+    assert timings.ttfb >= 0.05
+    resp.close()
+    assert timings.transfer is not None
+
+
+def test_timings_metrics(local_server):
+    server = local_server
+    server.client.metrics = metrics = Metrics()
+    server.client.request("GET", "0/ping").content
+    server.client.request("GET", "0/ping").content
+
+    phases = metrics.as_dict()["{n}/ping"]["GET"]["phases"]
+    assert set(phases) == {"dns", "connect", "tls", "send", "ttfb", "transfer"}
+    assert phases["connect"] > 0
+    assert 'endpoint="{n}/ping",phase="transfer"}' in metrics.prometheus()
+
+
+def test_pickle_adapter():
+    adapter = pickle.loads(pickle.dumps(StatsHTTPAdapter()))
+    pool = adapter.poolmanager.connection_from_url("http://localhost")
+    assert pool.ConnectionCls.__name__ == "TimedHTTPConnection"
@@ -0,0 +1,145 @@
+# coding: utf-8
+import json
+from http.server import BaseHTTPRequestHandler
+from unittest.mock import Mock
+
+import pytest
+from nuxeo.exceptions import HTTPError, InvalidTracer
+from nuxeo.handlers.default import Uploader
+from nuxeo.models import Batch, BufferBlob
+from nuxeo.tracing import NOOP_SPAN, OpenTelemetryTracer, Tracer, get_tracer
+
+# We do not need to set-up a server and log the current test
+skip_logging = True
+
+requires_otel = pytest.mark.skipif(
+    not OpenTelemetryTracer.available(), reason="opentelemetry is not installed"
+)
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def answer(self):
+        # "/nuxeo/<status>/..." answers with that status, and the received traceparent
+        segment = self.path.split("/")[2]
+        status = int(segment) if segment.isdigit() else 200
+        body = json.dumps({"traceparent": self.headers.get("traceparent")}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.answer()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        self.answer()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def exporter():
+    sdk = pytest.importorskip("opentelemetry.sdk.trace")
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+    exporter = InMemorySpanExporter()
+    provider = sdk.TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    exporter.tracer = OpenTelemetryTracer(tracer_provider=provider)
+    return exporter
+
+
+def test_get_tracer():
+    assert type(get_tracer(None)) is Tracer
+    assert type(get_tracer("noop")) is Tracer
+    tracer = Tracer()
+    assert get_tracer(tracer) is tracer
+
+    with pytest.raises(InvalidTracer) as exc:
+        get_tracer("zipkin")
+    assert "zipkin" in str(exc.value)
+
+    expected = OpenTelemetryTracer if OpenTelemetryTracer.available() else Tracer
+    assert type(get_tracer("auto")) is expected
+
+
+def test_noop_tracer():
+    tracer = Tracer()
+    assert not tracer.enabled
+    with tracer.span("nuxeo.operation", {"nuxeo.operation.id": "Document.Fetch"}) as span:
+        span.set_attribute("key", "value")
+    assert span is NOOP_SPAN
+
+    headers = {"Accept": "*/*"}
+    span = tracer.start_span("GET")
+    assert tracer.inject(headers, span) is headers
+    tracer.end_span(span, error=ValueError())
+
+
+@requires_otel
+def test_request_spans(http_server, exporter, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, tracer=exporter.tracer)
+    server.client.disable_retry()
+
+    resp = server.client.request("GET", "200/id/0a1b2c3d-0a1b-0a1b-0a1b-0a1b2c3d4e5f")
+    traceparent = resp.json()["traceparent"]
+    with pytest.raises(HTTPError):
+        server.client.request("GET", "500/ping")
+
+    ok, failed = exporter.get_finished_spans()
+    assert ok.name == "GET"
+    assert ok.attributes["nuxeo.endpoint"] == "{n}/id/{uid}"
+    assert ok.attributes["http.response.status_code"] == 200
+    assert ok.status.is_ok
+    # The server gets the trace context
+    assert traceparent.startswith(f"00-{ok.context.trace_id:032x}-{ok.context.span_id:016x}-")
+
+    assert failed.attributes["http.response.status_code"] == 500
+    assert not failed.status.is_ok
+    assert failed.events[0].name == "exception"
+
+
+@requires_otel
+def test_operation_spans(http_server, exporter, tmp_path, nuxeo_client):
+    server = nuxeo_client(host=http_server.url, tracer=exporter.tracer)
+    server.client.disable_retry()
+    server.operations.execute(command="Document.Fetch", value="/", check_params=False)
+
+    request, operation = exporter.get_finished_spans()
+    assert operation.name == "nuxeo.operation"
+    assert operation.attributes["nuxeo.operation.id"] == "Document.Fetch"
+    assert request.name == "POST"
+    assert request.parent.span_id == operation.context.span_id
+    exporter.clear()
+
+    # Download to a file
+    file_out = tmp_path / "blob.bin"
+    op = server.operations.new("Blob.Get")
+    op.execute(file_out=str(file_out), check_params=False)
+
+    request, download, operation = exporter.get_finished_spans()
+    assert download.name == "nuxeo.download"
+    assert download.attributes["nuxeo.download.bytes"] == file_out.stat().st_size
+    assert download.parent.span_id == operation.context.span_id
+
+
+@requires_otel
+def test_upload_spans(exporter):
+    service = Mock(headers={})
+    service.client.tracer = exporter.tracer
+    service.send_data.return_value = Mock(fileIdx=0, uploadedSize=4)
+    batch = Batch(batchId="batch-42")
+    uploader = Uploader(service, batch, BufferBlob(data="data", name="a.txt"), 1024)
+    uploader.upload()
+
+    (span,) = exporter.get_finished_spans()
+    assert span.name == "nuxeo.upload.chunk"
+    assert span.attributes["nuxeo.batch.id"] == "batch-42"
+    assert span.attributes["nuxeo.upload.chunk.index"] == 0
+    assert span.attributes["nuxeo.upload.chunk.bytes"] == 4